@@ -0,0 +1,245 @@
+import os
+import ast
+import json
+import argparse
+import itertools
+
+import numpy as np
+
+from trajectory_io import open_trajectory, read_columns, trajectory_path
+
+
+def osculating_elements(r, v, mu):
+    """
+    Elementos orbitales osculadores del movimiento relativo de dos cuerpos.
+
+    :param r: Posición relativa, forma (..., 3).
+    :param v: Velocidad relativa, forma (..., 3).
+    :param mu: G (m_i + m_j).
+    :return: Diccionario con a (negativo en órbitas hiperbólicas), e, i, Omega, omega y nu
+             (ángulos en radianes), cada uno de forma (...).
+    """
+    r = np.asarray(r, dtype=float)
+    v = np.asarray(v, dtype=float)
+    r_norm = np.linalg.norm(r, axis=-1)
+    h = np.cross(r, v)
+    h_norm = np.linalg.norm(h, axis=-1)
+    e_vec = np.cross(v, h) / mu - r / r_norm[..., None]
+    e = np.linalg.norm(e_vec, axis=-1)
+    energy = 0.5 * np.sum(v * v, axis=-1) - mu / r_norm
+
+    # Línea de nodos n = z × h; en órbitas ecuatoriales se toma el eje x
+    node = np.stack([-h[..., 1], h[..., 0], np.zeros_like(h_norm)], axis=-1)
+    node_norm = np.linalg.norm(node, axis=-1)
+    equatorial = node_norm <= 1e-12 * h_norm
+    node = np.where(equatorial[..., None], [1.0, 0.0, 0.0], node)
+    h_hat = h / h_norm[..., None]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        a = -mu / (2 * energy)
+    return {
+        'a': a,
+        'e': e,
+        'i': np.arccos(np.clip(h[..., 2] / h_norm, -1.0, 1.0)),
+        'Omega': np.where(equatorial, 0.0, np.arctan2(node[..., 1], node[..., 0])),
+        'omega': np.arctan2(np.sum(h_hat * np.cross(node, e_vec), axis=-1), np.sum(node * e_vec, axis=-1)),
+        'nu': np.arctan2(np.sum(h_hat * np.cross(e_vec, r), axis=-1), np.sum(e_vec * r, axis=-1)),
+    }
+
+
+class RunningExtremum:
+    def __init__(self):
+        """Mínimo y máximo de una serie con el instante en que se alcanzan (memoria constante)."""
+        self.min = np.inf
+        self.t_min = np.nan
+        self.max = -np.inf
+        self.t_max = np.nan
+
+    def update(self, time, values):
+        finite = np.isfinite(values)
+        if not finite.any():
+            return
+        values = np.where(finite, values, np.nan)
+        k = np.nanargmin(values)
+        if values[k] < self.min:
+            self.min, self.t_min = float(values[k]), float(time[k])
+        k = np.nanargmax(values)
+        if values[k] > self.max:
+            self.max, self.t_max = float(values[k]), float(time[k])
+
+    def as_dict(self, name):
+        return {f'{name}_min': self.min, f't_{name}_min': self.t_min,
+                f'{name}_max': self.max, f't_{name}_max': self.t_max}
+
+
+class StreamingAnalyzer:
+    def __init__(self):
+        """
+        Análisis en streaming de una trayectoria, bloque a bloque y con memoria constante.
+
+        Acumula la deriva relativa de energía ΔE/E₀ y de |L|, las distancias mínima y
+        máxima de cada par (con sus instantes) y los elementos osculadores de cada par.
+        Se alimenta con start(header) y luego update(filas) por cada bloque de filas
+        (columnas del formato .trj/.dat); result() devuelve el resumen.
+
+        Puede pasarse a ThreeBodySimulator.simulate(analyzers=[...]) para analizar
+        la corrida mientras se escribe, o usarse sobre archivos con analyze_file().
+        """
+        self.header = None
+
+    def start(self, header):
+        """Prepara el análisis a partir del encabezado (columnas y parámetros de la corrida)."""
+        if len(header.get('row_shape', [1])) != 1:
+            raise ValueError("El análisis en streaming solo admite trayectorias de un sistema (no ensembles)")
+        self.header = header
+        columns = header['columns']
+        params = header.get('params', {})
+        self.col = {name: k for k, name in enumerate(columns)}
+        self.n_bodies = sum(1 for name in columns if name[0] == 'x' and name[1:].isdigit())
+        self.masses = np.asarray(params['masses'], dtype=float) if 'masses' in params else None
+        self.G = params.get('G')
+
+        self.pos = [[self.col[f'{c}{i}'] for c in 'xyz'] for i in range(1, self.n_bodies + 1)]
+        self.vel = [[self.col[f'v{c}{i}'] for c in 'xyz'] for i in range(1, self.n_bodies + 1)]
+        self.pairs = [(i, j) for i in range(self.n_bodies) for j in range(i + 1, self.n_bodies)]
+
+        self.rows = 0
+        self.t_start = self.t_end = None
+        self.E0 = self.L0 = None
+        self.energy = RunningExtremum()
+        self.momentum = RunningExtremum()
+        self.final_dE = self.final_dL = np.nan
+        self.distances = {pair: RunningExtremum() for pair in self.pairs}
+        self.semi_major = {pair: RunningExtremum() for pair in self.pairs}
+        self.eccentricity = {pair: RunningExtremum() for pair in self.pairs}
+        self.elements = {}
+
+    def update(self, rows):
+        """Procesa un bloque de filas, forma (k, columnas)."""
+        rows = np.asarray(rows)
+        if not len(rows):
+            return
+        time = rows[:, self.col['t']]
+        if self.t_start is None:
+            self.t_start = float(time[0])
+        self.t_end = float(time[-1])
+        self.rows += len(rows)
+
+        # Deriva de energía y de |L| (las filas sin diagnósticos llevan NaN y se ignoran)
+        if 'E_tot' in self.col:
+            E = rows[:, self.col['E_tot']]
+            L = np.linalg.norm(rows[:, [self.col['Lx'], self.col['Ly'], self.col['Lz']]], axis=1)
+            finite = np.flatnonzero(np.isfinite(E))
+            if self.E0 is None and len(finite):
+                self.E0, self.L0 = float(E[finite[0]]), float(L[finite[0]])
+            if self.E0 is not None:
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    dE = np.abs((E - self.E0) / self.E0)
+                    dL = np.abs(L - self.L0) / self.L0
+                self.energy.update(time, dE)
+                self.momentum.update(time, dL)
+                if len(finite):
+                    self.final_dE, self.final_dL = float(dE[finite[-1]]), float(dL[finite[-1]])
+
+        # Distancias y elementos osculadores por par
+        for i, j in self.pairs:
+            r = rows[:, self.pos[j]] - rows[:, self.pos[i]]
+            self.distances[(i, j)].update(time, np.linalg.norm(r, axis=1))
+            if self.masses is None or self.G is None:
+                continue
+            v = rows[:, self.vel[j]] - rows[:, self.vel[i]]
+            elements = osculating_elements(r, v, self.G * (self.masses[i] + self.masses[j]))
+            self.semi_major[(i, j)].update(time, elements['a'])
+            self.eccentricity[(i, j)].update(time, elements['e'])
+            self.elements[(i, j)] = {name: float(values[-1]) for name, values in elements.items()}
+
+    def result(self):
+        """Resumen del análisis (serializable a JSON)."""
+        pairs = {}
+        for i, j in self.pairs:
+            entry = self.distances[(i, j)].as_dict('r')
+            if (i, j) in self.elements:
+                entry.update(self.semi_major[(i, j)].as_dict('a'))
+                entry.update(self.eccentricity[(i, j)].as_dict('e'))
+                entry['final_elements'] = self.elements[(i, j)]
+            pairs[f'{i + 1}-{j + 1}'] = entry
+
+        return {
+            'rows': self.rows,
+            't_start': self.t_start,
+            't_end': self.t_end,
+            'energy': {'E0': self.E0, 'max_rel_drift': self.energy.max, 't_max_rel_drift': self.energy.t_max,
+                       'final_rel_drift': self.final_dE},
+            'angular_momentum': {'L0': self.L0, 'max_rel_drift': self.momentum.max,
+                                 't_max_rel_drift': self.momentum.t_max, 'final_rel_drift': self.final_dL},
+            'pairs': pairs,
+        }
+
+
+def read_params_file(filename):
+    """Lee data/{filename}_params.txt (escrito por three_body_system.main) si existe."""
+    path = f"data/{filename}_params.txt"
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        text = "".join(line for line in f if not line.startswith('#'))
+    return ast.literal_eval(text)
+
+
+def analyze_file(filename, chunk_rows=65536, analyzer=None, masses=None, G=None):
+    """
+    Analiza una corrida guardada bloque a bloque (sin cargarla entera).
+
+    Con .trj los parámetros (masas, G) vienen del encabezado; con .dat se buscan en
+    data/{filename}_params.txt o se pasan con 'masses' y 'G'. Sin masas se omiten
+    los elementos orbitales.
+    """
+    analyzer = analyzer or StreamingAnalyzer()
+    filepath = trajectory_path(filename)
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"No se encontró el archivo data/{filename}.trj ni {filepath}")
+
+    if filepath.endswith(".trj"):
+        header, data = open_trajectory(filepath)
+        header = dict(header, params=dict(header['params']))
+        if masses is not None:
+            header['params'].update(masses=list(masses), G=G if G is not None else header['params'].get('G'))
+        analyzer.start(header)
+        for start in range(0, len(data), chunk_rows):
+            analyzer.update(data[start:start + chunk_rows])
+        return analyzer.result()
+
+    params = read_params_file(filename)
+    if masses is not None:
+        params['masses'] = list(masses)
+    if G is not None:
+        params['G'] = G
+    params.setdefault('G', 6.67430e-11)
+    analyzer.start({'columns': read_columns(filepath), 'params': params})
+    with open(filepath, 'r') as f:
+        reader = (line for line in f if not line.startswith('#'))
+        while True:
+            lines = list(itertools.islice(reader, chunk_rows))
+            if not lines:
+                break
+            analyzer.update(np.loadtxt(lines, ndmin=2))
+    return analyzer.result()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Análisis en streaming de una corrida guardada")
+    parser.add_argument("filename", type=str, help="Nombre base del archivo de datos (sin extensión)")
+    parser.add_argument("--masses", nargs='+', type=float, default=None,
+                        help="Masas de los cuerpos (archivos .dat sin _params.txt)")
+    parser.add_argument("--G", type=float, default=None, help="Constante gravitacional")
+    parser.add_argument("--chunk_rows", type=int, default=65536, help="Filas por bloque")
+    parser.add_argument("--json", type=str, default=None, help="Guardar el resumen en este archivo JSON")
+
+    args = parser.parse_args()
+    summary = analyze_file(args.filename, chunk_rows=args.chunk_rows, masses=args.masses, G=args.G)
+
+    print(json.dumps(summary, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"Resumen guardado en {args.json}")
@@ -1,20 +1,86 @@
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib import rcParams
 from matplotlib.animation import FuncAnimation
 from matplotlib.animation import FFMpegWriter
 
 from mpl_toolkits.mplot3d import Axes3D
 import os
 import argparse
+import tempfile
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from trajectory_io import column_names, iter_columns, time_span
+from result_cache import cached_derived
+
+
+# Proyecciones 2D: índices de las coordenadas (x=0, y=1, z=2) en los ejes horizontal y vertical
+PROJECTIONS = {'3d': None, 'xy': (0, 1), 'xz': (0, 2), 'yz': (1, 2)}
+
+
+class TrailBuffer:
+    def __init__(self, positions, length):
+        """
+        Buffer circular con los últimos 'length' puntos de cada cuerpo.
+
+        Cada punto se guarda dos veces (en i e i + length), de modo que la ventana
+        del rastro es siempre una vista contigua del buffer: avanzar un frame copia
+        un solo punto en lugar de volver a recortar el historial completo.
+
+        :param positions: Posiciones por frame, forma (n_frames, n_cuerpos, 3).
+        :param length: Número máximo de puntos del rastro (incluido el actual).
+        """
+        self.positions = positions
+        self.length = max(int(length), 1)
+        self.buffer = np.empty((2 * self.length,) + positions.shape[1:])
+        self.head = 0
+        self.count = 0
+        self.frame = None
+
+    def push(self, point):
+        """Añade la posición de un nuevo frame (forma (n_cuerpos, 3))."""
+        self.buffer[self.head] = point
+        self.buffer[self.head + self.length] = point
+        self.head = (self.head + 1) % self.length
+        self.count = min(self.count + 1, self.length)
+
+    def seek(self, frame):
+        """Rellena el buffer con los puntos que preceden a 'frame' (saltos o inicio de un tramo)."""
+        self.head = 0
+        self.count = 0
+        for point in self.positions[max(0, frame - self.length + 1):frame + 1]:
+            self.push(point)
+        self.frame = frame
+
+    def window(self, frame):
+        """Vista (k, n_cuerpos, 3) con los últimos puntos hasta 'frame' inclusive."""
+        if self.frame is not None and frame == self.frame + 1:
+            self.push(self.positions[frame])
+            self.frame = frame
+        elif frame != self.frame:
+            self.seek(frame)
+        end = self.head + self.length
+        return self.buffer[end - self.count:end]
+
 
 class ThreeBodyAnimation:
     def __init__(self, data, title="Three-Body System Animation", 
                  body_names=['Body 1', 'Body 2', 'Body 3'], 
                  colors=['gold', 'blue', 'gray'], sizes=[100, 40, 20], 
-                 trail_length=100, interval=50):
+                 trail_length=100, interval=50, projection='3d', stream=None, extent=None):
         """
         Inicializa la animación del sistema de tres cuerpos.
+
+        :param projection: '3d' o una proyección 2D ('xy', 'xz', 'yz'). Las proyecciones
+                           2D se dibujan con blitting cuando el backend lo permite.
+        :param stream: Modo en vivo: objeto con poll() -> (tiempos, posiciones (k, n_cuerpos, 3),
+                       energías), n_cuerpos y finished (p. ej. live_stream.RingReader). En
+                       cada refresco los frames nuevos se añaden al rastro y 'data' se ignora.
+        :param extent: En modo en vivo, escala inicial de los ejes (m); se amplían si un
+                       cuerpo sale de ellos.
         """
+        if projection not in PROJECTIONS:
+            raise ValueError(f"Proyección no soportada: {projection}. Opciones: {', '.join(PROJECTIONS)}")
         self.title = title
         self.data = data
         self.body_names = body_names
@@ -22,10 +88,31 @@ class ThreeBodyAnimation:
         self.sizes = sizes
         self.trail_length = trail_length
         self.interval = interval
+        self.projection = projection
+        self.options = dict(title=title, body_names=body_names, colors=colors, sizes=sizes,
+                            trail_length=trail_length, interval=interval, projection=projection)
         
-        # Configurar figura 3D
+        # Posiciones (n_frames, n_cuerpos, 3) y rastro en buffer circular
+        n = len(body_names)
+        self.stream = stream
+        if stream is not None:
+            # Modo en vivo: no hay historial; el rastro se alimenta solo con push()
+            self.positions = np.empty((0, stream.n_bodies, 3))
+            self.extent = extent or 1.0
+            self.E0 = None
+        else:
+            self.positions = np.stack([np.column_stack([data[f'x{i}'], data[f'y{i}'], data[f'z{i}']])
+                                       for i in range(1, n + 1)], axis=1)
+        self.trail = TrailBuffer(self.positions, trail_length + 1)
+
+        # Configurar figura (3D o proyección 2D)
         self.fig = plt.figure(figsize=(12, 10))
-        self.ax = self.fig.add_subplot(111, projection='3d')
+        if projection == '3d':
+            self.ax = self.fig.add_subplot(111, projection='3d')
+        else:
+            self.ax = self.fig.add_subplot(111)
+        # En vivo el título y los límites cambian durante la animación: sin blitting
+        self.blit = projection != '3d' and self.fig.canvas.supports_blit and stream is None
         
         # Inicializar elementos de la animación
         self.bodies = []
@@ -33,34 +120,49 @@ class ThreeBodyAnimation:
         
     def init_animation(self):
         """Inicializa los elementos gráficos para la animación."""
+        if self.bodies:
+            # Ya inicializada (p. ej. al guardar después de mostrar): solo reiniciar el rastro
+            self.trail.frame = None
+            return self.bodies + self.trails
+
         # Calcular límites del gráfico
-        all_positions = np.array([
-            self.data['x1'], self.data['y1'], self.data['z1'],
-            self.data['x2'], self.data['y2'], self.data['z2'],
-            self.data['x3'], self.data['y3'], self.data['z3']
-        ])
-        
-        max_range = np.max(np.abs(all_positions)) * 0.6
+        if self.stream is not None:
+            max_range = self.extent * 1.2
+        else:
+            max_range = np.max(np.abs(self.positions)) * 0.6
         
         self.ax.set_xlim([-max_range, max_range])
         self.ax.set_ylim([-max_range, max_range])
-        self.ax.set_zlim([-max_range, max_range])
         
-        self.ax.set_xlabel('X Position (m)')
-        self.ax.set_ylabel('Y Position (m)')
-        self.ax.set_zlabel('Z Position (m)')
+        labels = ['X Position (m)', 'Y Position (m)', 'Z Position (m)']
+        if self.projection == '3d':
+            self.ax.set_zlim([-max_range, max_range])
+            self.max_range = max_range
+            self.ax.set_xlabel(labels[0])
+            self.ax.set_ylabel(labels[1])
+            self.ax.set_zlabel(labels[2])
+        else:
+            a, b = PROJECTIONS[self.projection]
+            self.ax.set_xlabel(labels[a])
+            self.ax.set_ylabel(labels[b])
+            self.ax.set_aspect('equal')
+            self.max_range = max_range
         self.ax.set_title(self.title)
         
         # Crear cuerpos y trayectorias
         for i, (name, color, size) in enumerate(zip(self.body_names, self.colors, self.sizes)):
-            # Cuerpo (punto)
-            body, = self.ax.plot([], [], [], 'o', 
-                                color=color, markersize=size/10, 
-                                label=name)
-            # Trayectoria (línea)
-            trail, = self.ax.plot([], [], [], '-', 
-                                 color=color, alpha=0.5, 
-                                 linewidth=1)
+            if self.projection == '3d':
+                # Cuerpo (punto)
+                body, = self.ax.plot([], [], [], 'o',
+                                    color=color, markersize=size/10,
+                                    label=name)
+                # Trayectoria (línea)
+                trail, = self.ax.plot([], [], [], '-',
+                                     color=color, alpha=0.5,
+                                     linewidth=1)
+            else:
+                body, = self.ax.plot([], [], 'o', color=color, markersize=size/10, label=name)
+                trail, = self.ax.plot([], [], '-', color=color, alpha=0.5, linewidth=1)
             
             self.bodies.append(body)
             self.trails.append(trail)
@@ -72,27 +174,23 @@ class ThreeBodyAnimation:
     
     def update(self, frame):
         """Actualiza la animación para cada frame."""
-        for i in range(3):
-            # Índices para las columnas de posición
-            x_idx = 1 + i*3
-            y_idx = 2 + i*3
-            z_idx = 3 + i*3
-            
-            # Obtener datos hasta el frame actual
-            x = self.data['x'+str(i+1)][:frame+1]
-            y = self.data['y'+str(i+1)][:frame+1]
-            z = self.data['z'+str(i+1)][:frame+1]
-            
-            # Mostrar solo los últimos 'trail_length' puntos para el rastro
-            start_idx = max(0, frame - self.trail_length)
+        # Últimos 'trail_length' + 1 puntos de todos los cuerpos (vista del buffer circular)
+        window = self.poll_stream() if self.stream is not None else self.trail.window(frame)
             
-            # Actualizar posición del cuerpo
-            self.bodies[i].set_data([x[-1]], [y[-1]])
-            self.bodies[i].set_3d_properties([z[-1]])
+        for i, (body, trail) in enumerate(zip(self.bodies, self.trails)):
+            points = window[:, i]
+            if self.projection == '3d':
+                # Actualizar posición del cuerpo
+                body.set_data(points[-1:, 0], points[-1:, 1])
+                body.set_3d_properties(points[-1:, 2])
             
-            # Actualizar trayectoria
-            self.trails[i].set_data(x[start_idx:frame+1], y[start_idx:frame+1])
-            self.trails[i].set_3d_properties(z[start_idx:frame+1])
+                # Actualizar trayectoria
+                trail.set_data(points[:, 0], points[:, 1])
+                trail.set_3d_properties(points[:, 2])
+            else:
+                a, b = PROJECTIONS[self.projection]
+                body.set_data(points[-1:, a], points[-1:, b])
+                trail.set_data(points[:, a], points[:, b])
             
             # Actualizar título con tiempo de simulación
             # time = self.data['time'][frame]
@@ -100,64 +198,276 @@ class ThreeBodyAnimation:
         
         return self.bodies + self.trails
     
-    def animate(self, save=False, filename="three_body_animation"):
-        """Ejecuta la animación."""
-        frames = len(self.data['time'])
-        
-        anim = FuncAnimation(
+    def poll_stream(self):
+        """
+        Modo en vivo: añade al rastro los frames nuevos del flujo y devuelve la ventana.
+
+        El título muestra el tiempo de simulación y el error relativo de energía, de
+        modo que una explosión numérica se ve en cuanto ocurre.
+        """
+        times, points, energies = self.stream.poll()
+        for point in points:
+            self.trail.push(point)
+
+        if len(times):
+            finite = energies[np.isfinite(energies)]
+            if self.E0 is None and len(finite):
+                self.E0 = finite[0]
+            status = f"t = {times[-1]:.4e} s"
+            if self.E0:
+                status += f", |ΔE/E₀| = {abs((energies[-1] - self.E0) / self.E0):.2e}"
+            if not np.all(np.isfinite(points)):
+                status += " (estado no finito)"
+            self.ax.set_title(f"{self.title}\n{status}")
+
+            # Ampliar los ejes si algún cuerpo sale de ellos
+            extent = np.nanmax(np.abs(points)) if np.any(np.isfinite(points)) else 0.0
+            if extent > self.max_range:
+                self.max_range = 1.5 * extent
+                for set_lim in (self.ax.set_xlim, self.ax.set_ylim) + \
+                        ((self.ax.set_zlim,) if self.projection == '3d' else ()):
+                    set_lim([-self.max_range, self.max_range])
+        elif self.stream.finished and not self.ax.get_title().endswith("(terminada)"):
+            self.ax.set_title(f"{self.ax.get_title()} (terminada)")
+
+        end = self.trail.head + self.trail.length
+        return self.trail.buffer[end - self.trail.count:end]
+
+    def animation(self, frames=None):
+        """Crea el FuncAnimation sobre 'frames' (por defecto todos; sin fin en modo en vivo)."""
+        if frames is None and self.stream is None:
+            frames = len(self.positions)
+        return FuncAnimation(
             self.fig, 
             self.update, 
             frames=frames,
             init_func=self.init_animation,
             interval=self.interval,
-            blit=False
+            blit=self.blit,
+            cache_frame_data=self.stream is None
         )
         
+    def animate(self, save=False, filename="three_body_animation", workers=1, fps=45, dpi=200, bitrate=5000):
+        """
+        Ejecuta la animación.
+
+        :param workers: Con save=True, número de procesos que renderizan tramos
+                        consecutivos de frames; los segmentos se concatenan con ffmpeg
+                        sin recodificar, así que el video final es el mismo.
+        """
+        save_path = f"animations/{filename}.mp4"
+        if save and self.stream is not None:
+            raise ValueError("El modo en vivo solo muestra la animación; para guardarla use el .trj al terminar")
+        if save and workers > 1:
+            print(f"Guardando animación en {save_path} ({workers} procesos)...")
+            save_parallel(self.data, self.options, save_path, workers, fps=fps, dpi=dpi, bitrate=bitrate)
+            return
+
+        anim = self.animation()
+
         if save:
-            writer = FFMpegWriter(fps=45, bitrate=5000)
-            save_path = f"animations/{filename}.mp4"
+            writer = FFMpegWriter(fps=fps, bitrate=bitrate)
             print(f"Guardando animación en {save_path}...")
-            anim.save(save_path, writer=writer, dpi=200)
+            anim.save(save_path, writer=writer, dpi=dpi)
         else:
             plt.show()
 
-def load_animate_data(filename="sun_earth_moon_simulation", skip_steps=5):
-    """Carga datos submuestreados cada 'skip_steps' pasos"""
-    filepath = f"data/{filename}.dat"
-    data = np.loadtxt(filepath, comments='#')
-    
-    # Submuestreo de datos
-    data = data[::skip_steps]  # Salta 'skip_steps' pasos
-    
-    return {
-        'time': data[:, 0],
-        'x1': data[:, 1], 'y1': data[:, 2], 'z1': data[:, 3],
-        'x2': data[:, 4], 'y2': data[:, 5], 'z2': data[:, 6],
-        'x3': data[:, 7], 'y3': data[:, 8], 'z3': data[:, 9]
-    }
+
+def render_segment(data, options, start, stop, path, fps=45, dpi=200, bitrate=5000):
+    """Renderiza los frames [start, stop) en un video independiente (se ejecuta en un proceso trabajador)."""
+    plt.switch_backend('Agg')
+    animation = ThreeBodyAnimation(data, **options)
+    anim = animation.animation(frames=range(start, stop))
+    anim.save(path, writer=FFMpegWriter(fps=fps, bitrate=bitrate), dpi=dpi)
+    plt.close(animation.fig)
+    return path
+
+
+def concat_segments(paths, save_path):
+    """Une segmentos de video consecutivos con el demuxer concat de ffmpeg (sin recodificar)."""
+    list_path = os.path.join(os.path.dirname(paths[0]), "segments.txt")
+    with open(list_path, "w") as f:
+        for path in paths:
+            f.write(f"file '{os.path.abspath(path)}'\n")
+    subprocess.run([rcParams['animation.ffmpeg_path'], "-y", "-loglevel", "error",
+                    "-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy", save_path], check=True)
+
+
+def save_parallel(data, options, save_path, workers, fps=45, dpi=200, bitrate=5000):
+    """
+    Guarda la animación repartiendo el rango de frames entre 'workers' procesos.
+
+    Cada proceso reconstruye la animación, rellena el rastro al inicio de su tramo
+    y codifica su segmento; al final los segmentos se concatenan en 'save_path'.
+    """
+    n_frames = len(data['time'])
+    bounds = np.linspace(0, n_frames, min(workers, n_frames) + 1).astype(int)
+
+    directory = os.path.dirname(save_path) or "."
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        paths = [os.path.join(tmp, f"segment_{k:03d}.mp4") for k in range(len(bounds) - 1)]
+        with ProcessPoolExecutor(max_workers=len(paths)) as executor:
+            futures = [executor.submit(render_segment, data, options, int(start), int(stop), path,
+                                       fps, dpi, bitrate)
+                       for start, stop, path in zip(bounds[:-1], bounds[1:], paths)]
+            for future in futures:
+                future.result()
+        concat_segments(paths, save_path)
+
+
+class StreamDecimator:
+    def __init__(self, n_bodies, skip_steps=1, frames=None, t_span=None, max_angle=None):
+        """
+        Selecciona filas de una trayectoria que llega por bloques, con memoria constante.
+
+        Criterios (una fila se conserva si cumple alguno):
+        - Paso fijo: una fila de cada 'skip_steps' (si no se indica 'frames').
+        - Uniforme en tiempo: la primera fila de cada intervalo de duración
+          (t_final - t_inicial) / (frames - 1), con t_span = (t_inicial, t_final).
+        - Adaptativo: cada vez que la dirección de movimiento de algún cuerpo ha girado
+          'max_angle' grados acumulados desde la fila anterior conservada. El giro entre
+          filas es v·κ·dt, así que los encuentros cercanos (rápidos y curvos) conservan
+          más frames que los tramos lentos o rectos.
+        """
+        self.n_bodies = n_bodies
+        self.skip_steps = max(int(skip_steps), 1)
+        self.frames = frames
+        self.max_angle = np.radians(max_angle) if max_angle else None
+        if frames is not None:
+            t0, t1 = t_span
+            self.t0 = t0
+            self.interval = (t1 - t0) / max(frames - 1, 1) or 1.0
+
+        # Estado arrastrado entre bloques
+        self.offset = 0
+        self.last_bucket = -1
+        self.last_position = None
+        self.last_step = None
+        self.angle = 0.0
+
+    def mask(self, chunk):
+        """Máscara booleana de las filas del bloque que se conservan."""
+        time = chunk['time']
+        n = len(time)
+
+        if self.frames is None:
+            keep = (self.offset + np.arange(n)) % self.skip_steps == 0
+        else:
+            bucket = np.floor((time - self.t0) / self.interval)
+            previous = np.concatenate([[self.last_bucket], bucket[:-1]])
+            keep = bucket != previous
+            self.last_bucket = bucket[-1]
+
+        if self.max_angle is not None:
+            positions = np.stack([np.column_stack([chunk[f'x{i}'], chunk[f'y{i}'], chunk[f'z{i}']])
+                                  for i in range(1, self.n_bodies + 1)], axis=1)
+            previous = positions[:1] if self.last_position is None else self.last_position[None]
+            steps = np.diff(np.concatenate([previous, positions]), axis=0)
+            before = np.concatenate([steps[:1] if self.last_step is None else self.last_step[None], steps[:-1]])
+
+            # Ángulo girado por la dirección de movimiento de cada cuerpo entre filas. Los
+            # cuerpos casi quietos (p. ej. el Sol) se ignoran: su dirección es ruido de redondeo
+            norm = np.linalg.norm(steps, axis=-1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                cos = np.sum(steps * before, axis=-1) / (norm * np.linalg.norm(before, axis=-1))
+            turn = np.nan_to_num(np.arccos(np.clip(cos, -1.0, 1.0)))
+            turn[norm < 1e-3 * norm.max(axis=-1, keepdims=True)] = 0.0
+            turn = turn.max(axis=-1)
+
+            total = self.angle + np.cumsum(turn)
+            level = np.floor(total / self.max_angle)
+            keep |= level != np.concatenate([[np.floor(self.angle / self.max_angle)], level[:-1]])
+            self.angle = total[-1]
+            self.last_position = positions[-1]
+            self.last_step = steps[-1]
+
+        self.offset += n
+        return keep
+
+
+def load_animate_data(filename="sun_earth_moon_simulation", skip_steps=5, frames=None, max_angle=None,
+                      chunk_rows=65536, member=None):
+    """
+    Carga tiempo y posiciones decimados, leyendo el archivo por bloques.
+
+    Solo se leen las columnas de tiempo y posición; la memoria usada depende
+    del número de frames conservados, no del tamaño del archivo.
+
+    :param skip_steps: Una fila de cada 'skip_steps' (si no se indica 'frames').
+    :param frames: Número aproximado de frames uniformes en tiempo.
+    :param max_angle: Grados de giro que fuerzan un frame adicional (decimación adaptativa).
+    :param member: Réplica a cargar de un archivo de ensemble.
+    """
+    names = ['t'] + [name for name in column_names(filename) if name[0] in 'xyz' and name[1:].isdigit()]
+    n_bodies = sum(1 for name in names if name[0] == 'x')
+    decimator = StreamDecimator(n_bodies, skip_steps=skip_steps, frames=frames,
+                                t_span=time_span(filename) if frames is not None else None,
+                                max_angle=max_angle)
+
+    # Solo tiempo y posiciones
+    selected = []
+    for chunk in iter_columns(filename, names, chunk_rows=chunk_rows, member=member):
+        keep = decimator.mask(chunk)
+        selected.append({name: values[keep] for name, values in chunk.items()})
+
+    return {name: np.concatenate([chunk[name] for chunk in selected]) for name in selected[0]}
+
+
+def load_animate_data_cached(filename="sun_earth_moon_simulation", skip_steps=5, frames=None, max_angle=None,
+                             member=None):
+    """
+    load_animate_data a través de la caché de resultados (result_cache.py).
+
+    La serie decimada se guarda como .npz junto a la corrida en caché, con
+    subclave en las opciones de decimación y el código de animate.py; volver a
+    animar la misma corrida no vuelve a leer el archivo de datos.
+    """
+    def produce(directory):
+        data = load_animate_data(filename, skip_steps=skip_steps, frames=frames, max_angle=max_angle,
+                                 member=member)
+        path = os.path.join(directory, "series.npz")
+        np.savez(path, **data)
+        return [path]
+
+    options = {'skip_steps': skip_steps, 'frames': frames, 'max_angle': max_angle, 'member': member}
+    with cached_derived(filename, "animate", options, produce, sources=("animate.py",)) as (directory, _):
+        with np.load(os.path.join(directory, "series.npz")) as series:
+            return {name: series[name] for name in series.files}
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Animación del problema de tres cuerpos')
     parser.add_argument('--filename', type=str, default='sun_earth_moon_test',
                        help='Nombre base del archivo de datos (sin extensión)')
-    parser.add_argument('--names', nargs=3, type=str, default=['Sun', 'Earth', 'Moon'],
-                       help='Nombres de los cuerpos (3 nombres)')
-    parser.add_argument('--colors', nargs=3, type=str, default=['orange', 'blue', 'gray'],
-                       help='Colores para cada cuerpo (3 colores)')
-    parser.add_argument('--sizes', nargs=3, type=int, default=[150, 30, 15],
-                       help='Tamaños de los marcadores (3 enteros)')
+    parser.add_argument('--names', nargs='+', type=str, default=['Sun', 'Earth', 'Moon'],
+                       help='Nombres de los cuerpos')
+    parser.add_argument('--colors', nargs='+', type=str, default=['orange', 'blue', 'gray'],
+                       help='Colores para cada cuerpo')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[150, 30, 15],
+                       help='Tamaños de los marcadores (enteros)')
     parser.add_argument('--trail', type=int, default=100,
                        help='Longitud del rastro de trayectoria')
     parser.add_argument('--interval', type=int, default=50,
                        help='Intervalo entre frames en ms')
+    parser.add_argument('--projection', type=str, default='3d', choices=list(PROJECTIONS),
+                       help='Vista 3D o proyección 2D (las 2D usan blitting)')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Procesos para renderizar y codificar tramos del video en paralelo')
+    parser.add_argument('--skip', type=int, default=5,
+                       help='Conservar una fila de cada N (si no se indica --frames)')
+    parser.add_argument('--frames', type=int, default=None,
+                       help='Número de frames uniformes en tiempo')
+    parser.add_argument('--max_angle', type=float, default=None,
+                       help='Añadir frames cuando un cuerpo gira más de estos grados (encuentros cercanos)')
     parser.add_argument('--save', default=True, action='store_true',
                        help='Guardar animación como MP4 en lugar de mostrar')
     
     args = parser.parse_args()
     
     # Cargar datos
-    data = load_animate_data(args.filename)
+    data = load_animate_data_cached(args.filename, skip_steps=args.skip, frames=args.frames,
+                                    max_angle=args.max_angle)
     
     # Crear y ejecutar animación
     animation = ThreeBodyAnimation(
@@ -166,7 +476,8 @@ if __name__ == '__main__':
         colors=args.colors,
         sizes=args.sizes,
         trail_length=args.trail,
-        interval=args.interval
+        interval=args.interval,
+        projection=args.projection
     )
     
-    animation.animate(save=args.save, filename=args.filename)
\ No newline at end of file
+    animation.animate(save=args.save, filename=args.filename, workers=args.workers)
@@ -0,0 +1,120 @@
+import numpy as np
+
+
+class Octree:
+    def __init__(self, positions, masses, leaf_size=8, max_depth=32):
+        """
+        Construye un octree de Barnes–Hut sobre las posiciones dadas.
+
+        Cada nodo guarda su masa total, su centro de masas y el lado de su caja;
+        las hojas guardan además los índices de los cuerpos que contienen.
+
+        :param positions: Arreglo (N, 3) con las posiciones de los cuerpos (m).
+        :param masses: Arreglo (N,) con las masas (kg).
+        :param leaf_size: Número máximo de cuerpos en una hoja.
+        :param max_depth: Profundidad máxima (evita recursión infinita con cuerpos coincidentes).
+        """
+        self.positions = np.asarray(positions, dtype=float)
+        self.masses = np.asarray(masses, dtype=float)
+        self.leaf_size = leaf_size
+        self.max_depth = max_depth
+
+        self.node_mass = []
+        self.node_com = []
+        self.node_size = []
+        self.node_children = []
+        self.node_bodies = []
+
+        lo = self.positions.min(axis=0)
+        hi = self.positions.max(axis=0)
+        center = 0.5 * (lo + hi)
+        half = 0.5 * np.max(hi - lo) * (1 + 1e-9) + 1e-300
+        self._build(np.arange(len(self.masses)), center, half, 0)
+
+        self.node_mass = np.array(self.node_mass)
+        self.node_com = np.array(self.node_com)
+        self.node_size = np.array(self.node_size)
+
+    def _build(self, bodies, center, half, depth):
+        """Crea recursivamente el nodo que contiene 'bodies' y devuelve su índice."""
+        node = len(self.node_mass)
+        m = self.masses[bodies]
+        total = m.sum()
+        com = (m[:, None] * self.positions[bodies]).sum(axis=0) / total if total > 0 else center
+
+        self.node_mass.append(total)
+        self.node_com.append(com)
+        self.node_size.append(2 * half)
+        self.node_children.append([])
+        self.node_bodies.append(None)
+
+        if len(bodies) <= self.leaf_size or depth >= self.max_depth:
+            self.node_bodies[node] = bodies
+            return node
+
+        # Octante de cada cuerpo: bit 0 -> x, bit 1 -> y, bit 2 -> z
+        above = self.positions[bodies] > center
+        octant = above[:, 0] * 1 + above[:, 1] * 2 + above[:, 2] * 4
+        offsets = np.array([[(k >> b) & 1 for b in range(3)] for k in range(8)]) - 0.5
+
+        for k in range(8):
+            sub = bodies[octant == k]
+            if len(sub):
+                child = self._build(sub, center + offsets[k] * half, 0.5 * half, depth + 1)
+                self.node_children[node].append(child)
+
+        return node
+
+    def accelerations(self, G, theta=0.5, softening=0.0, out=None):
+        """
+        Calcula las aceleraciones recorriendo el árbol de forma vectorizada.
+
+        En cada nodo se procesan a la vez todos los cuerpos que aún no lo han
+        resuelto: los que lo ven bajo un ángulo menor que 'theta' (size/d < theta)
+        usan su monopolo; el resto desciende a los hijos. En las hojas la suma es directa.
+
+        :param G: Constante gravitacional.
+        :param theta: Ángulo de apertura (0 equivale a la suma directa).
+        :param softening: Longitud de suavizado de Plummer ε (1/|r|³ pasa a (|r|² + ε²)^(-3/2)).
+        :param out: Arreglo (N, 3) opcional donde escribir el resultado.
+        """
+        pos = self.positions
+        eps2 = softening**2
+        if out is None:
+            out = np.empty_like(pos)
+        out[:] = 0.0
+
+        stack = [(0, np.arange(len(pos)))]
+        while stack:
+            node, active = stack.pop()
+            leaf = self.node_bodies[node]
+
+            if leaf is not None:
+                # Suma directa contra los cuerpos de la hoja (excluyendo la autointeracción)
+                dr = pos[leaf][None, :, :] - pos[active][:, None, :]
+                r2 = np.einsum('abk,abk->ab', dr, dr)
+                with np.errstate(divide='ignore'):
+                    w = np.where(r2 > 0, G * self.masses[leaf][None, :] * (r2 + eps2)**-1.5, 0.0)
+                out[active] += np.einsum('ab,abk->ak', w, dr)
+                continue
+
+            dr = self.node_com[node] - pos[active]
+            d2 = np.einsum('ak,ak->a', dr, dr)
+            accept = self.node_size[node]**2 < (theta**2) * d2
+
+            if np.any(accept):
+                w = G * self.node_mass[node] * (d2[accept] + eps2)**-1.5
+                out[active[accept]] += w[:, None] * dr[accept]
+
+            rest = active[~accept]
+            if len(rest):
+                for child in self.node_children[node]:
+                    stack.append((child, rest))
+
+        return out
+
+
+def barnes_hut_accelerations(positions, masses, G, theta=0.5, leaf_size=8, softening=0.0, out=None):
+    """Construye el octree para las posiciones dadas y devuelve las aceleraciones (N, 3)."""
+    tree = Octree(positions, masses, leaf_size=leaf_size)
+    return tree.accelerations(G, theta=theta, softening=softening, out=out)
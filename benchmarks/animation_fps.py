@@ -0,0 +1,84 @@
+"""
+Frames por segundo del renderizador de animate.py.
+
+Uso (desde la raíz del repositorio):
+
+    python -m benchmarks.animation_fps --filename sun_earth_moon_test --frames 300
+
+Mide el dibujo de frames en un lienzo Agg (sin codificar video) para la vista
+3D y una proyección 2D, con redibujado completo (lo que hace FuncAnimation.save)
+y con blitting (lo que usa la ventana interactiva en 2D). Con --encode y ffmpeg
+disponible mide además el guardado completo del MP4 con distinto número de procesos.
+"""
+import os
+import time
+import shutil
+import argparse
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from animate import ThreeBodyAnimation, load_animate_data
+
+
+def render_fps(data, projection, frames, blit, trail_length=100):
+    """Frames por segundo dibujando 'frames' frames consecutivos."""
+    animation = ThreeBodyAnimation(data, trail_length=trail_length, projection=projection)
+    artists = animation.init_animation()
+    canvas = animation.fig.canvas
+    frames = min(frames, len(animation.positions))
+
+    if blit:
+        for artist in artists:
+            artist.set_animated(True)
+        canvas.draw()
+        background = canvas.copy_from_bbox(animation.ax.bbox)
+
+    start = time.perf_counter()
+    for frame in range(frames):
+        animation.update(frame)
+        if blit:
+            canvas.restore_region(background)
+            for artist in artists:
+                animation.ax.draw_artist(artist)
+            canvas.blit(animation.ax.bbox)
+        else:
+            canvas.draw()
+    elapsed = time.perf_counter() - start
+    plt.close(animation.fig)
+    return frames / elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Frames por segundo del renderizador de animaciones")
+    parser.add_argument("--filename", type=str, default="sun_earth_moon_test",
+                        help="Nombre base del archivo de datos (sin extensión)")
+    parser.add_argument("--frames", type=int, default=300, help="Frames a dibujar por caso")
+    parser.add_argument("--encode", action="store_true",
+                        help="Medir también el guardado del MP4 (requiere ffmpeg)")
+    parser.add_argument("--workers", nargs='+', type=int, default=[1, os.cpu_count() or 1],
+                        help="Número de procesos a probar con --encode")
+
+    args = parser.parse_args()
+    data = load_animate_data(args.filename)
+
+    print(f"{'proyección':<10} {'modo':<10} {'frames/s':>10}")
+    for projection in ("3d", "xy"):
+        modes = [("completo", False)] + ([("blit", True)] if projection != "3d" else [])
+        for mode, blit in modes:
+            fps = render_fps(data, projection, args.frames, blit)
+            print(f"{projection:<10} {mode:<10} {fps:>10.1f}")
+
+    if args.encode:
+        if shutil.which(matplotlib.rcParams['animation.ffmpeg_path']) is None:
+            print("ffmpeg no está disponible; se omite la medición de codificación")
+        else:
+            n_frames = len(data['time'])
+            animation = ThreeBodyAnimation(data)
+            for workers in args.workers:
+                start = time.perf_counter()
+                animation.animate(save=True, filename=f"_benchmark_{workers}", workers=workers)
+                elapsed = time.perf_counter() - start
+                print(f"Guardado MP4 con {workers} procesos: {elapsed:.1f} s ({n_frames / elapsed:.1f} frames/s)")
+                os.remove(f"animations/_benchmark_{workers}.mp4")
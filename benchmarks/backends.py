@@ -0,0 +1,86 @@
+"""
+Comprueba que el backend compilado (jit_backend) y el backend NumPy coinciden.
+
+Uso (desde la raíz del repositorio):
+
+    python -m benchmarks.backends --config config/sun_earth_moon.yaml --steps 2000
+
+Si Numba no está instalado, el núcleo de jit_backend se ejecuta como Python
+puro (lento, conviene usar pocos pasos), lo que sigue validando su lógica.
+Termina con código de salida 1 si alguna trayectoria difiere más de --rtol.
+Ambos backends suman los pares en distinto orden, así que en configuraciones
+caóticas (encuentros cercanos) la diferencia de redondeo crece con los pasos.
+"""
+import sys
+import time
+import argparse
+
+import numpy as np
+
+import jit_backend
+from config_loader import load_config, validate_config
+from integrators import SYMPLECTIC_WEIGHTS
+from three_body_system import NBodySystem, ThreeBodySimulator
+
+
+def numpy_rows(config, integrator, steps, dt, output_every):
+    """Filas (t, estado, diagnósticos) del backend NumPy con la convención de simulate()."""
+    system = NBodySystem(config['masses'], config['initial_positions'], config['initial_velocities'],
+                         G=config['G'])
+    simulator = ThreeBodySimulator(system, "backend_check", integrator=integrator, output_every=output_every,
+                                   verbose=False)
+    rows = []
+    start = time.perf_counter()
+    for k, (t, state) in enumerate(simulator.states(steps * dt, dt)):
+        if k % output_every == 0:
+            E_kin, E_pot, L = system.diagnostics(state)
+            rows.append(np.concatenate([[t], state, [E_kin, E_pot, E_kin + E_pot], L]))
+    return np.array(rows), time.perf_counter() - start
+
+
+def compiled_rows(config, integrator, steps, dt, output_every):
+    """Filas del núcleo jit_backend.run_block para la misma corrida."""
+    if integrator == "rk4":
+        kind, weights = jit_backend.RK4, np.ones(1)
+    else:
+        kind, weights = jit_backend.SYMPLECTIC, np.array(SYMPLECTIC_WEIGHTS[integrator])
+
+    n = len(config['masses'])
+    state = np.concatenate([np.ravel(config['initial_positions']), np.ravel(config['initial_velocities'])])
+    out = np.empty((steps // output_every + 1, 6 * n + 7))
+    masses = np.array(config['masses'])
+
+    start = time.perf_counter()
+    rows, _ = jit_backend.run_block(kind, state, masses, config['G'], dt, 0.0, 0, steps, steps,
+                                    output_every, 1, weights, out)
+    return out[:rows], time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Comparación de los backends NumPy y compilado")
+    parser.add_argument("--config", type=str, default="config/sun_earth_moon.yaml",
+                        help="Archivo de configuración (.json o .yaml)")
+    parser.add_argument("--steps", type=int, default=2000, help="Número de pasos")
+    parser.add_argument("--output_every", type=int, default=1, help="Escribir una fila cada N pasos")
+    parser.add_argument("--rtol", type=float, default=1e-9,
+                        help="Diferencia relativa máxima admitida (respecto al rango de cada columna)")
+
+    args = parser.parse_args()
+    config = validate_config(load_config(args.config))
+    mode = "compilado" if jit_backend.NUMBA_AVAILABLE else "Python puro (Numba no disponible)"
+    print(f"Núcleo jit_backend: {mode}")
+
+    ok = True
+    for integrator in ("rk4",) + tuple(SYMPLECTIC_WEIGHTS):
+        reference, t_numpy = numpy_rows(config, integrator, args.steps, config['dt'], args.output_every)
+        compiled, t_compiled = compiled_rows(config, integrator, args.steps, config['dt'], args.output_every)
+
+        scale = np.maximum(np.ptp(reference, axis=0), np.abs(reference).max(axis=0)) + 1e-300
+        error = np.max(np.abs(compiled - reference) / scale) if compiled.shape == reference.shape else np.inf
+        passed = error <= args.rtol
+        ok &= passed
+        print(f"{integrator:<10} filas={len(compiled):>6} error={error:.2e} "
+              f"numpy={args.steps / t_numpy:,.0f} pasos/s compilado={args.steps / t_compiled:,.0f} pasos/s "
+              f"{'OK' if passed else 'FALLO'}")
+
+    sys.exit(0 if ok else 1)
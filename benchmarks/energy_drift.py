@@ -0,0 +1,87 @@
+"""
+Compara integradores: tiempo de pared frente a la deriva máxima de energía.
+
+Uso (desde la raíz del repositorio):
+
+    python -m benchmarks.energy_drift --config config/L4_asteroid.yaml --t_max 6.2208e7
+
+Para cada integrador se recorre la simulación con ThreeBodySimulator.states()
+y se evalúan los diagnósticos E_tot y (Lx, Ly, Lz) del sistema cada
+'--sample_every' pasos. El tiempo de los diagnósticos no se cuenta.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from config_loader import load_config, validate_config
+from three_body_system import INTEGRATORS, NBodySystem, ThreeBodySimulator
+
+
+def measure_drift(config, integrator, dt, t_max, sample_every=10, rtol=1e-9, atol=1e-6):
+    """Integra una configuración y devuelve tiempo, evaluaciones y derivas máximas."""
+    system = NBodySystem(config['masses'], config['initial_positions'], config['initial_velocities'],
+                         G=config['G'])
+    simulator = ThreeBodySimulator(system, "energy_drift_benchmark", integrator=integrator,
+                                   rtol=rtol, atol=atol)
+
+    E0 = system.total_energy()
+    L0 = np.linalg.norm(system.angular_momentum())
+    max_dE = 0.0
+    max_dL = 0.0
+
+    diagnostics_time = 0.0
+    start = time.perf_counter()
+    for k, (_, state) in enumerate(simulator.states(t_max, dt)):
+        if k % sample_every == 0:
+            t0 = time.perf_counter()
+            system.state = state
+            max_dE = max(max_dE, abs((system.total_energy() - E0) / E0))
+            max_dL = max(max_dL, abs(np.linalg.norm(system.angular_momentum()) - L0) / L0)
+            diagnostics_time += time.perf_counter() - t0
+    wall = time.perf_counter() - start - diagnostics_time
+
+    return {
+        'integrator': integrator,
+        'dt': dt,
+        't_max': t_max,
+        'wall_time': wall,
+        'force_evaluations': simulator.stats['evaluations'],
+        'max_rel_energy_drift': max_dE,
+        'max_rel_angular_momentum_drift': max_dL,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tiempo de pared vs deriva de energía por integrador")
+    parser.add_argument("--config", type=str, default="config/L4_asteroid.yaml",
+                        help="Archivo de configuración (.json o .yaml)")
+    parser.add_argument("--integrators", nargs='+', default=list(INTEGRATORS), choices=INTEGRATORS,
+                        help="Integradores a comparar")
+    parser.add_argument("--dt", nargs='+', type=float, default=None,
+                        help="Pasos de tiempo a probar (por defecto el de la configuración)")
+    parser.add_argument("--t_max", type=float, default=None,
+                        help="Tiempo total (por defecto el de la configuración)")
+    parser.add_argument("--sample_every", type=int, default=10,
+                        help="Cada cuántos pasos se evalúan los diagnósticos")
+    parser.add_argument("--json", type=str, default=None,
+                        help="Guardar los resultados en este archivo JSON")
+
+    args = parser.parse_args()
+    config = validate_config(load_config(args.config))
+    t_max = args.t_max or config['t_max']
+
+    results = []
+    print(f"{'integrador':<10} {'dt':>10} {'tiempo (s)':>11} {'evals':>9} {'max|dE/E0|':>12} {'max|dL/L0|':>12}")
+    for dt in args.dt or [config['dt']]:
+        for integrator in args.integrators:
+            r = measure_drift(config, integrator, dt, t_max, sample_every=args.sample_every)
+            results.append(r)
+            print(f"{integrator:<10} {dt:>10.4g} {r['wall_time']:>11.3f} {r['force_evaluations']:>9d} "
+                  f"{r['max_rel_energy_drift']:>12.3e} {r['max_rel_angular_momentum_drift']:>12.3e}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Resultados guardados en {args.json}")
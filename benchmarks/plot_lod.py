@@ -0,0 +1,93 @@
+"""
+Tiempo, memoria y diferencia visual de las figuras de plotting.py con y sin LOD.
+
+Uso (desde la raíz del repositorio):
+
+    python -m benchmarks.plot_lod --upsample 100
+
+Recorre los data/*.dat (y data/*.trj) existentes. Como esas corridas son cortas,
+--upsample interpola cada serie con N veces más filas para emular corridas
+largas con salida frecuente. Las figuras se guardan en un directorio temporal y se
+compara píxel a píxel la versión decimada con la completa.
+"""
+import io
+import os
+import glob
+import time
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+
+from plotting import (count_bodies, load_simulation_data, plot_3d_trajectories,
+                      plot_energy_momentum, plot_relative_distances)
+
+
+FIGURES = {
+    'trayectorias_3d': plot_3d_trajectories,
+    'energia_momento': plot_energy_momentum,
+    'distancias': plot_relative_distances,
+}
+
+
+def upsample_data(data, factor):
+    """Interpola linealmente cada columna con 'factor' veces más filas (salida con dt más fino)."""
+    if factor <= 1:
+        return data
+    time = data['time']
+    fine = np.interp(np.arange((len(time) - 1) * factor + 1) / factor, np.arange(len(time)), time)
+    return {name: np.interp(fine, time, values) for name, values in data.items()}
+
+
+def render(function, data, names, lod, directory):
+    """Guarda una figura y devuelve (segundos, pico de memoria en MB, imagen RGBA)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        function(data, body_names=names, save=True, filename="bench", lod=lod)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+
+    path = glob.glob(os.path.join(directory, "plots", "*_bench.png"))[0]
+    image = plt.imread(path)
+    os.remove(path)
+    return elapsed, peak, image
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Figuras de plotting.py con y sin decimación min/max")
+    parser.add_argument("--upsample", type=int, default=100,
+                        help="Factor de interpolación de cada serie para emular corridas largas")
+    parser.add_argument("--files", nargs='+', default=None,
+                        help="Nombres base a usar (por defecto todos los de data/)")
+
+    args = parser.parse_args()
+    files = args.files or sorted({os.path.splitext(os.path.basename(p))[0]
+                                  for p in glob.glob("data/*.dat") + glob.glob("data/*.trj")})
+
+    print(f"{'archivo':<28} {'figura':<16} {'filas':>9} {'completo (s)':>13} {'LOD (s)':>9} "
+          f"{'MB completo':>12} {'MB LOD':>8} {'píxeles distintos':>18}")
+    cwd = os.getcwd()
+    for filename in files:
+        data = upsample_data(load_simulation_data(filename), args.upsample)
+        names = [f"Body {i}" for i in range(1, count_bodies(data) + 1)]
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            try:
+                for figure, function in FIGURES.items():
+                    t_full, mb_full, full = render(function, data, names, False, directory)
+                    t_lod, mb_lod, reduced = render(function, data, names, True, directory)
+                    if full.shape == reduced.shape:
+                        differing = np.mean(np.any(np.abs(full - reduced) > 1 / 255, axis=-1))
+                    else:
+                        differing = 1.0
+                    print(f"{filename:<28} {figure:<16} {len(data['time']):>9} {t_full:>13.2f} {t_lod:>9.2f} "
+                          f"{mb_full:>12.1f} {mb_lod:>8.1f} {differing:>17.3%}")
+            finally:
+                os.chdir(cwd)
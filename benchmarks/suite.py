@@ -0,0 +1,360 @@
+"""
+Suite de rendimiento reproducible: simulador, E/S y visualización.
+
+Uso (desde la raíz del repositorio):
+
+    python -m benchmarks.suite
+    python -m benchmarks.suite --configs config/L4_asteroid.yaml --t_max_factors 1 --skip plots animation
+
+Para cada configuración mide equations_of_motion, runge_kutta_step, simulate()
+con varios t_max (múltiplos del de la configuración), la lectura con
+load_simulation_data del .trj y del .dat exportado, cada figura de plotting.py
+y el dibujo de frames de animate.py. De cada caso se guarda el mejor tiempo de
+'--repeat' ejecuciones, la tasa (pasos, filas o frames por segundo), el pico de
+memoria (tracemalloc, en una ejecución aparte) y el error relativo de energía.
+
+Los resultados se añaden a un historial JSON (--history). Cada caso se compara
+con la mediana de las últimas '--window' entradas de la misma máquina y con los
+mismos --integrator, --calls, --frames y --t_max_factors: una tasa
+menor en más de '--threshold', un pico de memoria mayor en la misma proporción o
+un error de energía 10 veces mayor se marcan como regresión y el programa
+termina con código 1 (salvo con --no_fail). Todo se ejecuta en un directorio
+temporal, así que data/ y plots/ del repositorio no se modifican.
+"""
+import io
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import datetime
+import tempfile
+import subprocess
+import tracemalloc
+import contextlib
+
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+
+from config_loader import load_config, validate_config
+from three_body_system import INTEGRATORS, NBodySystem, ThreeBodySimulator
+from trajectory_io import export_dat, open_trajectory
+from plotting import count_bodies, load_simulation_data
+from benchmarks.plot_lod import FIGURES
+from benchmarks.animation_fps import render_fps
+
+
+DEFAULT_CONFIGS = ["config/sun_earth_moon.yaml", "config/L4_asteroid.yaml", "config/binary_blackhole.yaml"]
+
+# Argumentos que cambian lo que se mide: solo se comparan corridas que coinciden en ellos
+COMPARABLE_ARGUMENTS = ("integrator", "calls", "frames", "t_max_factors")
+
+
+def measure(function, repeat=3):
+    """
+    Mejor tiempo de 'repeat' ejecuciones de function() y pico de memoria en MB de
+    una ejecución adicional bajo tracemalloc (que ralentiza y no se cronometra).
+    Devuelve (segundos, MB, resultado de la última ejecución).
+    """
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        result = function()
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+    return best, peak, result
+
+
+def make_system(config):
+    return NBodySystem(config['masses'], config['initial_positions'], config['initial_velocities'],
+                       G=config['G'], force_method=config['force_method'], theta=config['theta'],
+                       softening=config['softening'])
+
+
+def energy_error(E):
+    """Máximo error relativo |E - E₀|/|E₀| de una serie (ignorando NaN)."""
+    E = np.asarray(E, dtype=float)
+    E = E[np.isfinite(E)]
+    return float(np.max(np.abs((E - E[0]) / E[0]))) if len(E) else None
+
+
+def record(case, benchmark, seconds, count, unit, peak_mb, error=None):
+    return {'case': case, 'benchmark': benchmark, 'seconds': seconds, 'rate': count / seconds,
+            'unit': unit, 'peak_mb': peak_mb, 'energy_error': error}
+
+
+def bench_kernels(case, config, calls, repeat):
+    """equations_of_motion y runge_kutta_step sobre el estado inicial."""
+    system = make_system(config)
+    simulator = ThreeBodySimulator(system, "benchmark", verbose=False)
+    state = system.state.copy()
+    out = np.empty_like(state)
+
+    def eom():
+        for _ in range(calls):
+            system.equations_of_motion(state, out=out)
+
+    def rk4():
+        y = state
+        for _ in range(calls):
+            y = simulator.runge_kutta_step(y, config['dt'])
+        return y
+
+    results = []
+    seconds, peak, _ = measure(eom, repeat)
+    results.append(record(case, "equations_of_motion", seconds, calls, "llamadas/s", peak))
+
+    seconds, peak, final = measure(rk4, repeat)
+    E0 = system.total_energy()
+    system.state = final
+    error = float(abs((system.total_energy() - E0) / E0))
+    results.append(record(case, "runge_kutta_step", seconds, calls, "pasos/s", peak, error))
+    return results
+
+
+def bench_simulate(case, config, factor, repeat):
+    """simulate() completo (con escritura del .trj) hasta factor * t_max."""
+    t_max = factor * config['t_max']
+    name = f"{case}_x{factor:g}"
+
+    def run():
+        simulator = ThreeBodySimulator(make_system(config), name, integrator=config['integrator'],
+                                       rtol=config['rtol'], atol=config['atol'],
+                                       output_every=config['output_every'],
+                                       diagnostics_every=config['diagnostics_every'],
+                                       backend=config['backend'], verbose=False)
+        simulator.simulate(t_max, config['dt'])
+        return simulator
+
+    seconds, peak, simulator = measure(run, repeat)
+    header, data = open_trajectory(f"data/{name}.trj")
+    error = energy_error(data[:, header['columns'].index('E_tot')])
+    steps = int(t_max / config['dt'])
+    return record(case, f"simulate[t_max={factor:g}x]", seconds, steps, "pasos/s", peak, error), name
+
+
+def bench_loading(case, name, tag, repeat):
+    """load_simulation_data sobre el .trj y sobre el mismo resultado exportado a .dat."""
+    def load():
+        data = load_simulation_data(name)
+        # Con .trj las columnas son vistas del mapa de memoria: forzar la lectura
+        return sum(float(np.sum(values)) for values in data.values())
+
+    seconds, peak, _ = measure(load, repeat)
+    rows = len(load_simulation_data(name)['time'])
+    results = [record(case, f"load_simulation_data[trj, {tag}]", seconds, rows, "filas/s", peak)]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        export_dat(name)
+    os.replace(f"data/{name}.trj", f"data/{name}.trj.bak")
+    try:
+        seconds, peak, _ = measure(load, repeat)
+        results.append(record(case, f"load_simulation_data[dat, {tag}]", seconds, rows, "filas/s", peak))
+    finally:
+        os.replace(f"data/{name}.trj.bak", f"data/{name}.trj")
+    return results
+
+
+def bench_plots(case, name, tag, repeat):
+    """Cada figura de plotting.py guardada a SAVE_DPI (con LOD, como en uso normal)."""
+    data = load_simulation_data(name)
+    names = [f"Body {i}" for i in range(1, count_bodies(data) + 1)]
+    results = []
+    for figure, function in FIGURES.items():
+        def draw():
+            with contextlib.redirect_stdout(io.StringIO()):
+                function(data, body_names=names, save=True, filename="suite", lod=True)
+
+        seconds, peak, _ = measure(draw, repeat)
+        results.append(record(case, f"plot[{figure}, {tag}]", seconds, len(data['time']), "filas/s", peak))
+    return results
+
+
+def bench_animation(case, name, tag, frames):
+    """Frames por segundo del renderizador de animate.py (3D completo y xy con blitting)."""
+    data = load_simulation_data(name)
+    results = []
+    for projection, blit in (("3d", False), ("xy", True)):
+        fps = render_fps(data, projection, frames, blit)
+        # tracemalloc ralentiza mucho el dibujo: el pico se mide con pocos frames aparte
+        tracemalloc.start()
+        try:
+            render_fps(data, projection, min(frames, 10), blit)
+            peak = tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            tracemalloc.stop()
+        n = min(frames, len(data['time']))
+        results.append(record(case, f"animate[{projection}, {tag}]", n / fps, n, "frames/s", peak))
+    return results
+
+
+def machine_id():
+    """Identifica la máquina: solo se comparan resultados medidos en el mismo entorno."""
+    return f"{platform.node()}|{platform.machine()}|{platform.python_version()}|numpy {np.__version__}"
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparable(entry, machine, arguments):
+    """True si la entrada del historial se midió en la misma máquina con los mismos COMPARABLE_ARGUMENTS."""
+    previous = entry.get('arguments', {})
+    return (entry.get('machine') == machine
+            and all(previous.get(key) == arguments.get(key) for key in COMPARABLE_ARGUMENTS))
+
+
+def find_regressions(results, history, machine, arguments, threshold=0.2, window=5):
+    """
+    Compara cada resultado con la mediana de las últimas 'window' entradas del
+    historial de la misma máquina y con los mismos argumentos (ver
+    COMPARABLE_ARGUMENTS). Devuelve una lista de mensajes.
+    """
+    previous = [entry for entry in history if comparable(entry, machine, arguments)][-window:]
+    regressions = []
+    for r in results:
+        matches = [p for entry in previous for p in entry['results']
+                   if p['case'] == r['case'] and p['benchmark'] == r['benchmark']]
+        if not matches:
+            continue
+        label = f"{r['case']} {r['benchmark']}"
+        rate = np.median([p['rate'] for p in matches])
+        if r['rate'] < (1 - threshold) * rate:
+            regressions.append(f"{label}: {r['rate']:.4g} {r['unit']} frente a {rate:.4g} "
+                               f"({r['rate'] / rate - 1:+.0%})")
+        peak = np.median([p['peak_mb'] for p in matches])
+        # Se ignoran variaciones de menos de 1 MB (ruido del asignador)
+        if r['peak_mb'] > (1 + threshold) * peak and r['peak_mb'] - peak > 1.0:
+            regressions.append(f"{label}: pico de memoria {r['peak_mb']:.1f} MB frente a {peak:.1f} MB")
+        errors = [p['energy_error'] for p in matches if p.get('energy_error') is not None]
+        if r['energy_error'] is not None and errors and r['energy_error'] > 10 * np.median(errors):
+            regressions.append(f"{label}: error de energía {r['energy_error']:.3e} "
+                               f"frente a {np.median(errors):.3e}")
+    return regressions
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_history(path, history):
+    """Escribe el historial en un archivo temporal y lo reemplaza (sin dejarlo a medias)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump(history, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def run_suite(configs, t_max_factors=(0.25, 1, 4), repeat=3, calls=20000, frames=100, skip=(),
+              integrator=None):
+    """Ejecuta la suite en un directorio temporal y devuelve la lista de resultados."""
+    configs = [os.path.abspath(path) for path in configs]
+    cwd = os.getcwd()
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            for path in configs:
+                config = validate_config(load_config(path))
+                if integrator is not None:
+                    config['integrator'] = integrator
+                case = os.path.splitext(os.path.basename(path))[0]
+                case_results = []
+
+                if 'kernels' not in skip:
+                    case_results += bench_kernels(case, config, calls, repeat)
+                name = None
+                for factor in t_max_factors:
+                    r, name = bench_simulate(case, config, factor, repeat)
+                    case_results.append(r)
+                if name is not None:
+                    # E/S y visualización sobre la última corrida (la del último factor)
+                    tag = f"t_max={t_max_factors[-1]:g}x"
+                    if 'io' not in skip:
+                        case_results += bench_loading(case, name, tag, repeat)
+                    if 'plots' not in skip:
+                        case_results += bench_plots(case, name, tag, repeat)
+                    if 'animation' not in skip:
+                        case_results += bench_animation(case, name, tag, frames)
+
+                for r in case_results:
+                    error = "" if r['energy_error'] is None else f"{r['energy_error']:.2e}"
+                    print(f"{r['case']:<18} {r['benchmark']:<42} {r['seconds']:>9.4f} "
+                          f"{r['rate']:>12.4g} {r['unit']:<11} {r['peak_mb']:>8.1f} {error:>10}")
+                results += case_results
+        finally:
+            os.chdir(cwd)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Suite de rendimiento con historial y detección de regresiones")
+    parser.add_argument("--configs", nargs='+', default=DEFAULT_CONFIGS, help="Configuraciones a medir")
+    parser.add_argument("--t_max_factors", nargs='+', type=float, default=[0.25, 1, 4],
+                        help="Múltiplos del t_max de cada configuración para simulate()")
+    parser.add_argument("--integrator", type=str, default=None, choices=INTEGRATORS,
+                        help="Integrador (por defecto el de cada configuración)")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por caso (se guarda la mejor)")
+    parser.add_argument("--calls", type=int, default=20000,
+                        help="Llamadas a equations_of_motion / pasos de runge_kutta_step por repetición")
+    parser.add_argument("--frames", type=int, default=100, help="Frames por caso de animación")
+    parser.add_argument("--skip", nargs='+', default=[], choices=["kernels", "io", "plots", "animation"],
+                        help="Grupos de casos a omitir")
+    parser.add_argument("--history", type=str, default="benchmarks/history.json",
+                        help="Archivo JSON con el historial de resultados")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Empeoramiento relativo que se considera regresión")
+    parser.add_argument("--window", type=int, default=5,
+                        help="Entradas previas del historial con las que se compara")
+    parser.add_argument("--no_save", action="store_true", help="No añadir los resultados al historial")
+    parser.add_argument("--no_fail", action="store_true", help="Terminar con código 0 aunque haya regresiones")
+
+    args = parser.parse_args()
+
+    print(f"{'caso':<18} {'medida':<42} {'tiempo (s)':>9} {'tasa':>12} {'unidad':<11} "
+          f"{'pico MB':>8} {'|dE/E0|':>10}")
+    results = run_suite(args.configs, args.t_max_factors, repeat=args.repeat, calls=args.calls,
+                        frames=args.frames, skip=args.skip, integrator=args.integrator)
+
+    machine = machine_id()
+    arguments = {key: value for key, value in vars(args).items()
+                 if key not in ('history', 'no_save', 'no_fail')}
+    history = load_history(args.history)
+    regressions = find_regressions(results, history, machine, arguments, args.threshold, args.window)
+    if regressions:
+        print(f"\n{len(regressions)} regresiones respecto al historial:")
+        for message in regressions:
+            print(f"  REGRESIÓN {message}")
+    elif any(comparable(entry, machine, arguments) for entry in history):
+        print("\nSin regresiones respecto al historial")
+    else:
+        print("\nSin historial previo en esta máquina con estos argumentos; esta corrida servirá de referencia")
+
+    if not args.no_save:
+        history.append({
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'machine': machine,
+            'arguments': arguments,
+            'results': results,
+            'regressions': regressions,
+        })
+        save_history(args.history, history)
+        print(f"Resultados añadidos a {args.history}")
+
+    if regressions and not args.no_fail:
+        sys.exit(1)
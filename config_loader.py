@@ -29,11 +29,41 @@ def validate_config(config):
         'dt': float(config.get('dt', 0.001)),
         't_max': float(config.get('t_max', 10.0)),
         'filename': str(config.get('filename', 'three_body_simulation')),
-        'G': float(config.get('G', 6.67430e-11))
+        'G': float(config.get('G', 6.67430e-11)),
+        'force_method': str(config.get('force_method', 'direct')),
+        'theta': float(config.get('theta', 0.5)),
+        'softening': float(config.get('softening', 0.0)),
+        'integrator': str(config.get('integrator', 'rk4')),
+        'rtol': float(config.get('rtol', 1e-9)),
+        'atol': float(config.get('atol', 1e-6)),
+        'output_every': int(config.get('output_every', 1)),
+        'diagnostics_every': int(config.get('diagnostics_every', 1)),
+        'backend': str(config.get('backend', 'numpy')),
+        'checkpoint_every': int(config.get('checkpoint_every', 0)),
+        'events': list(config.get('events') or [])
     }
     
     # Validación de dimensiones
-    if len(validated['masses']) != 3 or len(validated['initial_positions']) != 3 or len(validated['initial_velocities']) != 3:
-        raise ValueError("Todos los arrays deben contener exactamente 3 elementos (3 cuerpos)")
+    n_bodies = len(validated['masses'])
+    if n_bodies < 2:
+        raise ValueError("Se requieren al menos 2 cuerpos")
+    if len(validated['initial_positions']) != n_bodies or len(validated['initial_velocities']) != n_bodies:
+        raise ValueError(f"Todos los arrays deben contener el mismo número de elementos ({n_bodies} cuerpos)")
+    
+    if validated['force_method'] not in ('direct', 'barnes_hut'):
+        raise ValueError("force_method debe ser 'direct' o 'barnes_hut'")
+    if validated['theta'] < 0:
+        raise ValueError("theta debe ser no negativo")
+    if validated['softening'] < 0:
+        raise ValueError("softening debe ser no negativo")
+    if validated['rtol'] <= 0 or validated['atol'] < 0:
+        raise ValueError("rtol debe ser positivo y atol no negativo")
+    if validated['output_every'] < 1 or validated['diagnostics_every'] < 1:
+        raise ValueError("output_every y diagnostics_every deben ser enteros positivos")
+    if validated['checkpoint_every'] < 0:
+        raise ValueError("checkpoint_every debe ser no negativo (0 desactiva los checkpoints)")
+    for event in validated['events']:
+        if not isinstance(event, dict) or 'type' not in event:
+            raise ValueError("Cada evento debe ser un diccionario con la clave 'type'")
     
     return validated
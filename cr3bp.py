@@ -0,0 +1,440 @@
+import os
+import time
+import warnings
+import argparse
+
+import numpy as np
+
+from config_loader import load_config, validate_config
+from integrators import DormandPrince45, ListOps, rk4_step
+from three_body_system import state_columns
+from trajectory_io import TrajectoryWriter
+
+
+def lagrange_points(mu):
+    """
+    Puntos de Lagrange L1–L5 del CR3BP en unidades normalizadas del sistema rotante.
+
+    Los colineales son las raíces de ∂Ω/∂x = 0 sobre el eje x (por bisección en
+    cada intervalo entre singularidades, donde la función es monótona); L4 y L5
+    forman triángulos equiláteros con los primarios.
+
+    :return: Diccionario {'L1': array([x, y, z]), ...}.
+    """
+    def gradient(x):
+        r1, r2 = x + mu, x - 1 + mu
+        return x - (1 - mu) * r1 / abs(r1)**3 - mu * r2 / abs(r2)**3
+
+    def bisect(lo, hi):
+        g_lo = gradient(lo)
+        for _ in range(200):
+            mid = 0.5 * (lo + hi)
+            g_mid = gradient(mid)
+            if mid in (lo, hi) or g_mid == 0:
+                break
+            if (g_mid < 0) == (g_lo < 0):
+                lo, g_lo = mid, g_mid
+            else:
+                hi = mid
+        return 0.5 * (lo + hi)
+
+    eps = 1e-12
+    points = {
+        'L1': bisect(-mu + eps, 1 - mu - eps),
+        'L2': bisect(1 - mu + eps, 2.0),
+        'L3': bisect(-2.0, -mu - eps),
+    }
+    points = {name: np.array([x, 0.0, 0.0]) for name, x in points.items()}
+    points['L4'] = np.array([0.5 - mu, np.sqrt(3) / 2, 0.0])
+    points['L5'] = np.array([0.5 - mu, -np.sqrt(3) / 2, 0.0])
+    return points
+
+
+class CR3BP:
+    def __init__(self, mu):
+        """
+        Problema restringido circular de tres cuerpos en el sistema que rota con los primarios.
+
+        Unidades normalizadas: distancia entre primarios 1, masa total 1, G = 1 y
+        velocidad angular 1 (el periodo de los primarios es 2π). El primario queda fijo
+        en (-mu, 0, 0) y el secundario en (1 - mu, 0, 0); el tercer cuerpo no tiene masa.
+        Las ecuaciones solo evalúan dos distancias por estado (frente a los tres pares
+        y las órbitas de los primarios del problema completo) y, como los primarios no
+        se mueven, cerca de L4/L5 el movimiento es lento y admite pasos mucho mayores.
+
+        Los estados tienen forma (..., 6): [x, y, z, vx, vy, vz] por partícula.
+
+        :param mu: Razón de masas m_secundario / (m_primario + m_secundario), en (0, 0.5].
+        """
+        if not 0 < mu <= 0.5:
+            raise ValueError("mu debe estar en (0, 0.5]")
+        self.mu = float(mu)
+        self.lagrange = lagrange_points(self.mu)
+
+    def _distances(self, positions):
+        x, y, z = positions[..., 0], positions[..., 1], positions[..., 2]
+        yz2 = y**2 + z**2
+        return np.sqrt((x + self.mu)**2 + yz2), np.sqrt((x - 1 + self.mu)**2 + yz2)
+
+    def potential(self, positions):
+        """Potencial efectivo Ω = (x² + y²)/2 + (1 - mu)/r1 + mu/r2."""
+        positions = np.asarray(positions, dtype=float)
+        r1, r2 = self._distances(positions)
+        return (0.5 * (positions[..., 0]**2 + positions[..., 1]**2)
+                + (1 - self.mu) / r1 + self.mu / r2)
+
+    def equations_of_motion(self, state, out=None):
+        """
+        Derivadas del estado: ẍ = 2ẏ + Ωx, ÿ = -2ẋ + Ωy, z̈ = Ωz.
+
+        :param out: Arreglo opcional (misma forma que state) donde escribir las derivadas.
+        """
+        if out is None:
+            out = np.empty_like(state)
+        x, y, z = state[..., 0], state[..., 1], state[..., 2]
+        vx, vy = state[..., 3], state[..., 4]
+        r1, r2 = self._distances(state[..., :3])
+        k1 = (1 - self.mu) / r1**3
+        k2 = self.mu / r2**3
+        out[..., :3] = state[..., 3:]
+        out[..., 3] = x + 2 * vy - k1 * (x + self.mu) - k2 * (x - 1 + self.mu)
+        out[..., 4] = y - 2 * vx - (k1 + k2) * y
+        out[..., 5] = -(k1 + k2) * z
+        return out
+
+    def jacobi(self, state):
+        """Constante de Jacobi C = 2Ω - |v|² (se conserva exactamente en el CR3BP)."""
+        state = np.asarray(state, dtype=float)
+        return 2 * self.potential(state[..., :3]) - np.sum(state[..., 3:]**2, axis=-1)
+
+
+class RotatingFrame:
+    def __init__(self, masses, positions, velocities, G=6.67430e-11, primary=1, secondary=2):
+        """
+        Escalas y orientación del sistema rotante de un par de primarios.
+
+        Toma el estado inercial inicial de los primarios: la unidad de longitud es el
+        semieje mayor osculador L de su órbita relativa (vis-viva), la de tiempo 1/n
+        con el movimiento medio n = sqrt(G (m1 + m2) / L³), el eje x va del primario
+        al secundario y el z según su momento angular. El baricentro se mueve con
+        velocidad constante. Con el movimiento medio el error de fase frente a la
+        órbita real queda acotado; con excentricidad e los primarios reales se
+        apartan de sus posiciones fijas hasta ~2 e L, así que si e > 1e-4 se emite un
+        aviso con esa desviación.
+
+        :param masses: Masas de todos los cuerpos (kg).
+        :param positions: Posiciones iniciales (N, 3) en m.
+        :param velocities: Velocidades iniciales (N, 3) en m/s.
+        :param primary: Índice del primario (desde 1, como en las columnas x1, x2, ...).
+        :param secondary: Índice del secundario.
+        """
+        p, s = primary - 1, secondary - 1
+        masses = np.asarray(masses, dtype=float)
+        x = np.asarray(positions, dtype=float)
+        v = np.asarray(velocities, dtype=float)
+        self.G = G
+        self.primary, self.secondary = p, s
+        self.m_primary, self.m_secondary = masses[p], masses[s]
+        M = masses[p] + masses[s]
+
+        d = x[s] - x[p]
+        u = v[s] - v[p]
+        r = np.linalg.norm(d)
+        energy = 2 / r - np.dot(u, u) / (G * M)
+        if energy <= 0:
+            raise ValueError("La órbita relativa de los primarios no está ligada")
+        self.length = float(1 / energy)
+        self.n = float(np.sqrt(G * M / self.length**3))
+        self.mu = float(masses[s] / M)
+        h = np.cross(d, u)
+        self.e1 = d / r
+        self.e3 = h / np.linalg.norm(h)
+        self.e2 = np.cross(self.e3, self.e1)
+        self.origin = (masses[p] * x[p] + masses[s] * x[s]) / M
+        self.v_origin = (masses[p] * v[p] + masses[s] * v[s]) / M
+
+        eccentricity = np.linalg.norm(np.cross(u, h) / (G * M) - self.e1)
+        self.eccentricity = float(eccentricity)
+        if eccentricity > 1e-4:
+            warnings.warn(f"La órbita de los primarios tiene excentricidad {eccentricity:.2e}; "
+                          f"el CR3BP la aproxima por una circular y sus posiciones difieren "
+                          f"hasta ~{2 * eccentricity * self.length:.1e} m de las reales")
+
+    @property
+    def time_unit(self):
+        return 1 / self.n
+
+    @property
+    def velocity_unit(self):
+        return self.length * self.n
+
+    def _axes(self, t):
+        """Ejes x e y del sistema rotante en el instante físico t (forma (..., 3))."""
+        angle = self.n * np.asarray(t, dtype=float)[..., None]
+        c, s = np.cos(angle), np.sin(angle)
+        return c * self.e1 + s * self.e2, -s * self.e1 + c * self.e2
+
+    def to_inertial(self, state, t):
+        """
+        Estado normalizado rotante (..., 6) en el instante físico t -> posiciones y
+        velocidades inerciales (..., 3) en m y m/s.
+        """
+        state = np.asarray(state, dtype=float)
+        t = np.asarray(t, dtype=float)
+        ex, ey = self._axes(t)
+        x, y, z = state[..., 0:1], state[..., 1:2], state[..., 2:3]
+        vx, vy, vz = state[..., 3:4], state[..., 4:5], state[..., 5:6]
+        t = t[..., None]
+        positions = self.origin + self.v_origin * t + self.length * (x * ex + y * ey + z * self.e3)
+        velocities = self.v_origin + self.velocity_unit * ((vx - y) * ex + (vy + x) * ey + vz * self.e3)
+        return positions, velocities
+
+    def to_rotating(self, positions, velocities, t):
+        """Posiciones y velocidades inerciales (..., 3) en el instante físico t -> estado rotante (..., 6)."""
+        t = np.asarray(t, dtype=float)
+        ex, ey = self._axes(t)
+        rel = (np.asarray(positions, dtype=float) - self.origin - self.v_origin * t[..., None]) / self.length
+        u = (np.asarray(velocities, dtype=float) - self.v_origin) / self.velocity_unit
+        x, y, z = np.sum(rel * ex, axis=-1), np.sum(rel * ey, axis=-1), rel @ self.e3
+        return np.stack([x, y, z, np.sum(u * ex, axis=-1) + y, np.sum(u * ey, axis=-1) - x, u @ self.e3],
+                        axis=-1)
+
+    def columns_to_rotating(self, data, body):
+        """
+        Estado rotante (k, 6) del cuerpo 'body' (desde 1) a partir de las columnas de una
+        corrida (trajectory_io.load_columns o plotting.load_simulation_data: 'time', x1, ...).
+        """
+        positions = np.column_stack([data[f'{c}{body}'] for c in 'xyz'])
+        velocities = np.column_stack([data[f'v{c}{body}'] for c in 'xyz'])
+        return self.to_rotating(positions, velocities, data['time'])
+
+    def primaries(self, t):
+        """Posiciones y velocidades inerciales (..., 2, 3) del primario y el secundario en t."""
+        mu = self.mu
+        fixed = np.array([[-mu, 0.0, 0.0, 0.0, 0.0, 0.0], [1 - mu, 0.0, 0.0, 0.0, 0.0, 0.0]])
+        t = np.asarray(t, dtype=float)[..., None]
+        return self.to_inertial(fixed, t)
+
+    def lagrange_inertial(self, model, t=0.0):
+        """Posiciones inerciales (m) de los puntos de Lagrange en el instante t."""
+        return {name: self.to_inertial(np.concatenate([point, np.zeros(3)]), t)[0]
+                for name, point in model.lagrange.items()}
+
+
+CR3BP_INTEGRATORS = ("rk4", "rk45")
+
+
+class CR3BPSimulator:
+    def __init__(self, config, primary=1, secondary=2, body=3, integrator="rk4", rtol=1e-10, atol=1e-12):
+        """
+        Simulación de una configuración de tres cuerpos como CR3BP.
+
+        El cuerpo 'body' se integra sin masa en el sistema rotante de los primarios,
+        en unidades normalizadas; los primarios siguen su órbita circular exacta, así
+        que el paso ya no está limitado por el seguimiento de sus órbitas. La salida se
+        reconstruye en el sistema inercial con las columnas estándar.
+
+        :param config: Configuración validada (config_loader.validate_config).
+        :param body: Índice del cuerpo sin masa (desde 1).
+        :param integrator: "rk4" (paso fijo dt, como en three_body_system.py) o "rk45"
+                           (Dormand–Prince adaptativo; dt es entonces el intervalo de muestreo).
+        :param rtol: Tolerancia relativa de rk45 (unidades normalizadas).
+        :param atol: Tolerancia absoluta de rk45 (unidades normalizadas).
+        """
+        if len(config['masses']) != 3 or sorted((primary, secondary, body)) != [1, 2, 3]:
+            raise ValueError("El CR3BP requiere tres cuerpos: primario, secundario y cuerpo sin masa distintos")
+        if integrator not in CR3BP_INTEGRATORS:
+            raise ValueError(f"Integrador no soportado: {integrator}. Opciones: {', '.join(CR3BP_INTEGRATORS)}")
+        self.config = config
+        self.body = body - 1
+        self.masses = np.array(config['masses'])
+        self.frame = RotatingFrame(config['masses'], config['initial_positions'], config['initial_velocities'],
+                                   G=config['G'], primary=primary, secondary=secondary)
+        self.model = CR3BP(self.frame.mu)
+        self.state0 = self.frame.to_rotating(np.array(config['initial_positions'][self.body]),
+                                             np.array(config['initial_velocities'][self.body]), 0.0)
+        self.integrator = integrator
+        self.rtol = rtol
+        self.atol = atol
+        self.stats = {}
+
+    def inertial_state(self, state, t):
+        """Estado inercial estándar (9 posiciones + 9 velocidades) de los tres cuerpos en t."""
+        frame = self.frame
+        x = np.empty(np.shape(t) + (3, 3))
+        v = np.empty_like(x)
+        x_p, v_p = frame.primaries(t)
+        x[..., [frame.primary, frame.secondary], :] = x_p
+        v[..., [frame.primary, frame.secondary], :] = v_p
+        x[..., self.body, :], v[..., self.body, :] = frame.to_inertial(state, t)
+        return np.concatenate([x.reshape(x.shape[:-2] + (9,)), v.reshape(v.shape[:-2] + (9,))], axis=-1)
+
+    def rows(self, times, states):
+        """
+        Filas de salida (k, 26) de un bloque de instantes físicos y estados rotantes.
+
+        Todo el bloque se convierte de una vez: estado inercial, energías y momento
+        angular de los tres cuerpos (con sus masas reales) y constante de Jacobi.
+        """
+        inertial = self.inertial_state(states, times)
+        x = inertial[:, :9].reshape(-1, 3, 3)
+        v = inertial[:, 9:].reshape(-1, 3, 3)
+        m = self.masses
+        E_kin = 0.5 * np.sum(m * np.sum(v**2, axis=-1), axis=-1)
+        E_pot = np.zeros(len(times))
+        for i, j in ((0, 1), (0, 2), (1, 2)):
+            E_pot -= self.frame.G * m[i] * m[j] / np.linalg.norm(x[:, j] - x[:, i], axis=-1)
+        L = np.sum(m[:, None] * np.cross(x, v), axis=1)
+        return np.column_stack([times, inertial, E_kin, E_pot, E_kin + E_pot, L, self.model.jacobi(states)])
+
+    def _rk4_states(self, steps, h, output_every):
+        """
+        Estados rotantes de los pasos k = 0, ..., steps - 1 múltiplos de 'output_every'
+        (pasos RK4 de tamaño h en unidades normalizadas). Como en ThreeBodySimulator,
+        no se avanza tras el último paso, así que la última fila es la de (steps - 1) h.
+
+        El estado tiene solo 6 componentes, así que se integra sobre una lista de
+        floats (rk4_step con ListOps): cada llamada a NumPy costaría más que su aritmética.
+        """
+        mu = self.model.mu
+        m1 = 1 - mu
+
+        def f(y):
+            x, yy, z, vx, vy, vz = y
+            yz2 = yy * yy + z * z
+            k1 = m1 * ((x + mu)**2 + yz2)**-1.5
+            k2 = mu * ((x - m1)**2 + yz2)**-1.5
+            return [vx, vy, vz,
+                    x + 2 * vy - k1 * (x + mu) - k2 * (x - m1),
+                    yy - 2 * vx - (k1 + k2) * yy,
+                    -(k1 + k2) * z]
+
+        y = [float(value) for value in self.state0]
+        for k in range(steps):
+            if k:
+                y = rk4_step(f, y, h, ListOps)
+            if k % output_every == 0:
+                yield k, y
+        n_steps = max(steps - 1, 0)
+        self.stats = {'accepted': n_steps, 'rejected': 0, 'evaluations': 4 * n_steps}
+
+    def _rk45_states(self, steps, h):
+        """Estados rotantes en los instantes k*h (k < steps), con la salida densa del integrador adaptativo."""
+        solver = DormandPrince45(self.model.equations_of_motion, rtol=self.rtol, atol=self.atol)
+        solver.initialize(0.0, self.state0)
+        for k in range(steps):
+            solver.advance_to(k * h)
+            yield k, solver.dense(k * h)
+        self.stats = {'accepted': solver.n_accepted, 'rejected': solver.n_rejected,
+                      'evaluations': solver.n_evals}
+
+    def simulate(self, t_max, dt, output_every=1, filename=None, block_rows=4096, verbose=True):
+        """
+        Integra hasta t_max (s) y escribe data/{filename}.trj.
+
+        Con rk4, dt es el paso de integración y se escribe una fila cada 'output_every'
+        pasos; con rk45, dt es el intervalo entre filas. Las filas son las mismas que
+        escribe ThreeBodySimulator con ese dt (t = k dt para k < int(t_max/dt)), así
+        que ambas salidas se comparan fila a fila. Las filas tienen las columnas
+        estándar (t, estado inercial de los tres cuerpos, E_kin, E_pot, E_tot, Lx, Ly, Lz,
+        legibles por plotting.py y animate.py) más la constante de Jacobi 'C_J' del
+        cuerpo sin masa, y se convierten por bloques de 'block_rows'.
+
+        :return: Diccionario con pasos, evaluaciones, deriva máxima de C_J y tiempo de pared.
+        """
+        filename = filename or f"{self.config['filename']}_cr3bp"
+        frame, model = self.frame, self.model
+        steps = int(t_max / dt)
+        h = dt * frame.n
+        params = {
+            'model': 'cr3bp',
+            'n_bodies': 3,
+            'masses': self.masses.tolist(),
+            'G': frame.G,
+            'mu': model.mu,
+            'length_unit': frame.length,
+            'time_unit': frame.time_unit,
+            'primary': frame.primary + 1,
+            'secondary': frame.secondary + 1,
+            'body': self.body + 1,
+            'integrator': self.integrator,
+            'rtol': self.rtol,
+            'atol': self.atol,
+            'dt': dt,
+            't_max': t_max,
+            'output_every': output_every,
+        }
+        columns = ["t"] + state_columns(3) + ["E_kin", "E_pot", "E_tot", "Lx", "Ly", "Lz", "C_J"]
+        if self.integrator == "rk4":
+            states = self._rk4_states(steps, h, output_every)
+        else:
+            states = self._rk45_states(steps, h)
+
+        C0 = float(model.jacobi(self.state0))
+        max_dC = 0.0
+        times = np.empty(block_rows)
+        block = np.empty((block_rows, 6))
+        n = 0
+
+        start = time.perf_counter()
+        os.makedirs("data", exist_ok=True)
+        with TrajectoryWriter(f"data/{filename}.trj", columns, params=params) as writer:
+            for k, state in states:
+                times[n] = k * dt
+                block[n] = state
+                n += 1
+                if n == block_rows:
+                    rows = self.rows(times, block)
+                    max_dC = max(max_dC, np.max(np.abs((rows[:, -1] - C0) / C0)))
+                    writer.write_rows(rows)
+                    n = 0
+            if n:
+                rows = self.rows(times[:n], block[:n])
+                max_dC = max(max_dC, np.max(np.abs((rows[:, -1] - C0) / C0)))
+                writer.write_rows(rows)
+        wall = time.perf_counter() - start
+
+        self.stats.update(max_jacobi_error=float(max_dC), wall_time=wall)
+        if verbose:
+            print(f"CR3BP (mu = {model.mu:.6e}) completado en {wall:.2f} s. Datos guardados en data/{filename}.trj")
+            print(f"Integrador {self.integrator}: {self.stats['accepted']} pasos aceptados, "
+                  f"{self.stats['rejected']} rechazados, {self.stats['evaluations']} evaluaciones; "
+                  f"deriva máxima de la constante de Jacobi {max_dC:.3e}")
+        return self.stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Problema restringido circular de tres cuerpos (sistema rotante)")
+    parser.add_argument("--config", type=str, default="config/L4_asteroid.yaml",
+                        help="Configuración de tres cuerpos (.json o .yaml)")
+    parser.add_argument("--primary", type=int, default=1, help="Primario (desde 1)")
+    parser.add_argument("--secondary", type=int, default=2, help="Secundario (desde 1)")
+    parser.add_argument("--body", type=int, default=3, help="Cuerpo que se integra sin masa (desde 1)")
+    parser.add_argument("--integrator", type=str, default="rk4", choices=CR3BP_INTEGRATORS,
+                        help="rk4 (paso fijo dt) o rk45 (adaptativo; dt es el intervalo de muestreo)")
+    parser.add_argument("--rtol", type=float, default=1e-10, help="Tolerancia relativa (unidades normalizadas)")
+    parser.add_argument("--atol", type=float, default=1e-12, help="Tolerancia absoluta (unidades normalizadas)")
+    parser.add_argument("--dt", type=float, default=None,
+                        help="Paso (rk4) o intervalo de muestreo (rk45) en s (por defecto el de la configuración)")
+    parser.add_argument("--output_every", type=int, default=1, help="Con rk4, escribir una fila cada N pasos")
+    parser.add_argument("--t_max", type=float, default=None, help="Tiempo total en s (por defecto el de la configuración)")
+    parser.add_argument("--filename", type=str, default=None,
+                        help="Nombre base de salida (por defecto <filename de la configuración>_cr3bp)")
+    parser.add_argument("--lagrange", action="store_true", help="Imprimir los puntos de Lagrange y salir")
+
+    args = parser.parse_args()
+    config = validate_config(load_config(args.config))
+    simulator = CR3BPSimulator(config, primary=args.primary, secondary=args.secondary, body=args.body,
+                               integrator=args.integrator, rtol=args.rtol, atol=args.atol)
+    if args.lagrange:
+        frame, model = simulator.frame, simulator.model
+        print(f"mu = {model.mu:.10e}, L = {frame.length:.6e} m, 1/n = {frame.time_unit:.6e} s")
+        inertial = frame.lagrange_inertial(model)
+        for name, point in model.lagrange.items():
+            print(f"  {name}: rotante ({point[0]: .10f}, {point[1]: .10f}, {point[2]: .1f}), "
+                  f"inercial ({inertial[name][0]: .6e}, {inertial[name][1]: .6e}, {inertial[name][2]: .6e}) m")
+        print(f"  C_J del cuerpo {args.body}: {float(model.jacobi(simulator.state0)):.12f}")
+        raise SystemExit
+
+    simulator.simulate(args.t_max or config['t_max'], args.dt or config['dt'], output_every=args.output_every,
+                       filename=args.filename)
@@ -0,0 +1,276 @@
+import numpy as np
+
+
+class Event:
+    def __init__(self, name, direction=0, terminal=False, max_records=100):
+        """
+        Función de evento g(t, estado): el evento ocurre cuando g cruza cero.
+
+        :param direction: +1 solo cruces de negativo a positivo, -1 al revés, 0 ambos.
+        :param terminal: Detener la simulación en el primer cruce.
+        :param max_records: Cruces que se guardan en el registro (los demás solo se cuentan).
+        """
+        self.name = name
+        self.direction = direction
+        self.terminal = terminal
+        self.max_records = max_records
+
+    def start(self, system):
+        """Se llama una vez con el estado inicial del sistema (referencias como E₀)."""
+
+    def value(self, system, state):
+        raise NotImplementedError
+
+    def details(self, system, state):
+        """Información adicional que se guarda en el registro del evento."""
+        return {}
+
+
+def _pair_distances(system, state):
+    x = system.positions(state)
+    return np.linalg.norm(x[system._pair_j] - x[system._pair_i], axis=-1)
+
+
+class MinSeparation(Event):
+    def __init__(self, distance, terminal=True, **kwargs):
+        """Algún par de cuerpos se acerca a menos de 'distance' (encuentro casi singular o colisión)."""
+        super().__init__("min_separation", direction=-1, terminal=terminal, **kwargs)
+        self.distance = distance
+
+    def value(self, system, state):
+        return np.min(_pair_distances(system, state)) - self.distance
+
+    def details(self, system, state):
+        r = _pair_distances(system, state)
+        k = int(np.argmin(r))
+        return {'bodies': [int(system._pair_i[k]) + 1, int(system._pair_j[k]) + 1], 'distance': float(r[k])}
+
+
+class Escape(Event):
+    def __init__(self, body, radius=None, terminal=True, **kwargs):
+        """
+        Un cuerpo escapa: energía positiva respecto al baricentro del resto y distancia mayor que 'radius'.
+
+        g = min(ε·radius / (G·M), r/radius - 1), con ε la energía específica del
+        problema de dos cuerpos (cuerpo frente al baricentro del resto), así que g
+        se hace positiva cuando se cumplen ambas condiciones. Por defecto 'radius'
+        es 10 veces la mayor distancia entre pares del estado inicial.
+
+        :param body: Índice del cuerpo (desde 1, como en las columnas x1, x2, ...).
+        """
+        super().__init__("escape", direction=1, terminal=terminal, **kwargs)
+        self.body = body - 1
+        self.radius = radius
+
+    def start(self, system):
+        if self.radius is None:
+            self.radius = 10 * float(np.max(_pair_distances(system, system.state)))
+
+    def _relative(self, system, state):
+        x = system.positions(state)
+        v = system.velocities(state)
+        masses = system.masses
+        rest = np.arange(system.n_bodies) != self.body
+        M_rest = masses[rest].sum()
+        r = x[self.body] - masses[rest] @ x[rest] / M_rest
+        u = v[self.body] - masses[rest] @ v[rest] / M_rest
+        mu = system.G * (M_rest + masses[self.body])
+        return np.linalg.norm(r), 0.5 * u @ u - mu / np.linalg.norm(r), mu
+
+    def value(self, system, state):
+        r, energy, mu = self._relative(system, state)
+        return min(energy * self.radius / mu, r / self.radius - 1)
+
+    def details(self, system, state):
+        r, energy, _ = self._relative(system, state)
+        return {'body': self.body + 1, 'distance': float(r), 'specific_energy': float(energy)}
+
+
+def lagrange_l4(primary, secondary):
+    """
+    Punto de referencia L4 de un par (primario, secundario), índices desde 1.
+
+    Devuelve una función del estado: el punto a 60° por delante del secundario en
+    su plano orbital alrededor del primario, a la misma distancia.
+    """
+    p, s = primary - 1, secondary - 1
+
+    def point(system, state):
+        x = system.positions(state)
+        v = system.velocities(state)
+        d = x[s] - x[p]
+        h = np.cross(d, v[s] - v[p])
+        k = h / np.linalg.norm(h)
+        # Rotación de 60° de d alrededor de k (Rodrigues; k ⟂ d)
+        return x[p] + 0.5 * d + np.sqrt(3) / 2 * np.cross(k, d)
+
+    return point
+
+
+class DistanceFrom(Event):
+    def __init__(self, body, point, distance, terminal=False, **kwargs):
+        """
+        Un cuerpo se aleja más de 'distance' de un punto de referencia.
+
+        :param body: Índice del cuerpo (desde 1).
+        :param point: Coordenadas fijas [x, y, z] o función point(system, state)
+                      (p. ej. lagrange_l4(1, 2)).
+        """
+        super().__init__("distance_from", direction=1, terminal=terminal, **kwargs)
+        self.body = body - 1
+        self.point = point if callable(point) else (lambda system, state, p=np.asarray(point, float): p)
+        self.distance = distance
+
+    def _distance(self, system, state):
+        return np.linalg.norm(system.positions(state)[self.body] - self.point(system, state))
+
+    def value(self, system, state):
+        return self._distance(system, state) - self.distance
+
+    def details(self, system, state):
+        return {'body': self.body + 1, 'distance': float(self._distance(system, state))}
+
+
+class EnergyError(Event):
+    def __init__(self, tolerance, terminal=True, **kwargs):
+        """El error relativo de energía |E - E₀|/|E₀| supera 'tolerance'."""
+        super().__init__("energy_error", direction=1, terminal=terminal, **kwargs)
+        self.tolerance = tolerance
+
+    def _error(self, system, state):
+        E_kin, E_pot, _ = system.diagnostics(state)
+        return abs((E_kin + E_pot - self.E0) / self.E0)
+
+    def start(self, system):
+        E_kin, E_pot, _ = system.diagnostics(system.state)
+        self.E0 = E_kin + E_pot
+
+    def value(self, system, state):
+        return self._error(system, state) - self.tolerance
+
+    def details(self, system, state):
+        return {'relative_energy_error': float(self._error(system, state))}
+
+
+EVENT_TYPES = {
+    'min_separation': MinSeparation,
+    'escape': Escape,
+    'distance_from': DistanceFrom,
+    'energy_error': EnergyError,
+}
+
+
+def build_events(specs):
+    """
+    Construye eventos desde la configuración, p. ej.:
+
+        events:
+          - {type: min_separation, distance: 1.0e7}
+          - {type: escape, body: 3}
+          - {type: distance_from, body: 3, point: L4, primary: 1, secondary: 2, distance: 2.0e10}
+          - {type: energy_error, tolerance: 1.0e-6, terminal: false}
+    """
+    events = []
+    for spec in specs:
+        spec = dict(spec)
+        kind = spec.pop('type')
+        if kind not in EVENT_TYPES:
+            raise ValueError(f"Tipo de evento no soportado: {kind}. Opciones: {', '.join(EVENT_TYPES)}")
+        if kind == 'distance_from' and spec.get('point') == 'L4':
+            spec['point'] = lagrange_l4(spec.pop('primary', 1), spec.pop('secondary', 2))
+        events.append(EVENT_TYPES[kind](**spec))
+    return events
+
+
+def hermite_state(system, t0, y0, t1, y1, t):
+    """
+    Estado en t ∈ [t0, t1] por interpolación cúbica de Hermite.
+
+    Las posiciones usan las velocidades de los extremos como derivadas y las
+    velocidades usan las aceleraciones, de modo que el error es O(dt⁴) como
+    el de los integradores de orden 4.
+    """
+    h = t1 - t0
+    s = (t - t0) / h
+    h00 = 2 * s**3 - 3 * s**2 + 1
+    h10 = s**3 - 2 * s**2 + s
+    h01 = -2 * s**3 + 3 * s**2
+    h11 = s**3 - s**2
+
+    x0, x1 = system.positions(y0), system.positions(y1)
+    v0, v1 = system.velocities(y0), system.velocities(y1)
+    a0, a1 = system.accelerations(x0), system.accelerations(x1)
+    x = h00 * x0 + h10 * h * v0 + h01 * x1 + h11 * h * v1
+    v = h00 * v0 + h10 * h * a0 + h01 * v1 + h11 * h * a1
+    return np.concatenate([x.ravel(), v.ravel()])
+
+
+def find_root(g, t0, g0, t1, g1, tol, max_iter=60):
+    """Raíz de g en [t0, t1] (con g0·g1 < 0) por falsa posición con la modificación de Illinois."""
+    side = 0
+    t = t1
+    for _ in range(max_iter):
+        t = (t0 * g1 - t1 * g0) / (g1 - g0)
+        gt = g(t)
+        if gt == 0 or abs(t1 - t0) < tol:
+            break
+        if gt * g1 < 0:
+            t0, g0 = t1, g1
+            t1, g1 = t, gt
+            side = 0
+        else:
+            t1, g1 = t, gt
+            if side == 1:
+                g0 *= 0.5
+            side = 1
+        if abs(t1 - t0) < tol:
+            break
+    return t
+
+
+class EventMonitor:
+    def __init__(self, events, system, log=None):
+        """
+        Vigila una lista de eventos a lo largo de la simulación.
+
+        En cada paso evalúa g en el nuevo estado; si cambia de signo (en la dirección
+        del evento) localiza el instante exacto por interpolación de Hermite entre los
+        dos estados y lo añade al registro.
+
+        :param log: Registro previo (al reanudar desde un checkpoint).
+        """
+        if system.ensemble_size is not None:
+            raise ValueError("Los eventos solo admiten sistemas individuales (no ensembles)")
+        self.events = list(events)
+        self.system = system
+        self.log = list(log or [])
+        self.counts = {event.name: sum(1 for r in self.log if r['event'] == event.name) for event in self.events}
+        self.terminated = None
+        self.previous = None
+        for event in self.events:
+            event.start(system)
+
+    def check(self, step, t, state):
+        """Evalúa los eventos en el estado del paso 'step'. Devuelve los registros nuevos."""
+        values = [event.value(self.system, state) for event in self.events]
+        records = []
+        if self.previous is not None:
+            t0, y0, values0 = self.previous
+            for event, g0, g1 in zip(self.events, values0, values):
+                crossed = (g0 < 0 <= g1) if event.direction > 0 else (g0 > 0 >= g1) if event.direction < 0 \
+                    else (g0 < 0 <= g1) or (g0 > 0 >= g1)
+                if not crossed:
+                    continue
+                g = lambda s: event.value(self.system, hermite_state(self.system, t0, y0, t, state, s))
+                t_event = find_root(g, t0, g0, t, g1, tol=1e-12 * max(abs(t), t - t0))
+                record = {'event': event.name, 't': float(t_event), 'step': int(step),
+                          'terminal': event.terminal}
+                record.update(event.details(self.system, hermite_state(self.system, t0, y0, t, state, t_event)))
+                self.counts[event.name] = self.counts.get(event.name, 0) + 1
+                if self.counts[event.name] <= event.max_records:
+                    self.log.append(record)
+                    records.append(record)
+                if event.terminal and self.terminated is None:
+                    self.terminated = record
+        self.previous = (t, np.array(state, dtype=float), values)
+        return records
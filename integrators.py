@@ -0,0 +1,426 @@
+import numpy as np
+
+
+# Tablero de Butcher de Dormand–Prince 5(4)
+DOPRI_C = np.array([0, 1/5, 3/10, 4/5, 8/9, 1])
+DOPRI_A = [
+    np.array([]),
+    np.array([1/5]),
+    np.array([3/40, 9/40]),
+    np.array([44/45, -56/15, 32/9]),
+    np.array([19372/6561, -25360/2187, 64448/6561, -212/729]),
+    np.array([9017/3168, -355/33, 46732/5247, 49/176, -5103/18656]),
+]
+DOPRI_B = np.array([35/384, 0, 500/1113, 125/192, -2187/6784, 11/84])
+
+# Diferencia entre las soluciones de orden 5 y 4 (7 etapas, la última es FSAL)
+DOPRI_E = np.array([71/57600, 0, -71/16695, 71/1920, -17253/339200, 22/525, -1/40])
+
+# Coeficientes de la salida densa de orden 4 (Shampine, 1986)
+DOPRI_P = np.array([
+    [1, -8048581381/2820520608, 8663915743/2820520608, -12715105075/11282082432],
+    [0, 0, 0, 0],
+    [0, 131558114200/32700410799, -68118460800/10900136933, 87487479700/32700410799],
+    [0, -1754552775/470086768, 14199869525/1410260304, -10690763975/1880347072],
+    [0, 127303824393/49829197408, -318862633887/49829197408, 701980252875/199316789632],
+    [0, -282668133/205662961, 2019193451/616988883, -1453857185/822651844],
+    [0, 40617522/29380423, -110615467/29380423, 69997945/29380423],
+])
+
+
+class DormandPrince45:
+    def __init__(self, fun, rtol=1e-9, atol=1e-6, max_step=np.inf,
+                 safety=0.9, min_factor=0.2, max_factor=10.0):
+        """
+        Integrador adaptativo embebido de Dormand–Prince 5(4) con salida densa.
+
+        :param fun: Función f(y, out=None) que devuelve dy/dt (sistema autónomo).
+        :param rtol: Tolerancia relativa.
+        :param atol: Tolerancia absoluta (escalar o arreglo por componente).
+        :param max_step: Paso máximo permitido.
+        """
+        self.fun = fun
+        self.rtol = rtol
+        self.atol = atol
+        self.max_step = max_step
+        self.safety = safety
+        self.min_factor = min_factor
+        self.max_factor = max_factor
+
+        self.n_accepted = 0
+        self.n_rejected = 0
+        self.n_evals = 0
+
+    def _f(self, y, out):
+        self.n_evals += 1
+        return self.fun(y, out=out)
+
+    def initialize(self, t, y, h=None):
+        """Fija la condición inicial y elige el primer paso (Hairer, Nørsett y Wanner)."""
+        self.t = float(t)
+        self.y = np.array(y, dtype=float)
+        self.K = np.empty((7,) + self.y.shape)
+        self._f(self.y, self.K[0])
+        self.t_old = self.t
+        self.y_old = self.y.copy()
+
+        if h is None:
+            h = self._initial_step()
+        self.h = min(h, self.max_step)
+
+    def _initial_step(self):
+        scale = self.atol + np.abs(self.y) * self.rtol
+        d0 = np.sqrt(np.mean((self.y / scale)**2))
+        d1 = np.sqrt(np.mean((self.K[0] / scale)**2))
+        h0 = 1e-6 if d0 < 1e-5 or d1 < 1e-5 else 0.01 * d0 / d1
+
+        f1 = self._f(self.y + h0 * self.K[0], None)
+        d2 = np.sqrt(np.mean(((f1 - self.K[0]) / scale)**2)) / h0
+        if max(d1, d2) <= 1e-15:
+            h1 = max(1e-6, h0 * 1e-3)
+        else:
+            h1 = (0.01 / max(d1, d2))**(1 / 5)
+        return min(100 * h0, h1)
+
+    def step(self):
+        """
+        Intenta un paso de tamaño self.h. Devuelve True si se aceptó.
+
+        Tras un paso aceptado, self.t/self.y avanzan y la salida densa cubre
+        el intervalo [self.t_old, self.t].
+        """
+        h = self.h
+        y, K = self.y, self.K
+
+        for s in range(1, 6):
+            dy = np.tensordot(DOPRI_A[s], K[:s], axes=1)
+            self._f(y + h * dy, K[s])
+
+        y_new = y + h * np.tensordot(DOPRI_B, K[:6], axes=1)
+        self._f(y_new, K[6])  # FSAL: primera etapa del siguiente paso
+
+        err = h * np.tensordot(DOPRI_E, K, axes=1)
+        scale = self.atol + self.rtol * np.maximum(np.abs(y), np.abs(y_new))
+        err_norm = np.sqrt(np.mean((err / scale)**2))
+
+        if err_norm <= 1.0:
+            factor = self.max_factor if err_norm == 0 else min(self.max_factor, self.safety * err_norm**(-1 / 5))
+            self.t_old, self.y_old = self.t, y
+            self._K_dense = K.copy()
+            self._h_dense = h
+            self.t += h
+            self.y = y_new
+            K[0] = K[6]
+            self.h = min(h * factor, self.max_step)
+            self.n_accepted += 1
+            return True
+
+        self.h = h * max(self.min_factor, self.safety * err_norm**(-1 / 5))
+        self.n_rejected += 1
+        if self.h < 1e-14 * max(1.0, abs(self.t)):
+            raise RuntimeError(f"Paso adaptativo demasiado pequeño en t={self.t:.6e}")
+        return False
+
+    def get_state(self):
+        """Estado interno completo (para checkpoints): al restaurarlo la integración sigue bit a bit."""
+        state = {
+            't': self.t, 'y': self.y, 'h': self.h, 'K0': self.K[0],
+            't_old': self.t_old, 'y_old': self.y_old,
+            'n_accepted': self.n_accepted, 'n_rejected': self.n_rejected, 'n_evals': self.n_evals,
+        }
+        if hasattr(self, '_K_dense'):
+            state.update(K_dense=self._K_dense, h_dense=self._h_dense)
+        return state
+
+    def set_state(self, state):
+        """Restaura un estado obtenido con get_state()."""
+        self.t = float(state['t'])
+        self.y = np.array(state['y'], dtype=float)
+        self.h = float(state['h'])
+        self.K = np.empty((7,) + self.y.shape)
+        self.K[0] = state['K0']
+        self.t_old = float(state['t_old'])
+        self.y_old = np.array(state['y_old'], dtype=float)
+        self.n_accepted = int(state['n_accepted'])
+        self.n_rejected = int(state['n_rejected'])
+        self.n_evals = int(state['n_evals'])
+        if 'K_dense' in state:
+            self._K_dense = np.array(state['K_dense'], dtype=float)
+            self._h_dense = float(state['h_dense'])
+
+    def advance_to(self, t):
+        """Da pasos aceptados hasta que el intervalo del último paso contenga t."""
+        while self.t < t:
+            self.step()
+
+    def dense(self, t):
+        """Evalúa la interpolación de orden 4 del último paso aceptado en t ∈ [t_old, t]."""
+        if t == self.t:
+            return self.y.copy()
+        x = (t - self.t_old) / self._h_dense
+        powers = np.cumprod(np.full(4, x))
+        Q = np.tensordot(DOPRI_P, powers, axes=1)
+        return self.y_old + self._h_dense * np.tensordot(Q, self._K_dense, axes=1)
+
+
+# Pesos de composición de leapfrog (Yoshida, 1990). Cada peso es un subpaso KDK
+# de tamaño w*dt; las medias patadas consecutivas comparten la misma aceleración,
+# así que cada subpaso cuesta una sola evaluación de fuerza.
+_Y4_W1 = 1 / (2 - 2**(1 / 3))
+_Y4_W0 = -2**(1 / 3) / (2 - 2**(1 / 3))
+
+_Y6_W = (-1.17767998417887, 0.235573213359357, 0.784513610477560)
+_Y6_W0 = 1 - 2 * sum(_Y6_W)
+
+SYMPLECTIC_WEIGHTS = {
+    "leapfrog": (1.0,),
+    "yoshida4": (_Y4_W1, _Y4_W0, _Y4_W1),
+    "yoshida6": _Y6_W[::-1] + (_Y6_W0,) + _Y6_W,
+}
+
+
+class InPlaceOps:
+    """Operaciones vectoriales in situ sobre arreglos de NumPy (modifican y devuelven y)."""
+
+    @staticmethod
+    def axpy(y, c, d):
+        """y + c d."""
+        y += c * d
+        return y
+
+
+class ListOps:
+    """
+    Operaciones vectoriales sobre listas de floats de Python. Con pocos cuerpos
+    cada llamada a NumPy cuesta más que su aritmética (ver scalar_backend).
+    """
+
+    @staticmethod
+    def axpy(y, c, d):
+        """y + c d."""
+        return [yi + c * di for yi, di in zip(y, d)]
+
+    @staticmethod
+    def rk4_sum(y, c, k1, k2, k3, k4):
+        """y + c (k1 + 2 (k2 + k3) + k4)."""
+        return [yi + c * (a + 2.0 * (b + e) + f) for yi, a, b, e, f in zip(y, k1, k2, k3, k4)]
+
+
+def rk4_step(f, y, dt, ops=ListOps, k1=None):
+    """
+    Paso RK4 clásico de y' = f(y) con las operaciones vectoriales de 'ops'.
+
+    :param f: Función f(y) -> dy/dt (devuelve un vector nuevo).
+    :param ops: Operaciones vectoriales (axpy y rk4_sum), ver ListOps.
+    :param k1: f(y) si ya se evaluó.
+    """
+    if k1 is None:
+        k1 = f(y)
+    k2 = f(ops.axpy(y, 0.5 * dt, k1))
+    k3 = f(ops.axpy(y, 0.5 * dt, k2))
+    k4 = f(ops.axpy(y, dt, k3))
+    # y_{n+1} = y_n + dt/6 (k1 + 2 k2 + 2 k3 + k4)
+    return ops.rk4_sum(y, dt / 6, k1, k2, k3, k4)
+
+
+def leapfrog_composition(accelerations, x, v, a, dt, weights, ops=ListOps):
+    """
+    Avanza (x, v) un paso dt con una composición de leapfrog (velocity Verlet).
+
+    'a' debe ser la aceleración en x al entrar; se devuelve (x, v, a) con la
+    aceleración en la nueva x, de modo que se reutiliza entre pasos.
+
+    :param accelerations: Función accelerations(x) -> a.
+    :param weights: Pesos de la composición (ver SYMPLECTIC_WEIGHTS).
+    :param ops: Operaciones vectoriales (ListOps o InPlaceOps).
+    """
+    for w in weights:
+        h = w * dt
+        v = ops.axpy(v, 0.5 * h, a)     # media patada
+        x = ops.axpy(x, h, v)           # deriva
+        a = accelerations(x)
+        v = ops.axpy(v, 0.5 * h, a)     # media patada
+    return x, v, a
+
+
+def symplectic_step(accelerations, x, v, a, dt, weights):
+    """
+    leapfrog_composition sobre arreglos de NumPy, modificando x, v y a in situ.
+
+    :param accelerations: Función accelerations(x, out) -> a.
+    :param weights: Pesos de la composición (ver SYMPLECTIC_WEIGHTS).
+    """
+    return leapfrog_composition(lambda x: accelerations(x, out=a), x, v, a, dt, weights, InPlaceOps)
+
+
+# Integradores regularizados: misma composición de Yoshida sobre el leapfrog del
+# hamiltoniano logarítmico (ver LogHamiltonian).
+REGULARIZED_WEIGHTS = {
+    "logh": SYMPLECTIC_WEIGHTS["leapfrog"],
+    "logh4": SYMPLECTIC_WEIGHTS["yoshida4"],
+}
+
+
+class LogHamiltonian:
+    def __init__(self, accelerations, potential, masses, weights=(1.0,)):
+        """
+        Leapfrog regularizado por transformación de tiempo (hamiltoniano logarítmico;
+        Mikkola y Tanikawa, 1999; Preto y Tremaine, 1999) con salida densa.
+
+        Se integra en un tiempo ficticio s con pasos ds fijos: las derivas avanzan
+        dt = ds/(T - E₀) y las patadas dt = ds/(-U). En un encuentro cercano -U crece
+        como 1/r, así que el paso físico se reduce en proporción a la distancia del
+        par más próximo y cada encuentro cuesta un número acotado de pasos sin
+        reducir el paso del resto de la corrida. En el problema de dos cuerpos la
+        órbita es exacta (solo hay error de fase), incluso en una colisión frontal.
+
+        Tiene la misma interfaz que DormandPrince45 (initialize, advance_to, dense,
+        get_state/set_state y contadores).
+
+        :param accelerations: Función accelerations(x) -> a, con x de forma (N, 3).
+        :param potential: Función potential(x) -> U (energía potencial total, negativa).
+        :param masses: Masas de los cuerpos (N,).
+        :param weights: Pesos de composición (ver REGULARIZED_WEIGHTS).
+        """
+        self.accelerations = accelerations
+        self.potential = potential
+        self.masses = np.asarray(masses, dtype=float)
+        self.weights = weights
+
+        self.n_accepted = 0
+        self.n_rejected = 0
+        self.n_evals = 0
+
+    def _kinetic(self, v):
+        return 0.5 * np.sum(self.masses * np.sum(v * v, axis=-1))
+
+    def _acc(self, x):
+        self.n_evals += 1
+        return self.accelerations(x)
+
+    def initialize(self, t, y, h):
+        """
+        Fija la condición inicial y elige ds para que haya en promedio un paso por cada
+        intervalo h: en un sistema ligado <-U> = 2|E₀| (teorema del virial), así que
+        ds = 2|E₀| h. Si E₀ >= 0 se usa el potencial inicial, ds = -U₀ h.
+        """
+        self.t = float(t)
+        self.y = np.array(y, dtype=float)
+        x, v = self._split(self.y)
+        U = self.potential(x)
+        self.E0 = self._kinetic(v) + U
+        self.ds = h * (2 * abs(self.E0) if self.E0 < 0 else -U)
+        self.t_old = self.t
+        self.y_old = self.y.copy()
+
+    def _split(self, y):
+        n3 = y.shape[-1] // 2
+        return y[:n3].reshape(-1, 3), y[n3:].reshape(-1, 3)
+
+    def _advance(self, t, y, ds):
+        """Una composición de leapfrogs regularizados de paso ficticio ds desde (t, y). Devuelve (t, y)."""
+        y = y.copy()
+        x, v = self._split(y)
+        for w in self.weights:
+            h = w * ds
+            dt = 0.5 * h / (self._kinetic(v) - self.E0)    # media deriva
+            x += dt * v
+            t += dt
+            dt = h / -self.potential(x)                      # patada
+            v += dt * self._acc(x)
+            dt = 0.5 * h / (self._kinetic(v) - self.E0)    # media deriva
+            x += dt * v
+            t += dt
+        return t, y
+
+    def step(self):
+        """Avanza un paso ds en tiempo ficticio (siempre se acepta)."""
+        t, y = self._advance(self.t, self.y, self.ds)
+        self.t_old, self.y_old = self.t, self.y
+        self.t, self.y = t, y
+        self.n_accepted += 1
+        return True
+
+    def get_state(self):
+        """Estado interno completo (para checkpoints): al restaurarlo la integración sigue bit a bit."""
+        return {
+            't': self.t, 'y': self.y, 't_old': self.t_old, 'y_old': self.y_old,
+            'E0': self.E0, 'ds': self.ds,
+            'n_accepted': self.n_accepted, 'n_rejected': self.n_rejected, 'n_evals': self.n_evals,
+        }
+
+    def set_state(self, state):
+        """Restaura un estado obtenido con get_state()."""
+        self.t = float(state['t'])
+        self.y = np.array(state['y'], dtype=float)
+        self.t_old = float(state['t_old'])
+        self.y_old = np.array(state['y_old'], dtype=float)
+        self.E0 = float(state['E0'])
+        self.ds = float(state['ds'])
+        self.n_accepted = int(state['n_accepted'])
+        self.n_rejected = int(state['n_rejected'])
+        self.n_evals = int(state['n_evals'])
+
+    def advance_to(self, t):
+        """Da pasos hasta que el intervalo del último paso contenga t."""
+        while self.t < t:
+            self.step()
+
+    def _guess(self, t):
+        """
+        σ inicial para dense(t): inversa de la interpolación cúbica de Hermite de t(σ)
+        con derivadas dt/dσ = ds/(-U) en los extremos del paso.
+        """
+        t0, t1 = self.t_old, self.t
+        g0 = self.ds / -self.potential(self._split(self.y_old)[0])
+        g1 = self.ds / -self.potential(self._split(self.y)[0])
+        lo, hi = 0.0, 1.0
+        sigma = (t - t0) / (t1 - t0)
+        for _ in range(30):
+            s = sigma
+            error = (2 * s**3 - 3 * s**2 + 1) * t0 + (s**3 - 2 * s**2 + s) * g0 \
+                + (-2 * s**3 + 3 * s**2) * t1 + (s**3 - s**2) * g1 - t
+            if error > 0:
+                hi = s
+            else:
+                lo = s
+            slope = (6 * s**2 - 6 * s) * (t0 - t1) + (3 * s**2 - 4 * s + 1) * g0 + (3 * s**2 - 2 * s) * g1
+            sigma = s - error / slope if slope > 0 else lo
+            if not lo < sigma < hi:
+                sigma = 0.5 * (lo + hi)
+            if abs(sigma - s) < 1e-14:
+                break
+        return sigma
+
+    def dense(self, t):
+        """
+        Estado en t ∈ [t_old, t]: se repite el último paso desde y_old con un paso
+        ficticio σ·ds, con σ tal que el tiempo físico alcanzado sea t (Newton sobre
+        t(σ), con dt/dσ = ds/(-U), y salvaguarda de bisección).
+
+        Así el estado de salida tiene la precisión del propio integrador. Una
+        interpolación en t entre los extremos no la tiene en los pasos de pericentro,
+        donde la órbita gira un ángulo grande en un paso físico muy corto; a cambio,
+        cada instante de salida cuesta una o dos composiciones más.
+        """
+        if t == self.t:
+            return self.y.copy()
+        if t == self.t_old:
+            return self.y_old.copy()
+        t0, t1 = self.t_old, self.t
+        tol = 1e-13 * max(abs(t1), t1 - t0)
+        lo, hi = 0.0, 1.0
+        sigma = self._guess(t)
+        for _ in range(50):
+            t_sigma, y = self._advance(t0, self.y_old, sigma * self.ds)
+            error = t_sigma - t
+            if abs(error) <= tol:
+                break
+            if error > 0:
+                hi = sigma
+            else:
+                lo = sigma
+            sigma -= error * -self.potential(self._split(y)[0]) / self.ds
+            if not lo < sigma < hi:
+                sigma = 0.5 * (lo + hi)
+        return y
@@ -0,0 +1,164 @@
+"""
+Backend compilado (Numba) del bucle de integración.
+
+Un bloque completo de pasos (fuerzas, etapas del integrador y diagnósticos)
+se ejecuta dentro de una sola función compilada que escribe las filas de
+salida en un arreglo preasignado. Si Numba no está instalado, las funciones
+siguen siendo Python válido (muy lento) y ThreeBodySimulator usa el camino NumPy.
+"""
+import numpy as np
+
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+    njit = numba.njit(cache=True)
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(func):
+        return func
+
+
+# Identificadores de integrador dentro del núcleo compilado
+RK4 = 0
+SYMPLECTIC = 1
+
+
+@njit
+def accelerations(state, masses, G, out):
+    """
+    Aceleraciones por suma directa, cada par una sola vez.
+
+    Lee las posiciones de state[:3N] y escribe out[3*i + c] (arreglos planos,
+    sin reshape, para que el núcleo compile con cualquier disposición de memoria).
+    """
+    n = masses.shape[0]
+    for k in range(3 * n):
+        out[k] = 0.0
+    for i in range(n):
+        for j in range(i + 1, n):
+            dx = state[3 * j] - state[3 * i]
+            dy = state[3 * j + 1] - state[3 * i + 1]
+            dz = state[3 * j + 2] - state[3 * i + 2]
+            inv_r3 = (dx * dx + dy * dy + dz * dz)**-1.5
+            fi = G * masses[j] * inv_r3
+            fj = G * masses[i] * inv_r3
+            out[3 * i] += fi * dx
+            out[3 * i + 1] += fi * dy
+            out[3 * i + 2] += fi * dz
+            out[3 * j] -= fj * dx
+            out[3 * j + 1] -= fj * dy
+            out[3 * j + 2] -= fj * dz
+
+
+@njit
+def derivatives(state, masses, G, acc, out):
+    """dy/dt del estado plano [posiciones, velocidades] (6N)."""
+    n3 = 3 * masses.shape[0]
+    accelerations(state, masses, G, acc)
+    for k in range(n3):
+        out[k] = state[n3 + k]
+        out[n3 + k] = acc[k]
+
+
+@njit
+def diagnostics(state, masses, G, row, col):
+    """Escribe E_kin, E_pot, E_tot, Lx, Ly, Lz en row[col:col + 6]."""
+    n = masses.shape[0]
+    n3 = 3 * n
+    E_kin = 0.0
+    E_pot = 0.0
+    Lx = 0.0
+    Ly = 0.0
+    Lz = 0.0
+    for i in range(n):
+        x, y, z = state[3 * i], state[3 * i + 1], state[3 * i + 2]
+        vx, vy, vz = state[n3 + 3 * i], state[n3 + 3 * i + 1], state[n3 + 3 * i + 2]
+        E_kin += 0.5 * masses[i] * (vx * vx + vy * vy + vz * vz)
+        Lx += masses[i] * (y * vz - z * vy)
+        Ly += masses[i] * (z * vx - x * vz)
+        Lz += masses[i] * (x * vy - y * vx)
+        for j in range(i + 1, n):
+            dx = state[3 * j] - x
+            dy = state[3 * j + 1] - y
+            dz = state[3 * j + 2] - z
+            E_pot -= G * masses[i] * masses[j] / np.sqrt(dx * dx + dy * dy + dz * dz)
+    row[col] = E_kin
+    row[col + 1] = E_pot
+    row[col + 2] = E_kin + E_pot
+    row[col + 3] = Lx
+    row[col + 4] = Ly
+    row[col + 5] = Lz
+
+
+@njit
+def run_block(kind, state, masses, G, dt, time, first_step, n_steps, total_steps,
+              output_every, diagnostics_every, weights, out):
+    """
+    Avanza 'n_steps' pasos desde el paso global 'first_step' escribiendo filas en 'out'.
+
+    Misma convención que ThreeBodySimulator.simulate: en cada paso k con
+    k % output_every == 0 se escribe la fila (t, estado, diagnósticos) antes de
+    avanzar; los diagnósticos van en las filas con (k // output_every) %
+    diagnostics_every == 0 y NaN en el resto. El estado se modifica in situ y
+    no se avanza tras el último paso global.
+
+    :param kind: RK4 o SYMPLECTIC (composición de leapfrog con 'weights').
+    :return: (filas escritas, tiempo tras el bloque)
+    """
+    n3 = 3 * masses.shape[0]
+    n6 = 2 * n3
+    acc = np.empty(n3)
+    k1 = np.empty(n6)
+    k2 = np.empty(n6)
+    k3 = np.empty(n6)
+    k4 = np.empty(n6)
+    tmp = np.empty(n6)
+
+    if kind == SYMPLECTIC:
+        accelerations(state, masses, G, acc)
+
+    rows = 0
+    for i in range(n_steps):
+        k = first_step + i
+        if k % output_every == 0:
+            row = out[rows]
+            row[0] = time
+            for m in range(n6):
+                row[1 + m] = state[m]
+            if (k // output_every) % diagnostics_every == 0:
+                diagnostics(state, masses, G, row, 1 + n6)
+            else:
+                for m in range(1 + n6, row.shape[0]):
+                    row[m] = np.nan
+            rows += 1
+
+        if k == total_steps - 1:
+            break
+
+        if kind == RK4:
+            derivatives(state, masses, G, acc, k1)
+            for m in range(n6):
+                tmp[m] = state[m] + 0.5 * dt * k1[m]
+            derivatives(tmp, masses, G, acc, k2)
+            for m in range(n6):
+                tmp[m] = state[m] + 0.5 * dt * k2[m]
+            derivatives(tmp, masses, G, acc, k3)
+            for m in range(n6):
+                tmp[m] = state[m] + dt * k3[m]
+            derivatives(tmp, masses, G, acc, k4)
+            for m in range(n6):
+                state[m] += dt / 6 * (k1[m] + 2.0 * (k2[m] + k3[m]) + k4[m])
+        else:
+            for w in weights:
+                h = w * dt
+                for m in range(n3):
+                    state[n3 + m] += 0.5 * h * acc[m]      # media patada
+                for m in range(n3):
+                    state[m] += h * state[n3 + m]          # deriva
+                accelerations(state, masses, G, acc)
+                for m in range(n3):
+                    state[n3 + m] += 0.5 * h * acc[m]      # media patada
+        time += dt
+
+    return rows, time
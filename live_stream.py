@@ -0,0 +1,250 @@
+import argparse
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from config_loader import load_config, validate_config
+from three_body_system import run_config
+from animate import ThreeBodyAnimation
+
+
+# Bloque de control al inicio de la memoria compartida (int64):
+#   [0] secuencia del seqlock (impar mientras el productor escribe)
+#   [1] frames publicados en total
+#   [2] capacidad del anillo (frames)
+#   [3] ancho de cada frame (valores float64)
+#   [4] 1 cuando el productor ha terminado
+CONTROL_SLOTS = 8
+SEQUENCE, COUNT, CAPACITY, WIDTH, FINISHED = range(5)
+
+
+class RingBuffer:
+    def __init__(self, shm, owner=False):
+        """
+        Anillo de frames de tamaño fijo en memoria compartida, con un productor y lectores.
+
+        El productor nunca espera a los lectores: escribe sobre los frames más antiguos
+        y los lectores que se queden atrás pierden frames (y lo saben). La coherencia
+        se garantiza con un seqlock: el productor incrementa la secuencia antes y
+        después de escribir, y un lector repite la lectura si la secuencia era impar o
+        cambió mientras copiaba.
+
+        Usar RingBuffer.create() en el proceso que lo posee y RingBuffer.attach(nombre)
+        en los demás.
+        """
+        self.shm = shm
+        self.owner = owner
+        self.control = np.ndarray((CONTROL_SLOTS,), dtype=np.int64, buffer=shm.buf)
+        self.capacity = int(self.control[CAPACITY])
+        self.width = int(self.control[WIDTH])
+        self.frames = np.ndarray((self.capacity, self.width), dtype=np.float64, buffer=shm.buf,
+                                 offset=CONTROL_SLOTS * 8)
+
+    @classmethod
+    def create(cls, capacity, width):
+        """Reserva un anillo nuevo de 'capacity' frames de 'width' valores."""
+        if capacity < 1 or width < 1:
+            raise ValueError("La capacidad y el ancho del anillo deben ser positivos")
+        shm = shared_memory.SharedMemory(create=True, size=8 * (CONTROL_SLOTS + capacity * width))
+        control = np.ndarray((CONTROL_SLOTS,), dtype=np.int64, buffer=shm.buf)
+        control[:] = 0
+        control[CAPACITY] = capacity
+        control[WIDTH] = width
+        del control
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        return cls(shared_memory.SharedMemory(name=name))
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def count(self):
+        return int(self.control[COUNT])
+
+    @property
+    def finished(self):
+        return bool(self.control[FINISHED])
+
+    def publish(self, frames):
+        """Añade frames (k, width) al anillo (solo el productor)."""
+        frames = np.asarray(frames, dtype=np.float64).reshape(-1, self.width)
+        k = len(frames)
+        if not k:
+            return
+        # Si hay más frames que capacidad solo caben los últimos (los demás cuentan como perdidos)
+        count = int(self.control[COUNT]) + k
+        kept = frames[-self.capacity:]
+        slots = (count - len(kept) + np.arange(len(kept))) % self.capacity
+        self.control[SEQUENCE] += 1
+        self.frames[slots] = kept
+        self.control[COUNT] = count
+        self.control[SEQUENCE] += 1
+
+    def finish(self):
+        """Marca el fin de la corrida (los lectores dejan de esperar frames nuevos)."""
+        self.control[SEQUENCE] += 1
+        self.control[FINISHED] = 1
+        self.control[SEQUENCE] += 1
+
+    def read(self, start, out):
+        """
+        Copia a 'out' los frames publicados desde el número 'start'.
+
+        Si el lector se ha quedado más de una vuelta atrás, empieza por el frame más
+        antiguo que sigue en el anillo. Devuelve (frames leídos, número del siguiente
+        frame por leer, frames perdidos); los frames leídos son una vista de 'out'.
+        """
+        while True:
+            sequence = int(self.control[SEQUENCE])
+            if sequence & 1:
+                continue
+            count = int(self.control[COUNT])
+            first = max(start, count - self.capacity)
+            n = min(count - first, len(out))
+            slots = (first + np.arange(n)) % self.capacity
+            np.take(self.frames, slots, axis=0, out=out[:n])
+            if int(self.control[SEQUENCE]) == sequence:
+                return out[:n], first + n, first - start
+
+    def close(self):
+        """Libera la memoria compartida (y la elimina si este proceso la creó)."""
+        self.control = self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class RingReader:
+    def __init__(self, ring, max_frames=1024):
+        """
+        Lector de un RingBuffer con interfaz de flujo para ThreeBodyAnimation.
+
+        poll() devuelve los frames nuevos como (tiempos, posiciones (k, n_cuerpos, 3),
+        energías): vistas de un buffer de lectura preasignado, que se reutiliza en
+        cada llamada (no se guarda historial ni se serializa nada).
+
+        :param max_frames: Frames como máximo por llamada a poll().
+        """
+        self.ring = ring
+        self.n_bodies = (ring.width - 2) // 3
+        self.next = 0
+        self.lost = 0
+        self.buffer = np.empty((max_frames, ring.width))
+
+    @property
+    def finished(self):
+        return self.ring.finished and self.next >= self.ring.count
+
+    def poll(self):
+        frames, self.next, lost = self.ring.read(self.next, self.buffer)
+        self.lost += lost
+        return frames[:, 0], frames[:, 1:-1].reshape(len(frames), self.n_bodies, 3), frames[:, -1]
+
+
+class LivePublisher:
+    def __init__(self, ring, stride=1):
+        """
+        Analizador para ThreeBodySimulator.simulate(analyzers=[...]) que publica en
+        un RingBuffer una de cada 'stride' filas escritas: tiempo, posiciones y E_tot.
+
+        Recibe los bloques de filas del escritor justo antes de guardarlos, así que
+        la integración no espera nunca al lector; la latencia es la de un bloque
+        (ver el parámetro block_rows de simulate()).
+        """
+        self.ring = ring
+        self.stride = max(int(stride), 1)
+
+    def start(self, header):
+        if len(header.get('row_shape', [1])) != 1:
+            raise ValueError("El modo en vivo solo admite sistemas individuales (no ensembles)")
+        columns = header['columns']
+        n_bodies = sum(1 for name in columns if name[0] == 'x' and name[1:].isdigit())
+        if self.ring.width != 3 * n_bodies + 2:
+            raise ValueError(f"El anillo tiene frames de {self.ring.width} valores; "
+                             f"se necesitan {3 * n_bodies + 2} para {n_bodies} cuerpos")
+        self.columns = [columns.index('t')]
+        self.columns += [columns.index(f'{c}{i}') for i in range(1, n_bodies + 1) for c in 'xyz']
+        self.columns.append(columns.index('E_tot'))
+        self.rows = 0
+
+    def update(self, rows):
+        first = -self.rows % self.stride
+        self.rows += len(rows)
+        self.ring.publish(rows[first::self.stride, self.columns])
+
+
+def frame_width(n_bodies):
+    """Valores por frame del anillo: tiempo, posiciones y energía total."""
+    return 3 * n_bodies + 2
+
+
+def run_publisher(config, ring_name, stride, block_rows):
+    """Proceso productor: ejecuta la simulación publicando frames en el anillo 'ring_name'."""
+    ring = RingBuffer.attach(ring_name)
+    try:
+        run_config(config, analyzers=[LivePublisher(ring, stride)], block_rows=block_rows)
+    finally:
+        ring.finish()
+        ring.close()
+
+
+def run_live(config, stride=10, capacity=4096, block_rows=256, animation_options=None):
+    """
+    Ejecuta una simulación en otro proceso y la anima en vivo desde este.
+
+    El simulador escribe data/{filename}.trj como siempre y publica una de cada
+    'stride' filas en un anillo de 'capacity' frames en memoria compartida; la
+    animación (ThreeBodyAnimation en modo en vivo) lee los frames nuevos en cada
+    refresco. Al cerrar la ventana se espera a que termine la simulación.
+    """
+    config = validate_config(config)
+    ring = RingBuffer.create(capacity, frame_width(len(config['masses'])))
+    process = multiprocessing.Process(target=run_publisher, args=(config, ring.name, stride, block_rows))
+    process.start()
+    try:
+        reader = RingReader(ring)
+        extent = np.max(np.abs(config['initial_positions']))
+        animation = ThreeBodyAnimation(None, stream=reader, extent=extent, **(animation_options or {}))
+        animation.animate()
+        if process.is_alive():
+            print("Ventana cerrada; esperando a que termine la simulación...")
+        process.join()
+        if reader.lost:
+            print(f"La animación no alcanzó al simulador: {reader.lost} frames omitidos")
+    finally:
+        if process.is_alive():
+            process.terminate()
+            process.join()
+        ring.close()
+    return process.exitcode
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Animación en vivo de una simulación en curso')
+    parser.add_argument('--config', type=str, required=True, help='Archivo de configuración (.json o .yaml)')
+    parser.add_argument('--stride', type=int, default=10, help='Publicar una de cada N filas escritas')
+    parser.add_argument('--capacity', type=int, default=4096, help='Frames del anillo en memoria compartida')
+    parser.add_argument('--block_rows', type=int, default=256,
+                        help='Filas por bloque de escritura (latencia de la animación)')
+    parser.add_argument('--names', nargs='+', type=str, default=['Sun', 'Earth', 'Moon'],
+                        help='Nombres de los cuerpos')
+    parser.add_argument('--colors', nargs='+', type=str, default=['orange', 'blue', 'gray'],
+                        help='Colores para cada cuerpo')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[150, 30, 15],
+                        help='Tamaños de los marcadores (enteros)')
+    parser.add_argument('--trail', type=int, default=100, help='Longitud del rastro de trayectoria')
+    parser.add_argument('--interval', type=int, default=50, help='Intervalo entre refrescos en ms')
+    parser.add_argument('--projection', type=str, default='3d', choices=['3d', 'xy', 'xz', 'yz'],
+                        help='Vista 3D o proyección 2D')
+
+    args = parser.parse_args()
+    options = dict(body_names=args.names, colors=args.colors, sizes=args.sizes, trail_length=args.trail,
+                   interval=args.interval, projection=args.projection)
+    exitcode = run_live(load_config(args.config), stride=args.stride, capacity=args.capacity,
+                        block_rows=args.block_rows, animation_options=options)
+    raise SystemExit(exitcode)
@@ -2,22 +2,100 @@ import numpy as np
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import shutil
+from trajectory_io import load_columns, read_header, trajectory_path
+from result_cache import DEFAULT_CACHE_DIR, cached_derived
+
+
+SAVE_DPI = 300
+ARC_PIXELS = 2  # píxeles de longitud de arco por punto en las trayectorias 3D
+
+
+def lod_indices(columns, n_buckets):
+    """
+    Índices de filas que conservan el mínimo y el máximo de cada columna por tramo.
+
+    Las filas se reparten en 'n_buckets' tramos consecutivos; de cada tramo se
+    guardan las filas del mínimo y del máximo de cada columna (más la primera y
+    la última fila). Con un tramo por píxel el trazo resultante es visualmente
+    igual al completo y los extremos (picos de energía, pericentros) se conservan
+    exactamente. Los NaN se ignoran al buscar extremos.
+    """
+    n = len(columns[0])
+    if n <= 4 * n_buckets:
+        return np.arange(n)
+
+    size = -(-n // n_buckets)
+    keep = [np.array([0, n - 1])]
+    offsets = np.arange(n_buckets)[:, None] * size
+    for column in columns:
+        column = np.asarray(column)
+        padded = np.pad(column, (0, n_buckets * size - n), mode='edge').reshape(n_buckets, size)
+        nan = np.isnan(padded)
+        keep.append(np.argmin(np.where(nan, np.inf, padded), axis=1) + offsets[:, 0])
+        keep.append(np.argmax(np.where(nan, -np.inf, padded), axis=1) + offsets[:, 0])
+    return np.unique(np.minimum(np.concatenate(keep), n - 1))
+
+
+def arc_length_indices(columns, step):
+    """
+    Índices de filas de una curva paramétrica espaciadas 'step' a lo largo de su longitud.
+
+    Para trayectorias (x, y, z) los extremos por tramo de tiempo no bastan: una
+    órbita completa puede caer dentro de un tramo. Se conserva la primera fila tras
+    cada múltiplo de 'step' de longitud de arco acumulada, así que cada cuerda
+    sustituye a un arco de longitud 'step' (del orden de un píxel).
+    """
+    points = np.column_stack(columns)
+    length = np.concatenate([[0.0], np.cumsum(np.linalg.norm(np.diff(points, axis=0), axis=1))])
+    level = np.floor(length / step)
+    keep = np.flatnonzero(np.diff(level) > 0) + 1
+    return np.unique(np.concatenate([[0], keep, [len(points) - 1]]))
+
+
+def figure_buckets(fig, lod):
+    """Tramos de decimación para una figura: su ancho en píxeles al guardarla (None sin LOD)."""
+    return int(fig.get_figwidth() * SAVE_DPI) if lod else None
+
+
+def decimate(columns, n_buckets):
+    """Aplica lod_indices a un conjunto de columnas que comparten eje (sin copiar si no hace falta)."""
+    if n_buckets is None:
+        return columns
+    idx = lod_indices(columns, n_buckets)
+    if len(idx) == len(columns[0]):
+        return columns
+    return [np.asarray(column)[idx] for column in columns]
 
 
 def plot_3d_trajectories(data, body_names=['Body 1', 'Body 2', 'Body 3'], 
                          colors=['Orange', 'blue', 'gray'],
                          body_sizes=[150, 30, 15],
                          inital_final = False,
-                         show=False, save=False, filename="three_body_simulation"):
+                         show=False, save=False, filename="three_body_simulation", lod=True):
     """
     Grafica las trayectorias 3D de los tres cuerpos.    
+    
+    Con lod=True cada trayectoria se reduce a un punto cada ARC_PIXELS píxeles de
+    longitud de arco (escala: el mayor rango de coordenadas entre el ancho de la
+    figura guardada).
     """
     fig = plt.figure(figsize=(14, 10))
     ax = fig.add_subplot(111, projection='3d')
+    buckets = figure_buckets(fig, lod)
     
-    # Trayectorias
+    # Trayectorias (con LOD, espaciadas a lo largo de la longitud de arco)
+    if buckets is not None:
+        n = min(len(body_names), count_bodies(data))
+        scale = max(np.ptp(data[f'{c}{k}']) for c in 'xyz' for k in range(1, n + 1))
     for i, (color, name) in enumerate(zip(colors, body_names), 1):
-        ax.plot(data[f'x{i}'], data[f'y{i}'], data[f'z{i}'], 
+        x, y, z = data[f'x{i}'], data[f'y{i}'], data[f'z{i}']
+        if buckets is not None and len(x) > 4 * buckets:
+            idx = arc_length_indices([x, y, z], ARC_PIXELS * scale / buckets)
+            x, y, z = x[idx], y[idx], z[idx]
+        ax.plot(x, y, z, 
                 color=color, linewidth=1.5, label=f'{name} Trajectory')
     
     # Posiciones iniciales y finales
@@ -42,7 +120,7 @@ def plot_3d_trajectories(data, body_names=['Body 1', 'Body 2', 'Body 3'],
     if save:
         os.makedirs("plots", exist_ok=True)
         imname = f"_{filename}" if filename else ""
-        plt.savefig(f"plots/trayectorias_3d{imname}.png", dpi=300, bbox_inches='tight')
+        plt.savefig(f"plots/trayectorias_3d{imname}.png", dpi=SAVE_DPI, bbox_inches='tight')
         print(f"Gráfico guardado en plots/trayectorias_3d{imname}.png")
     
     if show:
@@ -50,25 +128,30 @@ def plot_3d_trajectories(data, body_names=['Body 1', 'Body 2', 'Body 3'],
     
     plt.close()
 
-def plot_energy_momentum(data, body_names=['Sun', 'Earth', 'Moon'], show=False, save=False, filename=""):
-    """Grafica energías y momento angular del sistema."""
+def plot_energy_momentum(data, body_names=['Sun', 'Earth', 'Moon'], show=False, save=False, filename="",
+                         lod=True):
+    """Grafica energías y momento angular del sistema (con lod=True, decimado min/max por píxel)."""
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10), sharex=True)
+    buckets = figure_buckets(fig, lod)
     
     # Energías
-    ax1.plot(data['time'], data['E_kin'], 'b-', label='Kinetic Energy', linewidth=1.5)
-    ax1.plot(data['time'], data['E_pot'], 'r-', label='Potential Energy', linewidth=1.5)
-    ax1.plot(data['time'], data['E_tot'], 'g--', label='Total Energy', linewidth=2.0)
+    time, E_kin, E_pot, E_tot = decimate([data['time'], data['E_kin'], data['E_pot'], data['E_tot']], buckets)
+    ax1.plot(time, E_kin, 'b-', label='Kinetic Energy', linewidth=1.5)
+    ax1.plot(time, E_pot, 'r-', label='Potential Energy', linewidth=1.5)
+    ax1.plot(time, E_tot, 'g--', label='Total Energy', linewidth=2.0)
     
     ax1.set_ylabel('Energy (J)')
     ax1.set_title(f'Energy and Angular Momentum Conservation\nSystem: {", ".join(body_names)}')
     ax1.legend()
     ax1.grid(True, linestyle='--', alpha=0.6)
     
-    # Momento Angular
-    ax2.plot(data['time'], data['Lx'], 'c-', label='Lx', linewidth=1.0)
-    ax2.plot(data['time'], data['Ly'], 'm-', label='Ly', linewidth=1.0)
-    ax2.plot(data['time'], data['Lz'], 'y-', label='Lz', linewidth=1.0)
-    ax2.plot(data['time'], np.sqrt(data['Lx']**2 + data['Ly']**2 + data['Lz']**2), 
+    # Momento Angular (|L| se calcula antes de decimar para conservar sus extremos)
+    L = np.sqrt(data['Lx']**2 + data['Ly']**2 + data['Lz']**2)
+    time, Lx, Ly, Lz, L = decimate([data['time'], data['Lx'], data['Ly'], data['Lz'], L], buckets)
+    ax2.plot(time, Lx, 'c-', label='Lx', linewidth=1.0)
+    ax2.plot(time, Ly, 'm-', label='Ly', linewidth=1.0)
+    ax2.plot(time, Lz, 'y-', label='Lz', linewidth=1.0)
+    ax2.plot(time, L, 
              'k--', label='|L|', linewidth=2.0)
     
     ax2.set_xlabel('Time (s)')
@@ -81,7 +164,7 @@ def plot_energy_momentum(data, body_names=['Sun', 'Earth', 'Moon'], show=False,
     if save:
         os.makedirs("plots", exist_ok=True)
         imname = f"_{filename}" if filename else ""
-        plt.savefig(f"plots/energia_momento{imname}.png", dpi=300, bbox_inches='tight')
+        plt.savefig(f"plots/energia_momento{imname}.png", dpi=SAVE_DPI, bbox_inches='tight')
         print(f"Gráfico guardado en plots/energia_momento{imname}.png")
     
     if show:
@@ -90,18 +173,21 @@ def plot_energy_momentum(data, body_names=['Sun', 'Earth', 'Moon'], show=False,
     plt.close()
 
 
-def plot_relative_distances(data, body_names=['Sun', 'Earth', 'Moon'], show=False, save=False, filename=""):
-    """Grafica las distancias relativas entre los cuerpos."""
-    plt.figure(figsize=(12, 6))
+def plot_relative_distances(data, body_names=['Sun', 'Earth', 'Moon'], show=False, save=False, filename="",
+                            lod=True):
+    """Grafica las distancias relativas entre los cuerpos (con lod=True, decimado min/max por píxel)."""
+    fig = plt.figure(figsize=(12, 6))
+    buckets = figure_buckets(fig, lod)
     
-    # Calcular distancias
-    r12 = np.sqrt((data['x1']-data['x2'])**2 + (data['y1']-data['y2'])**2 + (data['z1']-data['z2'])**2)
-    r13 = np.sqrt((data['x1']-data['x3'])**2 + (data['y1']-data['y3'])**2 + (data['z1']-data['z3'])**2)
-    r23 = np.sqrt((data['x2']-data['x3'])**2 + (data['y2']-data['y3'])**2 + (data['z2']-data['z3'])**2)
-    
-    plt.plot(data['time'], r12, 'r-', label=f'{body_names[0]}-{body_names[1]} Distance', linewidth=1.5)
-    plt.plot(data['time'], r13, 'g-', label=f'{body_names[0]}-{body_names[2]} Distance', linewidth=1.5)
-    plt.plot(data['time'], r23, 'b-', label=f'{body_names[1]}-{body_names[2]} Distance', linewidth=1.5)
+    # Calcular distancias (un trazo por cada par de cuerpos con nombre)
+    colors = ['r-', 'g-', 'b-']
+    n = min(len(body_names), count_bodies(data))
+    pairs = [(i, j) for i in range(1, n + 1) for j in range(i + 1, n + 1)]
+    for k, (i, j) in enumerate(pairs):
+        rij = np.sqrt((data[f'x{i}']-data[f'x{j}'])**2 + (data[f'y{i}']-data[f'y{j}'])**2 + (data[f'z{i}']-data[f'z{j}'])**2)
+        time, rij = decimate([data['time'], rij], buckets)
+        plt.plot(time, rij, colors[k] if k < len(colors) else '-',
+                 label=f'{body_names[i-1]}-{body_names[j-1]} Distance', linewidth=1.5)
     
     plt.xlabel('Time (s)')
     plt.ylabel('Distance (m)')
@@ -112,7 +198,7 @@ def plot_relative_distances(data, body_names=['Sun', 'Earth', 'Moon'], show=Fals
     if save:
         os.makedirs("plots", exist_ok=True)
         imname = f"_{filename}" if filename else ""
-        plt.savefig(f"plots/distancias{imname}.png", dpi=300, bbox_inches='tight')
+        plt.savefig(f"plots/distancias{imname}.png", dpi=SAVE_DPI, bbox_inches='tight')
         print(f"Gráfico guardado en plots/distancias{imname}.png")
     
     if show:
@@ -121,27 +207,150 @@ def plot_relative_distances(data, body_names=['Sun', 'Earth', 'Moon'], show=Fals
     plt.close()
 
 
-def load_simulation_data(filename="three_body_simulation"):
+def count_bodies(data):
+    """Número de cuerpos presentes en un diccionario de datos (columnas x1, x2, ...)."""
+    n = 0
+    while f'x{n + 1}' in data:
+        n += 1
+    return n
+
 
-    filepath = f"data/{filename}.dat"
-    if not os.path.exists(filepath):
-        raise FileNotFoundError(f"No se encontró el archivo {filepath}")
+def load_simulation_data(filename="three_body_simulation", member=None):
+    """
+    Carga todas las columnas de una corrida.
     
-    # Cargar datos
-    data = np.loadtxt(filepath, comments='#')
-    
-    # Diccionario con los datos organizados
-    return {
-        'time': data[:, 0],
-        'x1': data[:, 1], 'y1': data[:, 2], 'z1': data[:, 3],
-        'x2': data[:, 4], 'y2': data[:, 5], 'z2': data[:, 6],
-        'x3': data[:, 7], 'y3': data[:, 8], 'z3': data[:, 9],
-        'vx1': data[:, 10], 'vy1': data[:, 11], 'vz1': data[:, 12],
-        'vx2': data[:, 13], 'vy2': data[:, 14], 'vz2': data[:, 15],
-        'vx3': data[:, 16], 'vy3': data[:, 17], 'vz3': data[:, 18],
-        'E_kin': data[:, 19], 'E_pot': data[:, 20], 'E_tot': data[:, 21],
-        'Lx': data[:, 22], 'Ly': data[:, 23], 'Lz': data[:, 24]
-    }
+    Prefiere data/{filename}.trj (mapeado en memoria, sin copias) y recurre
+    al .dat de texto si no existe. 'member' selecciona una réplica de un ensemble.
+    """
+    return load_columns(filename, member=member)
+
+
+def figure_paths(filename):
+    """PNG que generan las tres figuras de una corrida (subdirectorios aplanados con '_')."""
+    imname = filename.replace(os.sep, "_").replace("/", "_")
+    return imname, [f"plots/{prefix}_{imname}.png" for prefix in ("trayectorias_3d", "energia_momento", "distancias")]
+
+
+def discover_runs(data_dir="data"):
+    """
+    Nombres base (relativos a data/, sin extensión) de las corridas guardadas en data_dir.
+
+    Recorre data_dir recursivamente (incluidos los barridos en data/sweeps/, pero no
+    la caché de resultados). Si
+    una corrida tiene .trj y .dat se cuenta una vez. Se omiten los archivos de
+    ensemble, cuyas filas contienen varias réplicas.
+    """
+    runs = {}
+    cache_dir = os.path.abspath(DEFAULT_CACHE_DIR)
+    for root, dirs, files in os.walk(data_dir):
+        # Las corridas de la caché (data/cache/<clave>/run.trj) son copias, no corridas nuevas
+        dirs[:] = [name for name in dirs if os.path.abspath(os.path.join(root, name)) != cache_dir]
+        for name in files:
+            base, ext = os.path.splitext(name)
+            if ext not in (".trj", ".dat"):
+                continue
+            # Los nombres se resuelven como data/{filename} (igual que load_simulation_data)
+            filename = os.path.relpath(os.path.join(root, base), "data")
+            path = trajectory_path(filename)
+            if filename in runs or not os.path.exists(path):
+                continue
+            if path.endswith(".trj"):
+                header = read_header(path)[0]
+                if len(header['row_shape']) != 1 or 'x1' not in header['columns']:
+                    continue  # ensembles y resúmenes de ensemble
+            runs[filename] = path
+    return runs
+
+
+def is_up_to_date(filename, data_path):
+    """True si las tres figuras existen y son más recientes que el archivo de datos."""
+    data_time = os.path.getmtime(data_path)
+    return all(os.path.exists(path) and os.path.getmtime(path) >= data_time
+               for path in figure_paths(filename)[1])
+
+
+def render_run(filename, body_names=['Sun', 'Earth', 'Moon'], body_sizes=None):
+    """
+    Carga una corrida una sola vez y guarda sus tres figuras (proceso trabajador, backend Agg).
+
+    :return: (filename, {etapa: segundos})
+    """
+    plt.switch_backend('Agg')
+    timings = {}
+    start = time.perf_counter()
+    data = load_simulation_data(filename)
+    timings['carga'] = time.perf_counter() - start
+
+    n = count_bodies(data)
+    names = list(body_names[:n]) + [f'Body {i}' for i in range(len(body_names) + 1, n + 1)]
+    imname = figure_paths(filename)[0]
+    for stage, plot in (("trayectorias", plot_3d_trajectories), ("energia", plot_energy_momentum),
+                        ("distancias", plot_relative_distances)):
+        t0 = time.perf_counter()
+        if plot is plot_3d_trajectories:
+            plot(data, body_names=names, body_sizes=body_sizes, save=True, filename=imname)
+        else:
+            plot(data, body_names=names, save=True, filename=imname)
+        timings[stage] = time.perf_counter() - t0
+    timings['total'] = time.perf_counter() - start
+    return filename, timings
+
+
+def render_cached(filename, body_names=['Sun', 'Earth', 'Moon'], body_sizes=None):
+    """
+    render_run a través de la caché de resultados (result_cache.py).
+
+    Si la corrida tiene clave de caché y sus figuras con estas opciones (y este
+    plotting.py) ya se generaron, se copian a plots/ sin cargar los datos.
+
+    :return: (filename, {etapa: segundos})
+    """
+    start = time.perf_counter()
+    timings = {}
+
+    def produce(directory):
+        timings.update(render_run(filename, body_names, body_sizes)[1])
+        return figure_paths(filename)[1]
+
+    options = {'body_names': list(body_names), 'body_sizes': body_sizes, 'dpi': SAVE_DPI}
+    with cached_derived(filename, "figures", options, produce, sources=("plotting.py",)) as (directory, hit):
+        if hit:
+            os.makedirs("plots", exist_ok=True)
+            for path in figure_paths(filename)[1]:
+                shutil.copyfile(os.path.join(directory, os.path.basename(path)), path)
+            timings = {'caché': time.perf_counter() - start}
+    return filename, timings
+
+
+def plot_batch(data_dir="data", workers=None, force=False, body_names=['Sun', 'Earth', 'Moon'], body_sizes=None):
+    """
+    Genera las figuras de todas las corridas de data_dir en un ProcessPoolExecutor.
+
+    Las corridas cuyas figuras ya son más recientes que sus datos se saltan
+    (reconstrucción incremental) salvo con force=True.
+    """
+    runs = discover_runs(data_dir)
+    pending = sorted(name for name, path in runs.items() if force or not is_up_to_date(name, path))
+    print(f"{len(runs)} corridas en {data_dir}/: {len(runs) - len(pending)} al día, {len(pending)} por graficar")
+    if not pending:
+        return {}
+
+    results = {}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(render_cached, name, body_names, body_sizes): name for name in pending}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                _, timings = future.result()
+            except Exception as exc:
+                print(f"  {name}: error ({exc!r})")
+                continue
+            results[name] = timings
+            print(f"  {name}: " + ", ".join(f"{stage} {seconds:.2f} s" for stage, seconds in timings.items()))
+
+    print(f"Figuras de {len(results)} corridas generadas en {time.perf_counter() - start:.1f} s")
+    return results
 
 if __name__ == "__main__":
     import argparse
@@ -149,17 +358,35 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Visualización del problema de tres cuerpos")
     parser.add_argument("--filename", type=str, default="sun_earth_moon_test",
                        help="Nombre base del archivo de datos (sin extensión)")
-    parser.add_argument("--bodies", nargs=3, type=str, default=['Sun', 'Earth', 'Moon'],
-                       help="Nombres de los cuerpos (3 nombres separados por espacios)")
-    parser.add_argument("--sizes", nargs=3, type=int, default=None,
-                       help="Tamaños de los marcadores (3 valores enteros)")
+    parser.add_argument("--bodies", nargs='+', type=str, default=['Sun', 'Earth', 'Moon'],
+                       help="Nombres de los cuerpos (separados por espacios)")
+    parser.add_argument("--sizes", nargs='+', type=int, default=None,
+                       help="Tamaños de los marcadores (valores enteros)")
     parser.add_argument("--save",
                         default=True,
                         action="store_true",
                         help="Guardar gráficos en lugar de mostrarlos")
+    parser.add_argument("--all", action="store_true",
+                        help="Graficar todas las corridas de --data_dir en paralelo (solo las desactualizadas)")
+    parser.add_argument("--data_dir", type=str, default="data", help="Directorio de datos para --all")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Procesos para --all (por defecto todos los núcleos)")
+    parser.add_argument("--force", action="store_true",
+                        help="Con --all, regenerar también las figuras al día")
     
     args = parser.parse_args()
     
+    if args.all:
+        plot_batch(args.data_dir, workers=args.workers, force=args.force,
+                   body_names=args.bodies, body_sizes=args.sizes)
+        raise SystemExit
+    
+    if args.save:
+        _, timings = render_cached(args.filename, body_names=args.bodies, body_sizes=args.sizes)
+        if 'caché' in timings:
+            print(f"Figuras de '{args.filename}' recuperadas de la caché")
+        raise SystemExit
+    
     # Cargar datos
     data = load_simulation_data(args.filename)
     
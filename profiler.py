@@ -0,0 +1,140 @@
+import time
+import itertools
+
+
+class Profiler:
+    def __init__(self, progress_every=0.0):
+        """
+        Instrumentación opcional del bucle de simulación: tiempos y contadores por fase.
+
+        Las fases se miden envolviendo métodos de instancia con patch() (p. ej. las
+        aceleraciones del sistema o el flush del escritor) y el iterador de estados
+        con iterate(); al salir del bloque 'with' se restauran los métodos originales.
+        Sin Profiler no se envuelve nada, así que desactivado no cuesta nada.
+
+        Los tiempos son exclusivos: el de una fase no incluye el de las fases que se
+        llaman desde ella (las fuerzas evaluadas dentro de un paso RK cuentan como
+        'fuerzas' y no como 'integración').
+
+        :param progress_every: Segundos entre líneas de progreso con ETA (0 las desactiva).
+        """
+        self.progress_every = progress_every
+        self.phases = {}
+        self.counters = {}
+        self._stack = []
+        self._patches = []
+        self.start = self.end = None
+        self._last_progress = None
+
+    def __enter__(self):
+        self.start = self._last_progress = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.end = time.perf_counter()
+        self.restore()
+
+    def wrap(self, phase, function):
+        """Devuelve function envuelta para acumular llamadas y tiempo en 'phase'."""
+        stats = self.phases.setdefault(phase, {'calls': 0, 'time': 0.0, 'max': 0.0})
+        stack = self._stack
+        clock = time.perf_counter
+
+        def timed(*args, **kwargs):
+            stack.append(0.0)
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = clock() - start
+                nested = stack.pop()
+                stats['calls'] += 1
+                stats['time'] += elapsed - nested
+                if elapsed > stats['max']:
+                    stats['max'] = elapsed
+                if stack:
+                    stack[-1] += elapsed
+
+        return timed
+
+    def patch(self, obj, name, phase):
+        """Sustituye obj.name por su versión medida en 'phase' hasta restore()."""
+        self._patches.append((obj, name, vars(obj).get(name)))
+        setattr(obj, name, self.wrap(phase, getattr(obj, name)))
+
+    def restore(self):
+        """Deshace los patch() en orden inverso."""
+        while self._patches:
+            obj, name, original = self._patches.pop()
+            if original is not None:
+                setattr(obj, name, original)
+            else:
+                delattr(obj, name)
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def iterate(self, phase, iterable, total=None, first=0):
+        """
+        Recorre un iterador de pares (t, estado) midiendo cada next() en 'phase'
+        e imprimiendo el progreso cada 'progress_every' segundos.
+        """
+        step = self.wrap(phase, iter(iterable).__next__)
+        for k in itertools.count(first):
+            try:
+                item = step()
+            except StopIteration:
+                return
+            if self.progress_every:
+                self.progress(k, total, item[0], first)
+            yield item
+
+    def progress(self, k, total, t, first=0):
+        """Imprime una línea de progreso si han pasado 'progress_every' segundos desde la anterior."""
+        now = time.perf_counter()
+        if now - self._last_progress < self.progress_every:
+            return
+        self._last_progress = now
+        rate = (k - first) / max(now - self.start, 1e-12)
+        line = f"[progreso] paso {k}"
+        if total:
+            line += f"/{total} ({100 * k / total:5.1f} %)"
+        line += f", t={t:.6e}, {rate:.0f} pasos/s"
+        if total and rate > 0:
+            line += f", ETA {format_seconds((total - k) / rate)}"
+        print(line, flush=True)
+
+    def elapsed(self):
+        end = self.end if self.end is not None else time.perf_counter()
+        return end - self.start
+
+    def result(self):
+        """Resumen serializable: tiempo total, fases y contadores."""
+        wall = self.elapsed()
+        phases = {name: dict(stats) for name, stats in self.phases.items()}
+        phases['otros'] = {'calls': None, 'time': wall - sum(s['time'] for s in self.phases.values()),
+                           'max': None}
+        return {'wall_time': wall, 'phases': phases, 'counters': dict(self.counters)}
+
+    def report(self):
+        """Imprime la tabla de fases y los contadores."""
+        summary = self.result()
+        wall = summary['wall_time']
+        print(f"Perfil de la simulación ({wall:.3f} s):")
+        print(f"  {'fase':<16} {'llamadas':>10} {'total (s)':>10} {'%':>6} {'media (ms)':>11} {'máx (ms)':>10}")
+        for name, stats in sorted(summary['phases'].items(), key=lambda item: -item[1]['time']):
+            if stats['calls'] == 0:
+                continue
+            calls = stats['calls']
+            mean = f"{1e3 * stats['time'] / calls:.4f}" if calls else ""
+            peak = f"{1e3 * stats['max']:.3f}" if stats['max'] is not None else ""
+            print(f"  {name:<16} {calls if calls is not None else '':>10} {stats['time']:>10.3f} "
+                  f"{100 * stats['time'] / wall:>5.1f}% {mean:>11} {peak:>10}")
+        for name, value in summary['counters'].items():
+            print(f"  {name}: {value}")
+
+
+def format_seconds(seconds):
+    """Duración legible (h:mm:ss)."""
+    seconds = int(round(seconds))
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
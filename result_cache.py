@@ -0,0 +1,281 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import contextlib
+import argparse
+
+from trajectory_io import read_header, update_trajectory_header
+
+
+DEFAULT_CACHE_DIR = "data/cache"
+DEFAULT_MAX_BYTES = 2 * 1024**3
+
+# Módulos de los que depende el contenido de una corrida; su código forma parte de la clave
+SIMULATION_SOURCES = ("three_body_system.py", "integrators.py", "barnes_hut.py", "jit_backend.py",
+                      "events.py", "trajectory_io.py", "config_loader.py")
+
+# Claves de la configuración que no cambian los datos de la corrida
+IGNORED_KEYS = ("filename", "checkpoint_every")
+
+
+def code_version(sources=SIMULATION_SOURCES):
+    """Huella (sha256) del código fuente de los módulos dados, relativos a este directorio."""
+    digest = hashlib.sha256()
+    root = os.path.dirname(os.path.abspath(__file__))
+    for name in sources:
+        digest.update(name.encode())
+        with open(os.path.join(root, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def digest(data):
+    """sha256 de un objeto JSON con las claves ordenadas."""
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def config_key(config, version=None):
+    """
+    Clave de una corrida: hash de la configuración validada (sin 'filename' ni
+    'checkpoint_every'), del integrador y de la versión del código de simulación.
+    """
+    data = {key: value for key, value in config.items() if key not in IGNORED_KEYS}
+    return digest({'config': data, 'integrator': config['integrator'],
+                   'code': version or code_version()})
+
+
+def run_cache_key(path):
+    """Clave de caché guardada en el encabezado de un .trj (None si no tiene o no es un .trj)."""
+    try:
+        return read_header(path)[0].get('cache_key')
+    except (OSError, ValueError):
+        return None
+
+
+def _directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, files in os.walk(path) for name in files)
+
+
+def _copy_atomic(source, destination):
+    """Copia a un archivo temporal junto al destino y lo reemplaza (nunca queda una copia a medias)."""
+    os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
+    shutil.copyfile(source, destination + ".tmp")
+    os.replace(destination + ".tmp", destination)
+
+
+class ResultCache:
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Caché de corridas direccionada por contenido.
+
+        Cada entrada vive en root/<clave>/ con la trayectoria (run.trj), la
+        configuración y un meta.json con la fecha del último uso; los artefactos
+        derivados (series decimadas, figuras) van en root/<clave>/derived/ bajo una
+        subclave de sus opciones. Al superar 'max_bytes' se eliminan las entradas
+        usadas hace más tiempo (LRU).
+
+        Las copias se hacen siempre a un archivo temporal seguido de os.replace y los
+        datos de una entrada se copian (no se enlazan), de modo que sobrescribir
+        data/{filename}.trj nunca modifica la caché.
+
+        :param max_bytes: Tamaño máximo total de la caché en bytes.
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def key(self, config):
+        return config_key(config)
+
+    def entry(self, key):
+        return os.path.join(self.root, key)
+
+    def run_path(self, key):
+        return os.path.join(self.entry(key), "run.trj")
+
+    def _meta_path(self, key):
+        return os.path.join(self.entry(key), "meta.json")
+
+    def _read_meta(self, key):
+        try:
+            with open(self._meta_path(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_meta(self, key, **fields):
+        os.makedirs(self.entry(key), exist_ok=True)
+        meta = self._read_meta(key)
+        meta.update(fields)
+        meta['last_used'] = time.time()
+        tmp = self._meta_path(key) + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f, indent=2, default=str)
+        os.replace(tmp, self._meta_path(key))
+
+    def touch(self, key):
+        """Marca la entrada como recién usada (para el LRU)."""
+        if os.path.isdir(self.entry(key)):
+            self._write_meta(key)
+
+    def contains(self, key):
+        return os.path.exists(self.run_path(key))
+
+    def restore(self, key, path):
+        """
+        Copia la corrida en caché a 'path' si existe. Devuelve True en un acierto.
+
+        Si 'path' ya es esa misma corrida (misma clave en su encabezado) no se copia nada.
+        """
+        if not self.contains(key):
+            return False
+        if run_cache_key(path) != key:
+            _copy_atomic(self.run_path(key), path)
+        self.touch(key)
+        return True
+
+    def store(self, key, path, config=None):
+        """Guarda en la caché la corrida de 'path' (con su clave escrita en el encabezado)."""
+        if run_cache_key(path) != key:
+            update_trajectory_header(path, cache_key=key)
+        _copy_atomic(path, self.run_path(key))
+        fields = {'source': path}
+        if config is not None:
+            fields['config'] = config
+        self._write_meta(key, **fields)
+        self.evict(keep=key)
+
+    def archive(self, path, key):
+        """
+        Protege una corrida anterior antes de que 'path' se sobrescriba con la de 'key'.
+
+        Si el archivo existente procede de otra configuración (otra clave en el
+        encabezado) se guarda en la caché con su clave. Devuelve la clave archivada,
+        o None si no hacía falta o el archivo no tiene clave (corridas sin caché).
+        """
+        previous = run_cache_key(path)
+        if previous is None or previous == key:
+            return None
+        if not self.contains(previous):
+            _copy_atomic(path, self.run_path(previous))
+            self._write_meta(previous, source=path)
+            self.evict(keep=previous)
+        return previous
+
+    def derived_dir(self, key, name, options):
+        return os.path.join(self.entry(key), "derived", f"{name}-{digest(options)[:16]}")
+
+    def load_derived(self, key, name, options):
+        """Directorio de un artefacto derivado en caché, o None si no está completo."""
+        directory = self.derived_dir(key, name, options)
+        if not os.path.exists(os.path.join(directory, "options.json")):
+            return None
+        self.touch(key)
+        return directory
+
+    def save_derived(self, key, name, options, files):
+        """
+        Guarda en la caché los archivos de un artefacto derivado de la corrida 'key'.
+
+        Los archivos se copian a un directorio temporal que se renombra al final,
+        así que un artefacto a medias nunca se da por válido.
+        """
+        directory = self.derived_dir(key, name, options)
+        tmp = directory + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for path in files:
+            shutil.copyfile(path, os.path.join(tmp, os.path.basename(path)))
+        with open(os.path.join(tmp, "options.json"), "w") as f:
+            json.dump(options, f, indent=2, default=str)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp, directory)
+        self._write_meta(key)
+        self.evict(keep=key)
+        return directory
+
+    def entries(self):
+        """Lista de (clave, último uso, bytes) de las entradas, de la menos a la más reciente."""
+        if not os.path.isdir(self.root):
+            return []
+        result = []
+        for key in os.listdir(self.root):
+            if os.path.isdir(self.entry(key)):
+                last_used = self._read_meta(key).get('last_used', 0.0)
+                result.append((key, last_used, _directory_size(self.entry(key))))
+        return sorted(result, key=lambda item: item[1])
+
+    def evict(self, keep=None):
+        """Elimina las entradas usadas hace más tiempo hasta quedar bajo max_bytes (salvo 'keep')."""
+        entries = self.entries()
+        total = sum(size for _, _, size in entries)
+        removed = []
+        for key, _, size in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(self.entry(key), ignore_errors=True)
+            total -= size
+            removed.append(key)
+        return removed
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+@contextlib.contextmanager
+def cached_derived(filename, name, options, producer, sources=(), cache=None):
+    """
+    Artefacto derivado de una corrida a través de la caché.
+
+    Se usa como 'with cached_derived(...) as (directorio, acierto):'. producer(directorio)
+    escribe los archivos del artefacto en el directorio dado y los devuelve como
+    lista de rutas. Si la corrida data/{filename}.trj tiene clave de caché y el
+    artefacto con esas opciones (y ese código de 'sources') ya existe, se entrega su
+    directorio sin llamar a producer. Sin clave (corridas hechas sin caché) se llama
+    siempre a producer sobre un directorio temporal fuera de la caché, que se elimina
+    al salir del bloque.
+    """
+    cache = cache or ResultCache()
+    key = run_cache_key(f"data/{filename}.trj")
+    options = dict(options, code=code_version(sources)) if sources else dict(options)
+    if key is not None:
+        directory = cache.load_derived(key, name, options)
+        if directory is not None:
+            yield directory, True
+            return
+
+    with tempfile.TemporaryDirectory(prefix=f"{name}-") as work:
+        files = producer(work)
+        if key is None:
+            yield work, False
+        else:
+            yield cache.save_derived(key, name, options, files), False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspección y limpieza de la caché de corridas")
+    parser.add_argument("command", choices=("list", "evict", "clear"))
+    parser.add_argument("--cache_dir", type=str, default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--max_mb", type=float, default=DEFAULT_MAX_BYTES / 1024**2,
+                        help="Tamaño máximo de la caché en MiB")
+
+    args = parser.parse_args()
+    cache = ResultCache(args.cache_dir, max_bytes=int(args.max_mb * 1024**2))
+    if args.command == "list":
+        entries = cache.entries()
+        for key, last_used, size in entries:
+            source = cache._read_meta(key).get('source', '')
+            print(f"{key[:16]}  {time.strftime('%Y-%m-%d %H:%M', time.localtime(last_used))}  "
+                  f"{size / 1024**2:10.2f} MiB  {source}")
+        print(f"{len(entries)} entradas, {sum(size for _, _, size in entries) / 1024**2:.2f} MiB")
+    elif args.command == "evict":
+        removed = cache.evict()
+        print(f"{len(removed)} entradas eliminadas")
+    else:
+        cache.clear()
+        print(f"Caché {args.cache_dir} eliminada")
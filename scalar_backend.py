@@ -0,0 +1,115 @@
+"""
+Bucle de integración en Python puro para sistemas pequeños.
+
+Es el mismo bucle por bloques de jit_backend.run_block sobre listas de floats
+de Python, sin compilar: con pocos cuerpos cada operación de NumPy sobre
+arreglos de 3 a 18 elementos cuesta más en llamadas que en aritmética, así que
+el backend NumPy lo usa para sistemas individuales pequeños (ver
+ThreeBodySimulator). Los pasos son los de integrators.rk4_step y
+integrators.leapfrog_composition con ListOps.
+"""
+import numpy as np
+
+from integrators import ListOps, leapfrog_composition, rk4_step
+from jit_backend import RK4, SYMPLECTIC
+
+
+def _pairs(masses, G):
+    """
+    Pares i < j: índices de las tres componentes de cada cuerpo en las listas
+    de posiciones (precalculados) y G m_i, G m_j.
+    """
+    gm = [G * float(m) for m in masses]
+    n = len(gm)
+    return [(3 * i, 3 * i + 1, 3 * i + 2, 3 * j, 3 * j + 1, 3 * j + 2, gm[i], gm[j])
+            for i in range(n) for j in range(i + 1, n)]
+
+
+def _accelerations(x, n3, pairs, eps2):
+    """Aceleraciones (lista 3N) de las posiciones x (lista 3N), cada par una sola vez."""
+    acc = [0.0] * n3
+    for ix, iy, iz, jx, jy, jz, gmi, gmj in pairs:
+        dx = x[jx] - x[ix]
+        dy = x[jy] - x[iy]
+        dz = x[jz] - x[iz]
+        inv_r3 = (dx * dx + dy * dy + dz * dz + eps2)**-1.5
+        fi = gmj * inv_r3
+        fj = gmi * inv_r3
+        acc[ix] += fi * dx
+        acc[iy] += fi * dy
+        acc[iz] += fi * dz
+        acc[jx] -= fj * dx
+        acc[jy] -= fj * dy
+        acc[jz] -= fj * dz
+    return acc
+
+
+def _diagnostics(x, v, masses, mm, pairs, eps2):
+    """[E_kin, E_pot, E_tot, Lx, Ly, Lz] de posiciones y velocidades en lista ('mm': G m_i m_j por par)."""
+    E_kin = Lx = Ly = Lz = 0.0
+    for m, i3 in zip(masses, range(0, len(x), 3)):
+        xi, yi, zi = x[i3], x[i3 + 1], x[i3 + 2]
+        vx, vy, vz = v[i3], v[i3 + 1], v[i3 + 2]
+        E_kin += 0.5 * m * (vx * vx + vy * vy + vz * vz)
+        Lx += m * (yi * vz - zi * vy)
+        Ly += m * (zi * vx - xi * vz)
+        Lz += m * (xi * vy - yi * vx)
+    E_pot = 0.0
+    for (ix, iy, iz, jx, jy, jz, _, _), mij in zip(pairs, mm):
+        dx = x[jx] - x[ix]
+        dy = x[jy] - x[iy]
+        dz = x[jz] - x[iz]
+        E_pot -= mij * (dx * dx + dy * dy + dz * dz + eps2)**-0.5
+    return [E_kin, E_pot, E_kin + E_pot, Lx, Ly, Lz]
+
+
+def run_block(kind, state, masses, G, dt, time, first_step, n_steps, total_steps,
+              output_every, diagnostics_every, weights, out, softening=0.0):
+    """
+    jit_backend.run_block en Python puro (misma firma y convención de filas).
+
+    Admite además suavizado de Plummer. Los resultados coinciden con el camino
+    NumPy salvo por el orden de las operaciones de coma flotante (~1e-13 relativo).
+    """
+    n3 = 3 * len(masses)
+    masses = [float(m) for m in masses]
+    pairs = _pairs(masses, G)
+    mm = [G * masses[i] * masses[j] for i in range(len(masses)) for j in range(i + 1, len(masses))]
+    eps2 = float(softening)**2
+    x = [float(value) for value in state[:n3]]
+    v = [float(value) for value in state[n3:]]
+    weights = [float(w) for w in weights]
+    nan_diagnostics = [np.nan] * 6
+
+    def accelerations(x):
+        return _accelerations(x, n3, pairs, eps2)
+
+    def derivatives(y):
+        return y[n3:] + accelerations(y[:n3])
+
+    if kind == SYMPLECTIC:
+        acc = accelerations(x)
+
+    rows = []
+    for k in range(first_step, first_step + n_steps):
+        if k % output_every == 0:
+            if (k // output_every) % diagnostics_every == 0:
+                rows.append([time] + x + v + _diagnostics(x, v, masses, mm, pairs, eps2))
+            else:
+                rows.append([time] + x + v + nan_diagnostics)
+
+        if k == total_steps - 1:
+            break
+
+        if kind == RK4:
+            y = rk4_step(derivatives, x + v, dt, ListOps)
+            x, v = y[:n3], y[n3:]
+        else:
+            x, v, acc = leapfrog_composition(accelerations, x, v, acc, dt, weights, ListOps)
+        time += dt
+
+    if rows:
+        out[:len(rows)] = rows
+    state[:n3] = x
+    state[n3:] = v
+    return len(rows), time
@@ -0,0 +1,364 @@
+import os
+import copy
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+
+from config_loader import load_config, validate_config
+from sweep import grid_values, set_path
+from three_body_system import NBodySystem
+
+
+# Estado de cada celda del mapa
+REGULAR = 0      # integrada hasta t_max
+CHAOTIC = 1      # cortada: MEGNO por encima de 'megno_cut'
+ESCAPED = 2      # cortada: alguna distancia entre pares supera 'escape_factor' veces la inicial
+SINGULAR = 3     # cortada: estado no finito (choque o paso insuficiente)
+
+INDICATORS = ("megno", "fli")
+
+
+def tangent_accelerations(positions, d_positions, masses, G, pair_i, pair_j, eps2=0.0):
+    """
+    Ecuaciones variacionales: δa = (∂a/∂x) δx para un lote de sistemas.
+
+    Para cada par, con r = x_j - x_i y δr = δx_j - δx_i, la variación de la fuerza es
+    δr/|r|³ - 3 r (r·δr)/|r|⁵ (con |r|² + ε² si hay suavizado de Plummer).
+
+    :param positions: Posiciones (M, N, 3).
+    :param d_positions: Desplazamientos tangentes δx (M, N, 3).
+    :param masses: Masas (M, N).
+    """
+    r = positions[:, pair_j] - positions[:, pair_i]
+    dr = d_positions[:, pair_j] - d_positions[:, pair_i]
+    r2 = np.einsum('mpc,mpc->mp', r, r) + eps2
+    inv_r3 = r2**-1.5
+    rdr = np.einsum('mpc,mpc->mp', r, dr)
+    t = dr * inv_r3[..., None] - 3 * r * (rdr * inv_r3 / r2)[..., None]
+
+    out = np.zeros_like(positions)
+    for p, (i, j) in enumerate(zip(pair_i, pair_j)):
+        out[:, i] += G * masses[:, j, None] * t[:, p]
+        out[:, j] -= G * masses[:, i, None] * t[:, p]
+    return out
+
+
+class ChaosIntegrator:
+    def __init__(self, masses, positions, velocities, G, softening=0.0, seed=0):
+        """
+        Integra con RK4 un lote de M sistemas (como ensemble de NBodySystem) junto con
+        sus ecuaciones variacionales y acumula MEGNO y el indicador rápido de Lyapunov.
+
+        El vector tangente δ se mide en unidades adimensionales (posiciones entre la
+        mayor distancia inicial entre pares L y velocidades entre L/τ, con τ el tiempo
+        dinámico) y se renormaliza en cada comprobación; el logaritmo de la norma se
+        acumula para el FLI. Con u' = t (δ̇·δ)/|δ|² y w' = 2u/t, MEGNO es
+        <Y> = w/t: tiende a 2 en órbitas cuasiperiódicas y crece como λt/2 en las caóticas.
+
+        :param masses: Masas (M, N).
+        :param positions: Posiciones iniciales (M, N, 3).
+        :param velocities: Velocidades iniciales (M, N, 3).
+        """
+        masses = np.asarray(masses, dtype=float)
+        self.system = NBodySystem(masses, positions, velocities, G=G, softening=softening)
+        self.G = G
+        self.eps2 = softening**2
+        self.masses = masses
+        self.n = self.system.n_bodies
+        pair_i, pair_j = self.system._pair_i, self.system._pair_j
+        self.pair_i, self.pair_j = pair_i, pair_j
+
+        x = np.asarray(positions, dtype=float)
+        self.r0 = np.max(np.linalg.norm(x[:, pair_j] - x[:, pair_i], axis=-1), axis=-1)
+        tau = np.sqrt(self.r0**3 / (G * masses.sum(axis=-1)))
+        n3 = 3 * self.n
+        self.weights = np.concatenate([np.repeat(1 / self.r0[:, None], n3, axis=1),
+                                       np.repeat((tau / self.r0)[:, None], n3, axis=1)], axis=1)**2
+
+        rng = np.random.default_rng(seed)
+        d = rng.standard_normal(self.system.state.shape) / np.sqrt(self.weights)
+        self.delta = d / np.sqrt(np.sum(self.weights * d * d, axis=1))[:, None]
+        self.y = self.system.state.copy()
+        self.u = np.zeros(len(self.y))
+        self.w = np.zeros(len(self.y))
+        self.log_norm = np.zeros(len(self.y))
+        self.fli = np.zeros(len(self.y))
+
+    def derivatives(self, t, y, delta, u):
+        """Derivadas (ẏ, δ̇, u̇, ẇ) del sistema aumentado (2u/t -> 0 en t = 0)."""
+        n3 = 3 * self.n
+        system = self.system
+        dy = system.equations_of_motion(y)
+        dd = np.empty_like(delta)
+        dd[:, :n3] = delta[:, n3:]
+        dd[:, n3:] = tangent_accelerations(system.positions(y), delta[:, :n3].reshape(len(y), -1, 3),
+                                           self.masses, self.G, self.pair_i, self.pair_j,
+                                           self.eps2).reshape(len(y), -1)
+        ratio = np.sum(self.weights * dd * delta, axis=1) / np.sum(self.weights * delta * delta, axis=1)
+        return dy, dd, t * ratio, 2 * u / t if t > 0 else np.zeros_like(u)
+
+    def step(self, t, dt):
+        """Un paso RK4 del sistema aumentado desde t."""
+        current = (self.y, self.delta, self.u, self.w)
+        k1 = self.derivatives(t, *current[:3])
+        k2 = self.derivatives(t + dt / 2, *[a + dt / 2 * k for a, k in zip(current[:3], k1)])
+        k3 = self.derivatives(t + dt / 2, *[a + dt / 2 * k for a, k in zip(current[:3], k2)])
+        k4 = self.derivatives(t + dt, *[a + dt * k for a, k in zip(current[:3], k3)])
+        self.y, self.delta, self.u, self.w = [a + dt / 6 * (s1 + 2 * s2 + 2 * s3 + s4)
+                                              for a, s1, s2, s3, s4 in zip(current, k1, k2, k3, k4)]
+
+    def renormalize(self):
+        """Devuelve δ a norma 1 y acumula log|δ| (para el FLI)."""
+        norm = np.sqrt(np.sum(self.weights * self.delta * self.delta, axis=1))
+        self.log_norm += np.log(norm)
+        self.delta /= norm[:, None]
+        self.fli = np.maximum(self.fli, self.log_norm / np.log(10))
+
+    def megno(self, t):
+        return self.w / t
+
+    def keep(self, mask):
+        """Conserva solo los sistemas del lote indicados por 'mask'."""
+        n3 = 3 * self.n
+        masses = self.masses[mask]
+        state = self.y[mask]
+        self.system = NBodySystem(masses, state[:, :n3].reshape(len(state), -1, 3),
+                                  state[:, n3:].reshape(len(state), -1, 3), G=self.G,
+                                  softening=np.sqrt(self.eps2))
+        self.masses = masses
+        self.y = state
+        for name in ('delta', 'weights'):
+            setattr(self, name, getattr(self, name)[mask])
+        for name in ('u', 'w', 'log_norm', 'fli', 'r0'):
+            setattr(self, name, getattr(self, name)[mask])
+
+
+def integrate_chunk(cells, masses, positions, velocities, G, softening, t_max, dt, megno_cut=8.0,
+                    min_time=0.1, escape_factor=10.0, check_every=50, seed=0):
+    """
+    Integra un bloque de celdas del mapa como un ensemble y devuelve sus indicadores.
+
+    Cada 'check_every' pasos se renormaliza δ y se retiran del lote las celdas
+    resueltas: las caóticas (MEGNO > megno_cut una vez pasada la fracción
+    'min_time' de t_max), las que escapan y las que dejan de ser finitas. Así
+    el coste de las zonas caóticas o de escape es una fracción del de las regulares.
+
+    :return: Diccionario con cells, megno, fli, status y t_end (un valor por celda).
+    """
+    n = len(cells)
+    megno = np.full(n, np.nan)
+    fli = np.full(n, np.nan)
+    status = np.full(n, REGULAR, dtype=np.int8)
+    t_end = np.full(n, float(t_max))
+
+    chaos = ChaosIntegrator(masses, positions, velocities, G, softening=softening, seed=seed)
+    active = np.arange(n)
+    steps = int(t_max / dt)
+    t = 0.0
+    for k in range(1, steps + 1):
+        chaos.step(t, dt)
+        t = k * dt
+        if k % check_every and k != steps:
+            continue
+
+        chaos.renormalize()
+        current = chaos.megno(t)
+        x = chaos.system.positions(chaos.y)
+        r = np.linalg.norm(x[:, chaos.pair_j] - x[:, chaos.pair_i], axis=-1)
+        finite = np.all(np.isfinite(chaos.y), axis=1) & np.isfinite(current)
+
+        done = np.full(len(active), k == steps)
+        new_status = np.full(len(active), REGULAR, dtype=np.int8)
+        new_status[np.max(r, axis=1) > escape_factor * chaos.r0] = ESCAPED
+        new_status[(current > megno_cut) & (t >= min_time * t_max) & (new_status == REGULAR)] = CHAOTIC
+        new_status[~finite] = SINGULAR
+        done |= new_status != REGULAR
+
+        if np.any(done):
+            ids = active[done]
+            megno[ids] = current[done]
+            fli[ids] = chaos.fli[done]
+            status[ids] = new_status[done]
+            t_end[ids] = t
+            keep = ~done
+            if not np.any(keep):
+                break
+            active = active[keep]
+            chaos.keep(keep)
+
+    return {'cells': np.asarray(cells), 'megno': megno, 'fli': fli, 'status': status, 't_end': t_end}
+
+
+def cell_configs(spec, base):
+    """Configuraciones validadas de todas las celdas (orden fila a fila: y exterior, x interior)."""
+    x_values = grid_values(spec['x'])
+    y_values = grid_values(spec['y'])
+    configs = []
+    for y in y_values:
+        for x in x_values:
+            config = copy.deepcopy(base)
+            set_path(config, spec['x']['path'], x)
+            set_path(config, spec['y']['path'], y)
+            configs.append(validate_config(config))
+    return x_values, y_values, configs
+
+
+def save_npz(path, **arrays):
+    """Guarda un .npz en un archivo temporal y lo reemplaza (un corte no deja un archivo a medias)."""
+    with open(path + ".tmp", "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(path + ".tmp", path)
+
+
+def plot_map(path, x_values, y_values, values, status, spec, indicator):
+    """Mapa de calor del indicador; las celdas que escapan o fallan se dibujan en gris."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    masked = np.ma.masked_where((status == ESCAPED) | (status == SINGULAR) | ~np.isfinite(values), values)
+    cmap = plt.get_cmap('viridis').copy()
+    cmap.set_bad('lightgray')
+    vmin, vmax = (0.0, spec.get('megno_cut', 8.0)) if indicator == 'megno' else (None, None)
+
+    fig, ax = plt.subplots(figsize=(9, 7))
+    mesh = ax.pcolormesh(x_values, y_values, masked, cmap=cmap, vmin=vmin, vmax=vmax, shading='nearest')
+    fig.colorbar(mesh, ax=ax, label="MEGNO <Y>" if indicator == 'megno' else "FLI (log10 |δ|)")
+    ax.set_xlabel(spec['x']['path'])
+    ax.set_ylabel(spec['y']['path'])
+    ax.set_title(f"Mapa de estabilidad '{spec['name']}' (gris: escape o singular)")
+    fig.savefig(path, dpi=150, bbox_inches='tight')
+    plt.close(fig)
+
+
+def run_map(spec, workers=None, chunk_size=64, max_in_flight=None, force=False, save_every=10.0):
+    """
+    Calcula un mapa de estabilidad en un ProcessPoolExecutor.
+
+    La malla se reparte en bloques de 'chunk_size' celdas (intercaladas, para que
+    las zonas caóticas y regulares se repartan entre bloques). Cada bloque se integra
+    como un ensemble en un proceso. Los resultados parciales se guardan en
+    data/stability/<name>/partial.npz como mucho cada 'save_every' segundos y al
+    volver a ejecutar se continúa desde ellos (salvo con force=True).
+
+    Escribe data/stability/<name>/map.npz (x, y, megno, fli, status, t_end con forma
+    (ny, nx)) y plots/stability_<name>.png.
+    """
+    name = spec['name']
+    base = spec['base']
+    if isinstance(base, str):
+        base = load_config(base)
+    base = validate_config(base)
+    indicator = spec.get('indicator', 'megno')
+    if indicator not in INDICATORS:
+        raise ValueError(f"Indicador no soportado: {indicator}. Opciones: {', '.join(INDICATORS)}")
+    t_max = float(spec.get('t_max', base['t_max']))
+    dt = float(spec.get('dt', base['dt']))
+    options = {key: spec[key] for key in ('megno_cut', 'min_time', 'escape_factor', 'check_every', 'seed')
+               if key in spec}
+
+    x_values, y_values, configs = cell_configs(spec, base)
+    n_cells = len(configs)
+    masses = np.array([c['masses'] for c in configs])
+    positions = np.array([c['initial_positions'] for c in configs])
+    velocities = np.array([c['initial_velocities'] for c in configs])
+
+    out_dir = f"data/stability/{name}"
+    os.makedirs(out_dir, exist_ok=True)
+    partial_path = f"{out_dir}/partial.npz"
+    fingerprint = json.dumps({'spec': spec, 'base': base, 't_max': t_max, 'dt': dt}, sort_keys=True, default=str)
+
+    results = {
+        'megno': np.full(n_cells, np.nan),
+        'fli': np.full(n_cells, np.nan),
+        'status': np.full(n_cells, REGULAR, dtype=np.int8),
+        't_end': np.full(n_cells, np.nan),
+    }
+    done = np.zeros(n_cells, dtype=bool)
+    if os.path.exists(partial_path) and not force:
+        with np.load(partial_path) as partial:
+            if str(partial['fingerprint']) == fingerprint:
+                done = partial['done'].copy()
+                for key in results:
+                    results[key] = partial[key].copy()
+
+    n_chunks = max(1, -(-n_cells // chunk_size))
+    chunks = [np.arange(c, n_cells, n_chunks) for c in range(n_chunks)]
+    chunks = [cells[~done[cells]] for cells in chunks]
+    chunks = iter([cells for cells in chunks if len(cells)])
+
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2 * workers
+    start = last_save = time.perf_counter()
+    print(f"Mapa '{name}': {n_cells} celdas ({int(done.sum())} ya calculadas), {workers} procesos")
+
+    def save_partial():
+        save_npz(partial_path, fingerprint=np.array(fingerprint), done=done, **results)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = {}
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < max_in_flight:
+                cells = next(chunks, None)
+                if cells is None:
+                    exhausted = True
+                    break
+                future = executor.submit(integrate_chunk, cells, masses[cells], positions[cells],
+                                         velocities[cells], base['G'], base['softening'], t_max, dt, **options)
+                pending[future] = cells
+            if not pending:
+                break
+
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                pending.pop(future)
+                chunk = future.result()
+                cells = chunk['cells']
+                for key in results:
+                    results[key][cells] = chunk[key]
+                done[cells] = True
+
+            now = time.perf_counter()
+            if now - last_save >= save_every:
+                save_partial()
+                last_save = now
+            print(f"  {int(done.sum())}/{n_cells} celdas ({now - start:.1f} s)", end="\r")
+    save_partial()
+
+    shape = (len(y_values), len(x_values))
+    grids = {key: value.reshape(shape) for key, value in results.items()}
+    map_path = f"{out_dir}/map.npz"
+    save_npz(map_path, x=np.array(x_values), y=np.array(y_values), **grids)
+
+    os.makedirs("plots", exist_ok=True)
+    plot_path = f"plots/stability_{name}.png"
+    plot_map(plot_path, x_values, y_values, grids[indicator], grids['status'], spec, indicator)
+
+    counts = {label: int(np.sum(results['status'] == code))
+              for label, code in (('regulares', REGULAR), ('caóticas', CHAOTIC),
+                                  ('escapes', ESCAPED), ('singulares', SINGULAR))}
+    elapsed = time.perf_counter() - start
+    print(f"\nMapa '{name}' terminado en {elapsed:.1f} s: "
+          + ", ".join(f"{value} {label}" for label, value in counts.items()))
+    print(f"Datos en {map_path}, figura en {plot_path}")
+    return map_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mapa de estabilidad (MEGNO / FLI) sobre una malla 2D de condiciones iniciales")
+    parser.add_argument("spec", type=str, help="Especificación del mapa (.json o .yaml)")
+    parser.add_argument("--workers", type=int, default=None, help="Número de procesos (por defecto todos los núcleos)")
+    parser.add_argument("--chunk_size", type=int, default=64, help="Celdas por bloque (integradas como un ensemble)")
+    parser.add_argument("--max_in_flight", type=int, default=None,
+                        help="Bloques enviados simultáneamente (por defecto 2 x procesos)")
+    parser.add_argument("--save_every", type=float, default=10.0,
+                        help="Segundos entre guardados de resultados parciales")
+    parser.add_argument("--force", action="store_true", help="Ignorar los resultados parciales y recalcular todo")
+
+    args = parser.parse_args()
+    run_map(load_config(args.spec), workers=args.workers, chunk_size=args.chunk_size,
+            max_in_flight=args.max_in_flight, force=args.force, save_every=args.save_every)
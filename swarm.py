@@ -0,0 +1,362 @@
+import os
+import time
+import argparse
+
+import numpy as np
+
+from config_loader import load_config, validate_config
+from integrators import SYMPLECTIC_WEIGHTS
+from three_body_system import NBodySystem, state_columns
+from trajectory_io import TrajectoryWriter, open_trajectory
+
+
+# Estado de cada partícula en la columna 'status' del archivo del enjambre
+ACTIVE = 0
+ESCAPED = 1
+COLLIDED = 2
+
+SWARM_COLUMNS = ["x", "y", "z", "vx", "vy", "vz", "status"]
+
+
+def l4_cloud(system, n_particles, primary=1, secondary=2, radial_spread=0.01, angular_spread=5.0,
+             vertical_spread=0.0, seed=None):
+    """
+    Nube de partículas alrededor del punto L4 del par (primario, secundario).
+
+    Cada partícula se coloca a distancia |d|(1 + δr) del primario, a 60° + δθ por
+    delante del secundario en el plano orbital (y δz fuera de él), con la velocidad
+    de rotación rígida del par alrededor de su baricentro: en el sistema que rota
+    con los primarios las partículas parten en reposo y cerca del equilibrio.
+
+    :param primary: Índice del primario (desde 1, como en las columnas x1, x2, ...).
+    :param secondary: Índice del secundario.
+    :param radial_spread: Desviación estándar de δr (fracción de la distancia del par).
+    :param angular_spread: Desviación estándar de δθ en grados.
+    :param vertical_spread: Desviación estándar de δz (fracción de la distancia del par).
+    :return: Posiciones y velocidades (n_particles, 3).
+    """
+    rng = np.random.default_rng(seed)
+    p, s = primary - 1, secondary - 1
+    x = system.positions()
+    v = system.velocities()
+    m_p, m_s = system.masses[p], system.masses[s]
+
+    d = x[s] - x[p]
+    distance = np.linalg.norm(d)
+    h = np.cross(d, v[s] - v[p])
+    k = h / np.linalg.norm(h)
+    e1 = d / distance
+    e2 = np.cross(k, e1)
+    omega = h / distance**2
+
+    r = distance * (1 + radial_spread * rng.standard_normal(n_particles))
+    theta = np.radians(60.0 + angular_spread * rng.standard_normal(n_particles))
+    z = distance * vertical_spread * rng.standard_normal(n_particles)
+    positions = (x[p] + r[:, None] * (np.cos(theta)[:, None] * e1 + np.sin(theta)[:, None] * e2)
+                 + z[:, None] * k)
+
+    x_cm = (m_p * x[p] + m_s * x[s]) / (m_p + m_s)
+    v_cm = (m_p * v[p] + m_s * v[s]) / (m_p + m_s)
+    velocities = v_cm + np.cross(omega, positions - x_cm)
+    return positions, velocities
+
+
+class TestParticleSwarm:
+    def __init__(self, system, positions, velocities, integrator="yoshida4", escape_radius=None,
+                 collision_radius=0.0):
+        """
+        Enjambre de partículas de prueba sin masa en el campo de un sistema de N cuerpos.
+
+        Los cuerpos masivos (p. ej. Tierra y Luna) se integran una sola vez; todas las
+        partículas avanzan a la vez en un arreglo (P, 3) con la aceleración que les
+        producen los cuerpos masivos, sin fuerzas entre partículas ni sobre los cuerpos.
+        Cada subpaso cuesta una evaluación de fuerzas de los N cuerpos más una
+        operación vectorizada (P, N, 3), así que el coste crece linealmente con P.
+
+        Las partículas que escapan (energía específica positiva respecto al baricentro
+        de los cuerpos y distancia mayor que 'escape_radius', comprobado en cada fila de
+        salida) o chocan (más cerca de un cuerpo que 'collision_radius', comprobado en
+        cada paso) se marcan y dejan de integrarse: su estado queda congelado en el del
+        paso en que se detectó y ese instante se guarda en self.t_flag.
+
+        :param system: NBodySystem (individual) con los cuerpos masivos.
+        :param positions: Posiciones iniciales de las partículas (P, 3).
+        :param velocities: Velocidades iniciales de las partículas (P, 3).
+        :param integrator: Integrador simpléctico ("leapfrog", "yoshida4", "yoshida6"); los
+                           cuerpos masivos siguen exactamente la misma trayectoria que con
+                           ThreeBodySimulator y ese integrador.
+        :param escape_radius: Distancia mínima al baricentro para considerar un escape
+                              (por defecto 10 veces la mayor distancia inicial entre cuerpos).
+        :param collision_radius: Radio de choque con cualquier cuerpo (0 lo desactiva).
+        """
+        if system.ensemble_size is not None:
+            raise ValueError("El enjambre requiere un sistema individual (no un ensemble)")
+        if integrator not in SYMPLECTIC_WEIGHTS:
+            raise ValueError(f"Integrador no soportado: {integrator}. Opciones: {', '.join(SYMPLECTIC_WEIGHTS)}")
+        positions = np.array(positions, dtype=float)
+        velocities = np.array(velocities, dtype=float)
+        if positions.ndim != 2 or positions.shape[1] != 3 or positions.shape != velocities.shape:
+            raise ValueError("Las posiciones y velocidades de las partículas deben tener forma (P, 3)")
+
+        self.system = system
+        self.integrator = integrator
+        self.weights = SYMPLECTIC_WEIGHTS[integrator]
+        self.n_particles = len(positions)
+        self.gm = system.G * system.masses
+        self.eps2 = system.softening**2
+        if escape_radius is None:
+            escape_radius = 10 * float(np.max(system.pair_distances()))
+        self.escape_radius = escape_radius
+        self.collision_radius = collision_radius
+
+        # Estado completo (P, 3) y estado de las partículas activas, compacto y
+        # transpuesto (3, P_activas) para que cada componente sea contigua
+        self.x = positions
+        self.v = velocities
+        self.status = np.full(self.n_particles, ACTIVE, dtype=np.int8)
+        self.t_flag = np.full(self.n_particles, np.nan)
+        self._set_active(np.arange(self.n_particles), positions.T.copy(), velocities.T.copy())
+
+    def _set_active(self, ids, xp, vp):
+        """Fija las partículas activas (xp, vp de forma (3, P_activas)) y redimensiona los buffers."""
+        self.ids = ids
+        self.xp = xp
+        self.vp = vp
+        n = len(ids)
+        self.ap = np.zeros((3, n))
+        self._d = np.empty((3, n))
+        self._tmp = np.empty((3, n))
+        self._r2 = np.empty((self.system.n_bodies, n))
+        self._w = np.empty(n)
+
+    def particle_accelerations(self, xs, kick=None):
+        """
+        Aceleraciones (3, P_activas) de las partículas activas debidas a los cuerpos en
+        las posiciones xs (N, 3). Deja |r|² (+ ε²) a cada cuerpo en self._r2 (N, P_activas).
+
+        :param kick: Si se da, en lugar de guardar a en self.ap se suma kick * a
+                     directamente a las velocidades (patada fusionada con la evaluación).
+        """
+        d, tmp, w = self._d, self._tmp, self._w
+        if kick is None:
+            a, scale = self.ap, 1.0
+            a[:] = 0.0
+        else:
+            a, scale = self.vp, kick
+        for k in range(self.system.n_bodies):
+            np.subtract(xs[k][:, None], self.xp, out=d)         # cuerpo - partícula
+            np.multiply(d, d, out=tmp)
+            r2 = self._r2[k]
+            np.add(tmp[0], tmp[1], out=r2)
+            r2 += tmp[2]
+            if self.eps2:
+                r2 += self.eps2
+            np.sqrt(r2, out=w)
+            w *= r2                                               # |r|³
+            np.divide(scale * self.gm[k], w, out=w)
+            np.multiply(d, w, out=tmp)
+            a += tmp
+        return a
+
+    def step(self, state, a, dt):
+        """
+        Avanza cuerpos y partículas un paso dt (composición de leapfrog in situ).
+
+        Es symplectic_step aplicado a la vez a los cuerpos (con sus fuerzas mutuas) y a
+        las partículas (con el campo de los cuerpos en la misma posición de subpaso).
+        En las partículas las dos medias patadas entre subpasos consecutivos se funden
+        en una sola, aplicada durante la evaluación de fuerzas; solo la aceleración del
+        final del paso se guarda para la primera media patada del siguiente.
+        """
+        xs = self.system.positions(state)
+        vs = self.system.velocities(state)
+        tmp = self._tmp
+        weights = self.weights
+        np.multiply(self.ap, 0.5 * weights[0] * dt, out=tmp)
+        self.vp += tmp
+        for i, w in enumerate(weights):
+            h = w * dt
+            vs += (0.5 * h) * a
+            xs += h * vs
+            np.multiply(self.vp, h, out=tmp)
+            self.xp += tmp
+            self.system.accelerations(xs, out=a)
+            if i + 1 < len(weights):
+                self.particle_accelerations(xs, kick=0.5 * (h + weights[i + 1] * dt))
+            else:
+                self.particle_accelerations(xs)
+                np.multiply(self.ap, 0.5 * h, out=tmp)
+                self.vp += tmp
+            vs += (0.5 * h) * a
+
+    def check(self, state, time, escapes=True):
+        """
+        Marca las partículas que han chocado (o escapado, con escapes=True) y las retira
+        de la integración.
+
+        Usa |r|² de la última evaluación de fuerzas (en la posición actual). Devuelve
+        el número de partículas marcadas.
+        """
+        flags = np.zeros(len(self.ids), dtype=np.int8)
+        if self.collision_radius:
+            flags[np.min(self._r2, axis=0) < self.collision_radius**2] = COLLIDED
+
+        if escapes:
+            xs = self.system.positions(state)
+            vs = self.system.velocities(state)
+            masses = self.system.masses
+            x_cm = masses @ xs / masses.sum()
+            r_cm = self.xp - x_cm[:, None]
+            far = np.flatnonzero(np.einsum('cp,cp->p', r_cm, r_cm) > self.escape_radius**2)
+            if len(far):
+                u = self.vp[:, far] - (masses @ vs / masses.sum())[:, None]
+                energy = 0.5 * np.einsum('cp,cp->p', u, u) - self.gm @ self._r2[:, far]**-0.5
+                flags[far[(energy >= 0) & (flags[far] == ACTIVE)]] = ESCAPED
+
+        flagged = np.flatnonzero(flags)
+        if not len(flagged):
+            return 0
+        ids = self.ids[flagged]
+        self.x[ids] = self.xp[:, flagged].T
+        self.v[ids] = self.vp[:, flagged].T
+        self.status[ids] = flags[flagged]
+        self.t_flag[ids] = time
+        keep = flags == ACTIVE
+        ap = self.ap[:, keep]
+        self._set_active(self.ids[keep], self.xp[:, keep], self.vp[:, keep])
+        self.ap[:] = ap
+        return len(flagged)
+
+    def gather(self):
+        """Copia el estado de las partículas activas al estado completo (P, 3)."""
+        self.x[self.ids] = self.xp.T
+        self.v[self.ids] = self.vp.T
+
+    def simulate(self, t_max, dt, filename="swarm", output_every=1, dtype="<f4", verbose=True):
+        """
+        Integra el enjambre y guarda dos archivos:
+
+        * data/{filename}.trj: los cuerpos masivos con las columnas estándar (t, estado,
+          energías y momento angular), legible por plotting.py y animate.py.
+        * data/{filename}_particles.trj: filas (P, 7) con x, y, z, vx, vy, vz y el estado
+          (0 activa, 1 escapada, 2 choque) de cada partícula, en float32 por defecto.
+          Los instantes son k * dt * output_every (ver load_swarm).
+
+        :param output_every: Escribir una fila cada 'output_every' pasos.
+        :param dtype: Tipo de dato del archivo de partículas ("<f4" o "<f8").
+        :return: Diccionario con el recuento por estado y el tiempo de pared.
+        """
+        steps = int(t_max / dt)
+        params = {
+            'n_bodies': int(self.system.n_bodies),
+            'masses': self.system.masses.tolist(),
+            'G': self.system.G,
+            'softening': self.system.softening,
+            'integrator': self.integrator,
+            'dt': dt,
+            't_max': t_max,
+            'output_every': output_every,
+            'n_particles': self.n_particles,
+            'escape_radius': self.escape_radius,
+            'collision_radius': self.collision_radius,
+        }
+        n6 = 6 * self.system.n_bodies
+        body_columns = ["t"] + state_columns(self.system.n_bodies) + ["E_kin", "E_pot", "E_tot", "Lx", "Ly", "Lz"]
+        body_writer = TrajectoryWriter(f"data/{filename}.trj", body_columns, params=params)
+        particle_writer = TrajectoryWriter(f"data/{filename}_particles.trj", SWARM_COLUMNS,
+                                           params=dict(params, sample_dt=dt * output_every),
+                                           row_shape=(self.n_particles, len(SWARM_COLUMNS)), dtype=dtype,
+                                           block_rows=max(1, 2**24 // (self.n_particles * len(SWARM_COLUMNS))))
+
+        state = np.array(self.system.state, dtype=float)
+        a = self.system.accelerations(self.system.positions(state))
+        self.particle_accelerations(self.system.positions(state))
+        self.check(state, 0.0)
+
+        start = time.perf_counter()
+        with body_writer, particle_writer:
+            for k in range(steps):
+                if k:
+                    self.step(state, a, dt)
+                    # Los choques se comprueban en cada paso; los escapes (lentos) al escribir
+                    self.check(state, k * dt, escapes=k % output_every == 0)
+                if k % output_every:
+                    continue
+                row = body_writer.next_row()
+                E_kin, E_pot, L = self.system.diagnostics(state, reuse_pairs=True)
+                row[0] = k * dt
+                row[1:1 + n6] = state
+                row[1 + n6:4 + n6] = E_kin, E_pot, E_kin + E_pot
+                row[4 + n6:] = L
+
+                self.gather()
+                row = particle_writer.next_row()
+                row[:, 0:3] = self.x
+                row[:, 3:6] = self.v
+                row[:, 6] = self.status
+        wall = time.perf_counter() - start
+        self.system.state = state
+
+        counts = {'active': int(np.sum(self.status == ACTIVE)), 'escaped': int(np.sum(self.status == ESCAPED)),
+                  'collided': int(np.sum(self.status == COLLIDED))}
+        if verbose:
+            print(f"Enjambre de {self.n_particles} partículas completado en {wall:.2f} s: "
+                  f"{counts['active']} activas, {counts['escaped']} escapadas, {counts['collided']} choques")
+            print(f"Cuerpos en data/{filename}.trj, partículas en data/{filename}_particles.trj")
+        return dict(counts, wall_time=wall)
+
+
+def load_swarm(filename):
+    """
+    Abre data/{filename}_particles.trj mapeado en memoria.
+
+    :return: (tiempos (n,), datos (n, P, 7), encabezado).
+    """
+    header, data = open_trajectory(f"data/{filename}_particles.trj")
+    times = np.arange(len(data)) * header['params']['sample_dt']
+    return times, data, header
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Enjambre de partículas sin masa alrededor de L4")
+    parser.add_argument("--config", type=str, default="config/L4_asteroid.yaml",
+                        help="Configuración con los cuerpos masivos")
+    parser.add_argument("--bodies", nargs='+', type=int, default=[1, 2],
+                        help="Cuerpos de la configuración que se integran como masivos (desde 1)")
+    parser.add_argument("--particles", type=int, default=10000, help="Número de partículas")
+    parser.add_argument("--primary", type=int, default=1, help="Primario de L4 (índice entre --bodies, desde 1)")
+    parser.add_argument("--secondary", type=int, default=2, help="Secundario de L4 (índice entre --bodies)")
+    parser.add_argument("--radial_spread", type=float, default=0.01,
+                        help="Dispersión radial (fracción de la distancia entre primarios)")
+    parser.add_argument("--angular_spread", type=float, default=5.0, help="Dispersión angular en grados")
+    parser.add_argument("--vertical_spread", type=float, default=0.0,
+                        help="Dispersión fuera del plano (fracción de la distancia entre primarios)")
+    parser.add_argument("--seed", type=int, default=None, help="Semilla de la nube inicial")
+    parser.add_argument("--integrator", type=str, default="yoshida4", choices=list(SYMPLECTIC_WEIGHTS),
+                        help="Integrador simpléctico")
+    parser.add_argument("--dt", type=float, default=None, help="Paso de tiempo (por defecto el de la configuración)")
+    parser.add_argument("--t_max", type=float, default=None, help="Tiempo total (por defecto el de la configuración)")
+    parser.add_argument("--output_every", type=int, default=40, help="Escribir una fila cada N pasos")
+    parser.add_argument("--float64", action="store_true", help="Guardar las partículas en float64")
+    parser.add_argument("--escape_radius", type=float, default=None, help="Radio de escape (m)")
+    parser.add_argument("--collision_radius", type=float, default=0.0, help="Radio de choque (m)")
+    parser.add_argument("--filename", type=str, default=None,
+                        help="Nombre base de salida (por defecto <filename de la configuración>_swarm)")
+
+    args = parser.parse_args()
+    config = validate_config(load_config(args.config))
+    bodies = [i - 1 for i in args.bodies]
+    system = NBodySystem([config['masses'][i] for i in bodies],
+                         [config['initial_positions'][i] for i in bodies],
+                         [config['initial_velocities'][i] for i in bodies],
+                         G=config['G'], softening=config['softening'])
+    positions, velocities = l4_cloud(system, args.particles, args.primary, args.secondary,
+                                     radial_spread=args.radial_spread, angular_spread=args.angular_spread,
+                                     vertical_spread=args.vertical_spread, seed=args.seed)
+
+    os.makedirs("data", exist_ok=True)
+    swarm = TestParticleSwarm(system, positions, velocities, integrator=args.integrator,
+                              escape_radius=args.escape_radius, collision_radius=args.collision_radius)
+    swarm.simulate(args.t_max or config['t_max'], args.dt or config['dt'],
+                   filename=args.filename or f"{config['filename']}_swarm",
+                   output_every=args.output_every, dtype="<f8" if args.float64 else "<f4")
@@ -0,0 +1,211 @@
+import os
+import re
+import copy
+import json
+import time
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+
+from config_loader import load_config, validate_config
+from three_body_system import run_config
+from trajectory_io import open_trajectory
+
+
+# Ruta de un parámetro dentro de la configuración: "dt", "masses[1]", "initial_velocities[2][0]"
+_PATH_RE = re.compile(r"^(\w+)((?:\[\d+\])*)$")
+
+
+def parse_path(path):
+    """Convierte 'initial_positions[2][0]' en ('initial_positions', [2, 0])."""
+    match = _PATH_RE.match(path.replace(" ", ""))
+    if not match:
+        raise ValueError(f"Ruta de parámetro no válida: {path}")
+    key, indices = match.groups()
+    return key, [int(i) for i in re.findall(r"\d+", indices)]
+
+
+def set_path(config, path, value):
+    """Asigna 'value' en la ruta dada de la configuración (in situ)."""
+    key, indices = parse_path(path)
+    if key not in config:
+        raise ValueError(f"La configuración base no contiene la clave '{key}'")
+    if not indices:
+        config[key] = value
+        return
+    target = config[key]
+    for i in indices[:-1]:
+        target = target[i]
+    target[indices[-1]] = value
+
+
+def grid_values(spec):
+    """Valores de una dimensión de la malla: lista explícita o {min, max, num[, log]}."""
+    if isinstance(spec, dict):
+        lo, hi, num = float(spec['min']), float(spec['max']), int(spec['num'])
+        if spec.get('log', False):
+            return np.geomspace(lo, hi, num).tolist()
+        return np.linspace(lo, hi, num).tolist()
+    return [float(v) for v in spec]
+
+
+def random_value(spec, rng):
+    """Muestra uniforme (o log-uniforme con log: true) en [min, max]."""
+    lo, hi = float(spec['min']), float(spec['max'])
+    if spec.get('log', False):
+        return float(np.exp(rng.uniform(np.log(lo), np.log(hi))))
+    return float(rng.uniform(lo, hi))
+
+
+def generate_runs(spec):
+    """
+    Genera (índice, {ruta: valor}) para cada corrida del barrido.
+
+    mode: "grid" recorre el producto cartesiano de los valores de 'parameters';
+    mode: "random" toma 'samples' muestras con la semilla 'seed'. La secuencia
+    es determinista, lo que permite reanudar un barrido por índice.
+    """
+    parameters = spec['parameters']
+    paths = list(parameters)
+    mode = spec.get('mode', 'grid')
+
+    if mode == 'grid':
+        axes = [grid_values(parameters[p]) for p in paths]
+        for index, values in enumerate(itertools.product(*axes)):
+            yield index, dict(zip(paths, values))
+    elif mode == 'random':
+        rng = np.random.default_rng(spec.get('seed', 0))
+        for index in range(int(spec['samples'])):
+            yield index, {p: random_value(parameters[p], rng) for p in paths}
+    else:
+        raise ValueError("mode debe ser 'grid' o 'random'")
+
+
+def build_config(base, name, index, values):
+    """Configuración validada de una corrida: la base con los valores del barrido aplicados."""
+    config = copy.deepcopy(base)
+    for path, value in values.items():
+        set_path(config, path, value)
+    config['filename'] = f"sweeps/{name}/run_{index:05d}"
+    return validate_config(config)
+
+
+def run_member(index, values, config):
+    """Ejecuta una corrida del barrido en un proceso trabajador y devuelve su entrada del manifiesto."""
+    start = time.perf_counter()
+    simulator = run_config(config, verbose=False)
+    wall = time.perf_counter() - start
+
+    # Resumen leído del archivo mapeado en memoria (no se carga entero)
+    header, data = open_trajectory(f"data/{config['filename']}.trj")
+    # Con diagnostics_every > 1 las filas sin diagnósticos tienen E_tot = NaN
+    E_tot = np.asarray(data[:, header['columns'].index('E_tot')])
+    E_tot = E_tot[np.isfinite(E_tot)]
+    max_dE = float(np.max(np.abs((E_tot - E_tot[0]) / E_tot[0]))) if len(E_tot) else float('nan')
+
+    return {
+        'index': index,
+        'status': 'ok',
+        'parameters': values,
+        'file': f"data/{config['filename']}.trj",
+        'rows': int(len(data)),
+        'wall_time': wall,
+        'max_rel_energy_drift': max_dE,
+        'stats': simulator.stats,
+        'events': simulator.events_log,
+    }
+
+
+def read_manifest(path):
+    """Índices de las corridas ya completadas en el manifiesto (para reanudar)."""
+    done = set()
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    entry = json.loads(line)
+                    if entry.get('status') == 'ok':
+                        done.add(entry['index'])
+    return done
+
+
+def run_sweep(spec, workers=None, max_in_flight=None, force=False):
+    """
+    Ejecuta un barrido de parámetros en un ProcessPoolExecutor.
+
+    Cada corrida escribe data/sweeps/<name>/run_XXXXX.trj y, al terminar, una línea
+    en data/sweeps/<name>/manifest.jsonl. Las corridas ya presentes en el manifiesto
+    se saltan (reanudación). Solo hay 'max_in_flight' corridas enviadas a la vez, de
+    modo que la memoria no crece con el tamaño del barrido.
+    """
+    name = spec['name']
+    base = spec['base']
+    if isinstance(base, str):
+        base = load_config(base)
+    validate_config(base)
+
+    out_dir = f"data/sweeps/{name}"
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = f"{out_dir}/manifest.jsonl"
+    if force and os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    done = read_manifest(manifest_path)
+
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2 * workers
+    runs = (r for r in generate_runs(spec) if r[0] not in done)
+
+    completed = failed = 0
+    start = time.perf_counter()
+    print(f"Barrido '{name}': {len(done)} corridas ya completadas, {workers} procesos")
+
+    with ProcessPoolExecutor(max_workers=workers) as executor, open(manifest_path, "a") as manifest:
+        pending = {}
+        exhausted = False
+        while pending or not exhausted:
+            # Rellenar la ventana de corridas en vuelo
+            while not exhausted and len(pending) < max_in_flight:
+                run = next(runs, None)
+                if run is None:
+                    exhausted = True
+                    break
+                index, values = run
+                config = build_config(base, name, index, values)
+                pending[executor.submit(run_member, index, values, config)] = (index, values)
+
+            if not pending:
+                break
+
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                index, values = pending.pop(future)
+                try:
+                    entry = future.result()
+                    completed += 1
+                except Exception as exc:
+                    entry = {'index': index, 'status': 'error', 'parameters': values, 'error': repr(exc)}
+                    failed += 1
+                manifest.write(json.dumps(entry) + "\n")
+                manifest.flush()
+
+            elapsed = time.perf_counter() - start
+            print(f"  {completed} completadas, {failed} fallidas ({elapsed:.1f} s)", end="\r")
+
+    print(f"\nBarrido '{name}' terminado. Manifiesto en {manifest_path}")
+    return manifest_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Barrido de parámetros en paralelo sobre una configuración base")
+    parser.add_argument("spec", type=str, help="Especificación del barrido (.json o .yaml)")
+    parser.add_argument("--workers", type=int, default=None, help="Número de procesos (por defecto todos los núcleos)")
+    parser.add_argument("--max_in_flight", type=int, default=None,
+                        help="Corridas enviadas simultáneamente (por defecto 2 x procesos)")
+    parser.add_argument("--force", action="store_true",
+                        help="Ignorar el manifiesto existente y repetir todas las corridas")
+
+    args = parser.parse_args()
+    run_sweep(load_config(args.spec), workers=args.workers, max_in_flight=args.max_in_flight, force=args.force)
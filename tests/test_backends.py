@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+import jit_backend
+import scalar_backend
+from integrators import SYMPLECTIC_WEIGHTS
+from three_body_system import NBodySystem, ThreeBodySimulator
+
+
+MASSES = [1.989e30, 5.972e24, 7.348e22]
+POSITIONS = [[0.0, 0.0, 0.0], [1.496e11, 0.0, 0.0], [1.496e11 + 3.844e8, 0.0, 0.0]]
+VELOCITIES = [[0.0, 0.0, 0.0], [0.0, 29780.0, 0.0], [0.0, 29780.0 + 1022.0, 0.0]]
+G = 6.67430e-11
+DT = 3600.0
+STEPS = 200
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    # ThreeBodySimulator crea data/ en el directorio actual
+    monkeypatch.chdir(tmp_path)
+
+
+def numpy_rows(integrator):
+    """Filas (t, estado, diagnósticos) del camino NumPy (states() del simulador)."""
+    system = NBodySystem(MASSES, POSITIONS, VELOCITIES, G=G)
+    simulator = ThreeBodySimulator(system, "test_backends", integrator=integrator, verbose=False)
+    rows = []
+    for t, state in simulator.states(STEPS * DT, DT):
+        E_kin, E_pot, L = system.diagnostics(state)
+        rows.append(np.concatenate([[t], state, [E_kin, E_pot, E_kin + E_pot], L]))
+    return np.array(rows)
+
+
+def block_rows(run_block, integrator):
+    """Filas de un núcleo por bloques (jit_backend o scalar_backend) para la misma corrida."""
+    if integrator == "rk4":
+        kind, weights = jit_backend.RK4, np.ones(1)
+    else:
+        kind, weights = jit_backend.SYMPLECTIC, np.array(SYMPLECTIC_WEIGHTS[integrator])
+    state = np.concatenate([np.ravel(POSITIONS), np.ravel(VELOCITIES)])
+    out = np.empty((STEPS + 1, 6 * len(MASSES) + 7))
+    rows, _ = run_block(kind, state, np.array(MASSES), G, DT, 0.0, 0, STEPS, STEPS, 1, 1, weights, out)
+    return out[:rows]
+
+
+def relative_error(rows, reference):
+    scale = np.maximum(np.ptp(reference, axis=0), np.abs(reference).max(axis=0)) + 1e-300
+    return np.max(np.abs(rows - reference) / scale)
+
+
+@pytest.mark.parametrize("integrator", ("rk4",) + tuple(SYMPLECTIC_WEIGHTS))
+def test_run_block_matches_numpy(integrator):
+    # Sin Numba, run_block se ejecuta como Python puro (la misma lógica que se compila)
+    reference = numpy_rows(integrator)
+    rows = block_rows(getattr(jit_backend.run_block, "py_func", jit_backend.run_block), integrator)
+    assert rows.shape == reference.shape
+    assert relative_error(rows, reference) < 1e-10
+
+
+@pytest.mark.parametrize("integrator", ("rk4",) + tuple(SYMPLECTIC_WEIGHTS))
+def test_scalar_run_block_matches_numpy(integrator):
+    reference = numpy_rows(integrator)
+    rows = block_rows(scalar_backend.run_block, integrator)
+    assert rows.shape == reference.shape
+    assert relative_error(rows, reference) < 1e-10
@@ -0,0 +1,16 @@
+import numpy as np
+import pytest
+
+from events import find_root
+
+
+@pytest.mark.parametrize("g, t0, t1, root", [
+    (lambda t: np.exp(t) - 2, 0.0, 1.0, np.log(2)),
+    (lambda t: 2 - np.exp(t), 0.0, 1.0, np.log(2)),
+    (lambda t: t**3 - 0.2, 0.0, 1.0, 0.2**(1 / 3)),
+    (lambda t: 0.5 - np.cos(t), 0.0, 2.0, np.pi / 3),
+])
+def test_find_root_converges_to_known_root(g, t0, t1, root):
+    t = find_root(g, t0, g(t0), t1, g(t1), tol=1e-12)
+    assert t == pytest.approx(root, abs=1e-10)
+    assert abs(g(t)) < 1e-10
@@ -1,146 +1,844 @@
 import os
+import json
+import warnings
+import contextlib
+import functools
 import numpy as np
 import argparse
 from config_loader import load_config, validate_config
+from barnes_hut import barnes_hut_accelerations
+from trajectory_io import TrajectoryWriter
+from integrators import DormandPrince45, LogHamiltonian, REGULARIZED_WEIGHTS, SYMPLECTIC_WEIGHTS, symplectic_step
+from events import EventMonitor, build_events
+from profiler import Profiler
+from result_cache import ResultCache
+import jit_backend
+import scalar_backend
 
 
-class ThreeBodySystem:
-    def __init__(self, masses, initial_positions, initial_velocities, G=6.67430e-11):
+# Por encima de este número de cuerpos las matrices densas de pares (P x N)
+# dejan de compensar y el núcleo directo usa índices y bincount.
+DENSE_PAIR_LIMIT = 32
+
+# Hasta este número de cuerpos el backend NumPy integra los sistemas individuales
+# con paso fijo en bloques de Python puro (scalar_backend.run_block): con
+# arreglos tan pequeños el coste de cada llamada a NumPy domina sobre la aritmética.
+SCALAR_BODY_LIMIT = 8
+
+# Columnas del archivo de salida de un ensemble en modo "summary": deriva relativa
+# de energía y de |L| (media y máximo sobre las réplicas) y distancia mínima entre
+# pares (mínimo global y media de los mínimos por réplica).
+SUMMARY_COLUMNS = ["t", "dE_mean", "dE_max", "dL_mean", "dL_max", "r_min", "r_min_mean"]
+
+INTEGRATORS = ("rk4", "rk45") + tuple(SYMPLECTIC_WEIGHTS) + tuple(REGULARIZED_WEIGHTS)
+
+BACKENDS = ("numpy", "numba")
+
+
+class NBodySystem:
+    def __init__(self, masses, initial_positions, initial_velocities, G=6.67430e-11,
+                 force_method="direct", theta=0.5, softening=0.0):
         """
-        Inicializa el sistema de tres cuerpos.
+        Inicializa un sistema gravitacional de N cuerpos.
         
-        :param masses: Lista de masas [m1, m2, m3] en kg.
-        :param initial_positions: Lista de posiciones iniciales [[x1, y1, z1], [x2, y2, z2], [x3, y3, z3]] en m.
-        :param initial_velocities: Lista de velocidades iniciales [[vx1, vy1, vz1], [vx2, vy2, vz2], [vx3, vy3, vz3]] en m/s.
+        Si las posiciones y velocidades tienen forma (M, N, 3) el sistema es un
+        ensemble de M réplicas independientes que se integran a la vez: el estado
+        tiene forma (M, 6N) y las masas pueden ser comunes (N,) o por réplica (M, N).
+        
+        :param masses: Lista de masas [m1, ..., mN] en kg.
+        :param initial_positions: Lista de posiciones iniciales [[x1, y1, z1], ..., [xN, yN, zN]] en m.
+        :param initial_velocities: Lista de velocidades iniciales [[vx1, vy1, vz1], ..., [vxN, vyN, vzN]] en m/s.
         :param G: Constante gravitacional (N m²/kg²).
+        :param force_method: "direct" (suma directa O(N²)) o "barnes_hut" (octree O(N log N)).
+        :param theta: Ángulo de apertura de Barnes–Hut.
+        :param softening: Longitud de suavizado de Plummer ε en m (0 = gravedad newtoniana).
+                          Las fuerzas usan (|r_ij|² + ε²)^(-3/2) y la energía potencial
+                          -G m_i m_j / sqrt(|r_ij|² + ε²), que es la que se conserva.
         """
-        self.masses = np.array(masses)
+        if force_method not in ("direct", "barnes_hut"):
+            raise ValueError(f"Método de fuerzas no soportado: {force_method}")
+        if softening < 0:
+            raise ValueError("softening debe ser no negativo")
+        
+        self.masses = np.array(masses, dtype=float)
+        self.n_bodies = self.masses.shape[-1]
         self.G = G
+        self.force_method = force_method
+        self.theta = theta
+        self.softening = float(softening)
+        self._eps2 = self.softening**2
+        
+        positions = np.array(initial_positions, dtype=float)
+        velocities = np.array(initial_velocities, dtype=float)
+        if positions.shape != velocities.shape or positions.shape[-2:] != (self.n_bodies, 3):
+            raise ValueError("Las posiciones y velocidades deben tener 3 componentes por cuerpo")
+        
+        # Forma del lote: () para un sistema, (M,) para un ensemble de M réplicas
+        self.batch_shape = positions.shape[:-2]
+        self.ensemble_size = self.batch_shape[0] if self.batch_shape else None
+        if len(self.batch_shape) > 1 or self.masses.ndim > len(self.batch_shape) + 1:
+            raise ValueError("El ensemble debe tener forma (M, N, 3) y masas (N,) o (M, N)")
+        if self.ensemble_size is not None and (force_method != "direct" or self.n_bodies > DENSE_PAIR_LIMIT):
+            raise ValueError(f"El modo ensemble requiere suma directa y N <= {DENSE_PAIR_LIMIT}")
         
-        # Estado del sistema: [x1, y1, z1, vx1, vy1, vz1, x2, y2, z2, vx2, vy2, vz2, x3, y3, z3, vx3, vy3, vz3]
-        self.state = np.concatenate([np.array(initial_positions).flatten(), 
-                                    np.array(initial_velocities).flatten()])
+        # Estado del sistema: [x1, y1, z1, ..., xN, yN, zN, vx1, vy1, vz1, ..., vxN, vyN, vzN]
+        self.state = np.concatenate([positions.reshape(self.batch_shape + (-1,)),
+                                     velocities.reshape(self.batch_shape + (-1,))], axis=-1)
+        
+        self._init_pair_kernel()
     
-    def acceleration(self, i, positions):
-        """Calcula la aceleración del cuerpo i debido a los otros dos cuerpos."""
-        mi = self.masses[i]
-        ri = positions[i]
-        acc = np.zeros(3)
+    @classmethod
+    def stack(cls, systems):
+        """Construye un ensemble a partir de una lista de sistemas con el mismo N, G y suavizado."""
+        n3 = 3 * systems[0].n_bodies
+        states = np.array([s.state for s in systems])
+        masses = np.array([s.masses for s in systems])
+        if np.all(masses == masses[0]):
+            masses = masses[0]
+        return cls(masses, states[:, :n3].reshape(len(systems), -1, 3),
+                   states[:, n3:].reshape(len(systems), -1, 3), G=systems[0].G,
+                   softening=systems[0].softening)
+    
+    def _init_pair_kernel(self):
+        """
+        Prepara las matrices de pares y los buffers del núcleo vectorizado de fuerzas.
         
-        for j in range(3):
-            if j != i:
-                rj = positions[j]
-                rij = rj - ri
-                r = np.linalg.norm(rij)
-                acc += self.G * self.masses[j] * rij / (r**3)
+        Cada par (i, j) con i < j se evalúa una sola vez (tercera ley de Newton):
+        D (P x N) obtiene los desplazamientos r_j - r_i como D @ posiciones y
+        A (N x P) reparte G*m_j sobre el cuerpo i y -G*m_i sobre el cuerpo j.
+        Para N grande no se construyen D ni A (crecen como N³). En un ensemble
+        los mismos productos se hacen con np.matmul sobre todo el lote.
+        """
+        n = self.n_bodies
+        self._pair_i, self._pair_j = np.triu_indices(n, k=1)
+        n_pairs = len(self._pair_i)
+        self._dense_pairs = n <= DENSE_PAIR_LIMIT
+        self._matmul = np.matmul if self.batch_shape else np.dot
         
-        return acc
+        if self._dense_pairs:
+            pairs = np.arange(n_pairs)
+            
+            self._pair_diff = np.zeros((n_pairs, n))
+            self._pair_diff[pairs, self._pair_j] = 1.0
+            self._pair_diff[pairs, self._pair_i] = -1.0
+            
+            self._pair_force = np.zeros(self.masses.shape[:-1] + (n, n_pairs))
+            self._pair_force[..., self._pair_i, pairs] = self.G * self.masses[..., self._pair_j]
+            self._pair_force[..., self._pair_j, pairs] = -self.G * self.masses[..., self._pair_i]
+        else:
+            self._gm_i = self.G * self.masses[self._pair_i]
+            self._gm_j = self.G * self.masses[self._pair_j]
+        
+        if self.force_method == "direct":
+            # Buffers preasignados (se reutilizan en cada evaluación). |r_ij|² se replica
+            # en las 3 columnas (producto por una matriz de unos) para evitar broadcasting.
+            shape = self.batch_shape + (n_pairs, 3)
+            self._ones = np.ones((3, 3))
+            self._dr = np.empty(shape)
+            self._r2 = np.empty(shape)
+            self._inv_r3 = np.empty(shape)
+            self._f = np.empty(shape)
     
-    def equations_of_motion(self, state):
-        """Devuelve las derivadas del estado (18 ecuaciones)."""
-        positions = state[:9].reshape(3, 3)  # [x1, y1, z1, x2, y2, z2, x3, y3, z3]
-        velocities = state[9:].reshape(3, 3)  # [vx1, vy1, vz1, ..., vz3]
+    def accelerations(self, positions, out=None):
+        """
+        Calcula las aceleraciones de todos los cuerpos en una sola pasada.
         
-        derivatives = np.zeros_like(state)
+        :param positions: Arreglo (N, 3) con las posiciones de los cuerpos ((M, N, 3) en un ensemble).
+        :param out: Arreglo de la misma forma opcional donde escribir el resultado.
+        """
+        if out is None:
+            out = np.empty(self.batch_shape + (self.n_bodies, 3))
         
-        # dx/dt = v (para los 3 cuerpos)
-        derivatives[:9] = state[9:]
+        if self.force_method == "barnes_hut":
+            return barnes_hut_accelerations(positions, self.masses, self.G, theta=self.theta,
+                                            softening=self.softening, out=out)
         
-        # dv/dt = a (aceleración calculada para cada cuerpo)
-        for i in range(3):
-            derivatives[9 + 3*i : 12 + 3*i] = self.acceleration(i, positions)
+        matmul = self._matmul
+        if self._dense_pairs:
+            matmul(self._pair_diff, positions, out=self._dr)    # r_ij = r_j - r_i
+        else:
+            np.subtract(positions[self._pair_j], positions[self._pair_i], out=self._dr)
+        np.multiply(self._dr, self._dr, out=self._f)
+        matmul(self._f, self._ones, out=self._r2)               # |r_ij|²
+        if self._eps2:
+            self._r2 += self._eps2                              # |r_ij|² + ε² (Plummer)
+        np.power(self._r2, -1.5, out=self._inv_r3)              # 1/|r_ij|³
+        np.multiply(self._dr, self._inv_r3, out=self._f)        # r_ij/|r_ij|³
         
-        return derivatives
+        if self._dense_pairs:
+            matmul(self._pair_force, self._f, out=out)
+        else:
+            for k in range(3):
+                out[:, k] = (np.bincount(self._pair_i, self._gm_j * self._f[:, k], self.n_bodies)
+                             - np.bincount(self._pair_j, self._gm_i * self._f[:, k], self.n_bodies))
+        return out
     
-    def kinetic_energy(self):
-        """Calcula la energía cinética total del sistema."""
-        velocities = self.state[9:].reshape(3, 3)
-        return 0.5 * np.sum(self.masses * np.sum(velocities**2, axis=1))
+    def acceleration(self, i, positions):
+        """Calcula la aceleración del cuerpo i debido al resto de cuerpos."""
+        positions = np.asarray(positions).reshape(self.batch_shape + (-1, 3))
+        return self.accelerations(positions)[..., i, :].copy()
     
-    def potential_energy(self):
-        """Calcula la energía potencial gravitacional total del sistema."""
-        positions = self.state[:9].reshape(3, 3)
-        pe = 0.0
+    def positions(self, state=None):
+        """Vista (N, 3) (o (M, N, 3)) de las posiciones del estado dado o del actual."""
+        state = self.state if state is None else state
+        return state[..., :3*self.n_bodies].reshape(state.shape[:-1] + (-1, 3))
+    
+    def velocities(self, state=None):
+        """Vista (N, 3) (o (M, N, 3)) de las velocidades del estado dado o del actual."""
+        state = self.state if state is None else state
+        return state[..., 3*self.n_bodies:].reshape(state.shape[:-1] + (-1, 3))
+    
+    def equations_of_motion(self, state, out=None):
+        """
+        Devuelve las derivadas del estado (6N ecuaciones por réplica).
+        
+        :param out: Arreglo opcional (misma forma que state) donde escribir las derivadas.
+        """
+        n3 = 3 * self.n_bodies
+        if out is None:
+            out = np.empty_like(state)
         
-        for i in range(3):
-            for j in range(i+1, 3):
-                rij = positions[j] - positions[i]
-                r = np.linalg.norm(rij)
-                pe -= self.G * self.masses[i] * self.masses[j] / r
+        # dx/dt = v (para todos los cuerpos)
+        np.copyto(out[..., :n3], state[..., n3:])
         
-        return pe
+        # dv/dt = a (aceleración de todos los cuerpos en una pasada)
+        self.accelerations(self.positions(state), out=self.velocities(out))
+        
+        return out
+    
+    def kinetic_energy(self):
+        """Calcula la energía cinética total del sistema (una por réplica en un ensemble)."""
+        velocities = self.velocities()
+        return 0.5 * np.sum(self.masses * np.sum(velocities**2, axis=-1), axis=-1)
+    
+    def potential_energy(self):
+        """Calcula la energía potencial gravitacional total del sistema (una por réplica en un ensemble)."""
+        return self.potential(self.positions())
+    
+    def potential(self, positions):
+        """Energía potencial (suavizada si softening > 0) de las posiciones dadas."""
+        rij = positions[..., self._pair_j, :] - positions[..., self._pair_i, :]
+        inv_r = (np.einsum('...pk,...pk->...p', rij, rij) + self._eps2)**-0.5
+        mm = self.masses[..., self._pair_i] * self.masses[..., self._pair_j]
+        return -self.G * np.sum(mm * inv_r, axis=-1)
     
     def total_energy(self):
         """Calcula la energía total del sistema."""
         return self.kinetic_energy() + self.potential_energy()
     
     def angular_momentum(self):
-        """Calcula el momento angular total del sistema."""
-        positions = self.state[:9].reshape(3, 3)
-        velocities = self.state[9:].reshape(3, 3)
-        L = np.zeros(3)
+        """Calcula el momento angular total del sistema ((M, 3) en un ensemble)."""
+        positions = self.positions()
+        velocities = self.velocities()
+        return np.sum(self.masses[..., None] * np.cross(positions, velocities), axis=-2)
+    
+    def diagnostics(self, state=None, reuse_pairs=False):
+        """
+        Calcula (E_kin, E_pot, L) en una sola pasada vectorizada.
         
-        for i in range(3):
-            L += self.masses[i] * np.cross(positions[i], velocities[i])
+        :param state: Estado a evaluar (por defecto el actual).
+        :param reuse_pairs: Reutilizar las distancias |r_ij|² de la última evaluación
+                            de fuerzas, que debe corresponder a este mismo estado.
+        """
+        positions = self.positions(state)
+        velocities = self.velocities(state)
+        
+        E_kin = 0.5 * np.sum(self.masses * np.einsum('...k,...k->...', velocities, velocities), axis=-1)
+        
+        if reuse_pairs and self.force_method == "direct":
+            inv_r = self._r2[..., 0]**-0.5
+        else:
+            rij = positions[..., self._pair_j, :] - positions[..., self._pair_i, :]
+            inv_r = (np.einsum('...pk,...pk->...p', rij, rij) + self._eps2)**-0.5
+        mm = self.masses[..., self._pair_i] * self.masses[..., self._pair_j]
+        E_pot = -self.G * np.sum(mm * inv_r, axis=-1)
+        
+        L = np.sum(self.masses[..., None] * np.cross(positions, velocities), axis=-2)
+        return E_kin, E_pot, L
+    
+    def pair_distances(self):
+        """Distancias |r_ij| de cada par i < j ((M, P) en un ensemble)."""
+        positions = self.positions()
+        rij = positions[..., self._pair_j, :] - positions[..., self._pair_i, :]
+        return np.sqrt(np.einsum('...pk,...pk->...p', rij, rij))
+
+
+class ThreeBodySystem(NBodySystem):
+    def __init__(self, masses, initial_positions, initial_velocities, G=6.67430e-11, **kwargs):
+        """
+        Inicializa el sistema de tres cuerpos.
         
-        return L
+        :param masses: Lista de masas [m1, m2, m3] en kg.
+        :param initial_positions: Lista de posiciones iniciales [[x1, y1, z1], [x2, y2, z2], [x3, y3, z3]] en m.
+        :param initial_velocities: Lista de velocidades iniciales [[vx1, vy1, vz1], [vx2, vy2, vz2], [vx3, vy3, vz3]] en m/s.
+        :param G: Constante gravitacional (N m²/kg²).
+        """
+        if np.shape(masses)[-1] != 3:
+            raise ValueError("ThreeBodySystem requiere exactamente 3 cuerpos; use NBodySystem")
+        super().__init__(masses, initial_positions, initial_velocities, G=G, **kwargs)
+
+
+def state_columns(n_bodies):
+    """Nombres de las columnas de estado del archivo de salida para N cuerpos."""
+    positions = [f"{c}{i}" for i in range(1, n_bodies + 1) for c in ("x", "y", "z")]
+    velocities = [f"v{c}{i}" for i in range(1, n_bodies + 1) for c in ("x", "y", "z")]
+    return positions + velocities
+
 
 class ThreeBodySimulator:
-    def __init__(self, system, filename="three_body_simulation"):
+    def __init__(self, system, filename="three_body_simulation", integrator="rk4", rtol=1e-9, atol=1e-6,
+                 ensemble_output="members", output_every=1, diagnostics_every=1, backend="numpy",
+                 checkpoint_every=0, profile=False, progress_every=0.0, verbose=True):
         """
         Inicializa el simulador del sistema de tres cuerpos.
+        
+        Acepta cualquier sistema con la interfaz de NBodySystem (N arbitrario).
+        
+        :param integrator: "rk4" (paso fijo), "rk45" (Dormand–Prince adaptativo con salida densa),
+                           uno simpléctico: "leapfrog", "yoshida4", "yoshida6", o uno regularizado
+                           para encuentros cercanos: "logh", "logh4" (ver LogHamiltonian).
+        :param rtol: Tolerancia relativa del integrador adaptativo.
+        :param atol: Tolerancia absoluta del integrador adaptativo.
+        :param ensemble_output: Con un ensemble, "members" guarda el estado de cada réplica y
+                                "summary" solo estadísticas agregadas por paso (ver SUMMARY_COLUMNS).
+        :param output_every: Escribir una fila cada 'output_every' pasos de la malla dt.
+        :param diagnostics_every: Calcular energías y momento angular cada 'diagnostics_every'
+                                  filas escritas (el resto lleva NaN en esas columnas).
+        :param backend: "numpy" o "numba" (bloques de pasos en una función compilada; solo
+                        integradores de paso fijo con suma directa y sin ensemble). Si Numba
+                        no está disponible se usa "numpy" con un aviso.
+        :param checkpoint_every: Guardar un checkpoint en data/{filename}.ckpt.npz cada
+                                 'checkpoint_every' pasos de la malla dt (0 lo desactiva).
+        :param profile: Medir el tiempo de cada fase del bucle (integración, fuerzas, etapas RK,
+                        diagnósticos, escritura, eventos, checkpoints) e imprimir un resumen al
+                        terminar (ver profiler.Profiler). Desactivado no añade ningún coste.
+        :param progress_every: Imprimir una línea de progreso con ETA cada 'progress_every'
+                               segundos (0 la desactiva).
+        :param verbose: Imprimir el resumen al terminar la simulación.
         """
+        if output_every < 1 or diagnostics_every < 1:
+            raise ValueError("output_every y diagnostics_every deben ser enteros positivos")
+        if checkpoint_every < 0:
+            raise ValueError("checkpoint_every debe ser no negativo (0 desactiva los checkpoints)")
+        if integrator not in INTEGRATORS:
+            raise ValueError(f"Integrador no soportado: {integrator}. Opciones: {', '.join(INTEGRATORS)}")
+        if ensemble_output not in ("members", "summary"):
+            raise ValueError("ensemble_output debe ser 'members' o 'summary'")
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend no soportado: {backend}. Opciones: {', '.join(BACKENDS)}")
+        if integrator in REGULARIZED_WEIGHTS and (system.ensemble_size is not None
+                                                  or system.force_method != "direct"):
+            raise ValueError("Los integradores regularizados requieren suma directa y un sistema individual")
+        
         self.system = system
         self.filename = filename
+        self.integrator = integrator
+        self.rtol = rtol
+        self.atol = atol
+        self.ensemble_output = ensemble_output
+        self.output_every = int(output_every)
+        self.diagnostics_every = int(diagnostics_every)
+        self.checkpoint_every = int(checkpoint_every)
+        self.profile = profile
+        self.progress_every = progress_every
+        self.profile_summary = None
+        self._profiler = None
+        self.verbose = verbose
+        self._pairs_current = False
+        self.backend = self._resolve_backend(backend)
+        self.stats = {}
         os.makedirs("data", exist_ok=True)
     
+    def _resolve_backend(self, backend):
+        """Devuelve el backend efectivo, recurriendo a NumPy cuando el compilado no aplica."""
+        if backend != "numba":
+            return backend
+        if not jit_backend.NUMBA_AVAILABLE:
+            warnings.warn("Numba no está instalado; se usa el backend NumPy")
+            return "numpy"
+        if (self._dense_output() or self.system.force_method != "direct"
+                or self.system.ensemble_size is not None or self.system.softening):
+            warnings.warn("El backend numba solo admite integradores de paso fijo con suma directa, "
+                          "sin suavizado y sin ensemble; se usa el backend NumPy")
+            return "numpy"
+        return backend
+    
+    def _scalar_blocks(self):
+        """
+        True si simulate() usa los bloques en Python puro de scalar_backend.run_block.
+        
+        Con profile=True se usa el bucle NumPy instrumentado, para que el resumen
+        separe fuerzas, etapas RK y diagnósticos.
+        """
+        return (self.backend == "numpy" and not self.profile and not self._dense_output()
+                and self.system.ensemble_size is None and self.system.force_method == "direct"
+                and self.system.n_bodies <= SCALAR_BODY_LIMIT)
+    
+    def _dense_output(self):
+        """True si el integrador da pasos propios y la salida sale de su interpolación densa."""
+        return self.integrator == "rk45" or self.integrator in REGULARIZED_WEIGHTS
+    
+    def _dense_solver(self):
+        """Integrador con salida densa: Dormand–Prince o el leapfrog regularizado."""
+        if self.integrator == "rk45":
+            return DormandPrince45(self.system.equations_of_motion, rtol=self.rtol, atol=self.atol)
+        return LogHamiltonian(self.system.accelerations, self.system.potential, self.system.masses,
+                              REGULARIZED_WEIGHTS[self.integrator])
+    
+    def _rk_stage_buffers(self, state):
+        """Buffers (k1, k2, k3, k4, tmp) de RK4 reutilizados entre pasos."""
+        if getattr(self, '_rk_buffers', None) is None or self._rk_buffers[0].shape != state.shape:
+            self._rk_buffers = tuple(np.empty_like(state) for _ in range(5))
+        return self._rk_buffers
+    
     def runge_kutta_step(self, state, dt):
         """Realiza un paso de integración con RK4."""
-        k1 = dt * self.system.equations_of_motion(state)
-        k2 = dt * self.system.equations_of_motion(state + 0.5 * k1)
-        k3 = dt * self.system.equations_of_motion(state + 0.5 * k2)
-        k4 = dt * self.system.equations_of_motion(state + k3)
-        return state + (k1 + 2*k2 + 2*k3 + k4) / 6
-    
-    def simulate(self, t_max, dt):
-        """Ejecuta la simulación y guarda los datos."""
+        k1 = self._rk_stage_buffers(state)[0]
+        self.system.equations_of_motion(state, out=k1)
+        return self._rk4_from_k1(state, dt)
+    
+    def _rk4_from_k1(self, state, dt):
+        """Completa un paso RK4 cuando k1 = f(state) ya está en su buffer."""
+        k1, k2, k3, k4, tmp = self._rk_stage_buffers(state)
+        f = self.system.equations_of_motion
+        
+        np.multiply(k1, 0.5 * dt, out=tmp)
+        tmp += state
+        f(tmp, out=k2)
+        np.multiply(k2, 0.5 * dt, out=tmp)
+        tmp += state
+        f(tmp, out=k3)
+        np.multiply(k3, dt, out=tmp)
+        tmp += state
+        f(tmp, out=k4)
+        
+        # y_{n+1} = y_n + dt/6 (k1 + 2 k2 + 2 k3 + k4)
+        k2 += k3
+        k2 *= 2.0
+        k2 += k1
+        k2 += k4
+        k2 *= dt / 6
+        return state + k2
+    
+    def _fixed_step_states(self, state, steps, dt, first=0, time=0.0):
+        """
+        Genera (t, estado) en cada paso del integrador de paso fijo.
+        
+        k1 se evalúa antes de entregar cada estado, así que las distancias entre
+        pares que guarda el sistema corresponden al estado entregado.
+        'first' y 'time' permiten continuar desde el paso 'first' de un checkpoint.
+        No se avanza después del último estado: se cuentan steps - 1 pasos, como
+        en los bloques compilados y en Python puro.
+        """
+        for k in range(first, steps):
+            self.system.equations_of_motion(state, out=self._rk_stage_buffers(state)[0])
+            self._pairs_current = True
+            yield time, state
+            if k + 1 < steps:
+                state = self._rk4_from_k1(state, dt)
+                time += dt
+        n_steps = max(steps - 1, 0)
+        self.stats = {'accepted': n_steps, 'rejected': 0, 'evaluations': 4 * n_steps}
+    
+    def _adaptive_states(self, state, steps, dt, first=0, solver_state=None):
+        """
+        Genera (t, estado) sobre la malla uniforme t = k*dt usando Dormand–Prince
+        o el leapfrog regularizado.
+        
+        El paso interno se adapta según rtol/atol (Dormand–Prince) o según la
+        transformación de tiempo (regularizado); los estados de salida se obtienen
+        de la interpolación densa del paso que contiene cada t.
+        Con 'solver_state' (de un checkpoint) se continúa desde el paso 'first'.
+        """
+        solver = self._dense_solver()
+        if solver_state is None:
+            solver.initialize(0.0, state, h=dt)
+        else:
+            solver.set_state(solver_state)
+        self._solver = solver
+        
+        self._pairs_current = False  # los estados salen de la interpolación densa
+        for k in range(first, steps):
+            time = k * dt
+            solver.advance_to(time)
+            yield time, solver.dense(time)
+        
+        self.stats = {'accepted': solver.n_accepted, 'rejected': solver.n_rejected,
+                      'evaluations': solver.n_evals}
+    
+    def _symplectic_states(self, state, steps, dt, first=0, time=0.0):
+        """
+        Genera (t, estado) con un integrador simpléctico de paso fijo.
+        
+        El estado se actualiza in situ sobre una copia privada: cada estado
+        generado solo es válido hasta pedir el siguiente. Las aceleraciones
+        iniciales se recalculan del estado, así que al continuar desde un
+        checkpoint ('first', 'time') basta con el estado.
+        """
+        weights = SYMPLECTIC_WEIGHTS[self.integrator]
+        state = np.array(state, dtype=float)
+        x = self.system.positions(state)
+        v = self.system.velocities(state)
+        a = self.system.accelerations(x)
+        
+        # La última evaluación de fuerzas de cada paso es en la posición final
+        self._pairs_current = True
+        for k in range(first, steps):
+            if k > first:
+                symplectic_step(self.system.accelerations, x, v, a, dt, weights)
+                time += dt
+            yield time, state
+        n_steps = max(steps - 1, 0)
+        self.stats = {'accepted': n_steps, 'rejected': 0, 'evaluations': 1 + len(weights) * n_steps}
+    
+    def states(self, t_max, dt, checkpoint=None):
+        """
+        Genera los pares (t, estado) de la simulación con el integrador configurado.
+        
+        Es el bucle de integración de simulate() sin diagnósticos ni escritura.
+        Con 'checkpoint' (ver load_checkpoint) continúa desde el paso guardado.
+        """
         steps = int(t_max / dt)
-        state = self.system.state
+        if checkpoint is None:
+            state, first, time, solver_state = self.system.state, 0, 0.0, None
+        else:
+            state, first, time = checkpoint['state'], checkpoint['step'], checkpoint['time']
+            solver_state = checkpoint.get('solver')
+        
+        if self._dense_output():
+            return self._adaptive_states(state, steps, dt, first, solver_state)
+        if self.integrator in SYMPLECTIC_WEIGHTS:
+            return self._symplectic_states(state, steps, dt, first, time)
+        return self._fixed_step_states(state, steps, dt, first, time)
+    
+    def _partial_stats(self, step):
+        """Contadores del integrador cuando la simulación se detiene en el paso 'step'."""
+        if self._dense_output():
+            return {'accepted': self._solver.n_accepted, 'rejected': self._solver.n_rejected,
+                    'evaluations': self._solver.n_evals}
+        if self.integrator in SYMPLECTIC_WEIGHTS:
+            return {'accepted': step, 'rejected': 0,
+                    'evaluations': 1 + len(SYMPLECTIC_WEIGHTS[self.integrator]) * step}
+        return {'accepted': step, 'rejected': 0, 'evaluations': 4 * step}
+    
+    def run_params(self, t_max, dt):
+        """Parámetros de la corrida que se guardan en el encabezado del archivo de salida."""
+        return {
+            'n_bodies': int(self.system.n_bodies),
+            'ensemble_size': self.system.ensemble_size,
+            'masses': self.system.masses.tolist(),
+            'G': self.system.G,
+            'force_method': self.system.force_method,
+            'theta': self.system.theta,
+            'softening': self.system.softening,
+            'integrator': self.integrator,
+            'rtol': self.rtol,
+            'atol': self.atol,
+            'dt': dt,
+            't_max': t_max,
+            'output_every': self.output_every,
+            'diagnostics_every': self.diagnostics_every,
+            'backend': self.backend,
+        }
+    
+    def _summary_row(self, row, time, E, L, E0, L0):
+        """Rellena una fila de SUMMARY_COLUMNS reduciendo los diagnósticos de todas las réplicas."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dE = np.abs((E - E0) / E0)
+            dL = np.abs(np.linalg.norm(L, axis=-1) - L0) / L0
+        r_min = self.system.pair_distances().min(axis=-1)
+        
+        row[0] = time
+        row[1] = np.mean(dE)
+        row[2] = np.max(dE)
+        row[3] = np.mean(dL)
+        row[4] = np.max(dL)
+        row[5] = np.min(r_min)
+        row[6] = np.mean(r_min)
+    
+    def checkpoint_path(self):
+        return f"data/{self.filename}.ckpt.npz"
+    
+    def save_checkpoint(self, params, step, time, state, offset, E0=None, L0=None, events=None):
+        """
+        Guarda el estado necesario para continuar la corrida en el paso 'step'.
+        
+        Incluye el estado (antes de escribir la fila de 'step'), el tiempo, el estado
+        interno del integrador adaptativo y la posición en bytes del archivo de salida.
+        Se escribe en un archivo temporal que luego reemplaza al anterior, de modo que
+        una interrupción durante la escritura no deja un checkpoint corrupto.
+        """
+        arrays = {
+            'params': np.array(json.dumps(params, sort_keys=True)),
+            'step': np.array(step),
+            'time': np.array(time),
+            'state': np.asarray(state),
+            'offset': np.array(offset),
+        }
+        if E0 is not None:
+            arrays.update(E0=E0, L0=L0)
+        if events is not None:
+            arrays['events'] = np.array(json.dumps(events))
+        if self._dense_output():
+            for key, value in self._solver.get_state().items():
+                arrays['solver_' + key] = np.asarray(value)
+        
+        path = self.checkpoint_path()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    
+    def load_checkpoint(self, params):
+        """
+        Lee el checkpoint de la corrida y comprueba que corresponde a los mismos parámetros.
+        
+        :return: Diccionario con step, time, state, offset y, si aplica, solver, E0, L0 y events.
+        """
+        path = self.checkpoint_path()
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No hay checkpoint para reanudar en {path}")
         
-        with open(f"data/{self.filename}.dat", "w") as file:
-            # Encabezado del archivo de salida
-            file.write("# t x1 y1 z1 x2 y2 z2 x3 y3 z3 ")
-            file.write("vx1 vy1 vz1 vx2 vy2 vz2 vx3 vy3 vz3 ")
-            file.write("E_kin E_pot E_tot Lx Ly Lz\n")
+        with np.load(path) as data:
+            if str(data['params']) != json.dumps(params, sort_keys=True):
+                raise ValueError(f"El checkpoint {path} corresponde a otros parámetros de simulación")
+            checkpoint = {
+                'step': int(data['step']),
+                'time': float(data['time']),
+                'state': data['state'].copy(),
+                'offset': int(data['offset']),
+            }
+            if 'E0' in data:
+                checkpoint.update(E0=data['E0'].copy(), L0=data['L0'].copy())
+            if 'events' in data:
+                checkpoint['events'] = json.loads(str(data['events']))
+            solver = {key[len('solver_'):]: data[key] for key in data.files if key.startswith('solver_')}
+            if solver:
+                checkpoint['solver'] = {key: value[()] if value.ndim == 0 else value.copy()
+                                        for key, value in solver.items()}
+        return checkpoint
+    
+    def _simulate_compiled(self, writer, steps, dt, params, checkpoint=None, block_steps=65536):
+        """
+        Bucle de simulate() con el backend compilado: cada bloque de pasos se
+        ejecuta en jit_backend.run_block y sus filas se escriben de una vez.
+        Los checkpoints se guardan entre bloques.
+        
+        Con los bloques en Python puro (_scalar_blocks) se usa scalar_backend.run_block
+        y cada bloque tiene a lo sumo 'block_steps' pasos.
+        """
+        if self.integrator == "rk4":
+            kind, weights = jit_backend.RK4, np.ones(1)
+        else:
+            kind, weights = jit_backend.SYMPLECTIC, np.array(SYMPLECTIC_WEIGHTS[self.integrator])
+        
+        if checkpoint is None:
+            state, start, time = np.array(self.system.state, dtype=float), 0, 0.0
+        else:
+            state, start, time = checkpoint['state'], checkpoint['step'], checkpoint['time']
+        masses = np.ascontiguousarray(self.system.masses)
+        if self.checkpoint_every:
+            block_steps = min(block_steps, self.checkpoint_every)
+        block_steps = max(block_steps // self.output_every, 1) * self.output_every
+        out = np.empty((block_steps // self.output_every + 1, len(writer.header['columns'])))
+        run_block = jit_backend.run_block
+        if self.backend == "numpy":
+            run_block = functools.partial(scalar_backend.run_block, softening=self.system.softening)
+        if self._profiler is not None:
+            run_block = self._profiler.wrap('integración', run_block)
+        
+        for first in range(start, steps, block_steps):
+            n = min(block_steps, steps - first)
+            rows, time = run_block(kind, state, masses, self.system.G, dt, time, first, n, steps,
+                                               self.output_every, self.diagnostics_every, weights, out)
+            writer.write_rows(out[:rows])
+            last = first + n
+            if (self.checkpoint_every and last < steps
+                    and last // self.checkpoint_every > first // self.checkpoint_every):
+                self.save_checkpoint(params, last, time, state, writer.tell())
+            if self._profiler is not None and self._profiler.progress_every:
+                self._profiler.progress(last, steps, time, start)
+        
+        self.system.state = state
+        n_steps = max(steps - 1, 0)
+        evaluations = 4 * n_steps if kind == jit_backend.RK4 else 1 + len(weights) * n_steps
+        self.stats = {'accepted': n_steps, 'rejected': 0, 'evaluations': evaluations}
+    
+    def _instrument(self, profiler, writer, monitor, states, steps, first):
+        """Envuelve con el perfilador los métodos de cada fase del bucle de simulate()."""
+        profiler.patch(self.system, 'accelerations', 'fuerzas')
+        profiler.patch(self.system, 'equations_of_motion', 'etapas RK')
+        profiler.patch(self.system, 'diagnostics', 'diagnósticos')
+        profiler.patch(writer, 'flush', 'escritura')
+        profiler.patch(writer, 'write_rows', 'escritura')
+        profiler.patch(writer, 'update_header', 'encabezado')
+        profiler.patch(self, 'save_checkpoint', 'checkpoints')
+        if monitor is not None:
+            profiler.patch(monitor, 'check', 'eventos')
+        return profiler.iterate('integración', states, steps, first)
+    
+    def simulate(self, t_max, dt, resume=False, analyzers=(), events=(), block_rows=4096):
+        """
+        Ejecuta la simulación y guarda los datos.
+        
+        Con el integrador adaptativo o los regularizados, dt es el intervalo de
+        muestreo del archivo de salida (y el paso inicial), no el paso de integración.
+        
+        Con resume=True se continúa desde data/{filename}.ckpt.npz: el archivo de
+        salida se trunca a la posición guardada y se sigue escribiendo, de modo que
+        el resultado es idéntico bit a bit al de una corrida sin interrupciones.
+        El checkpoint se elimina al terminar la simulación.
+        
+        'analyzers' son objetos con start(header) y update(filas) (p. ej.
+        analysis.StreamingAnalyzer) que reciben cada bloque de filas al escribirse;
+        al reanudar solo ven las filas escritas desde el checkpoint.
+        
+        'events' son funciones de evento de events.py (separación mínima, escape,
+        distancia a L4, error de energía). Se evalúan en cada paso; cada cruce se
+        localiza por interpolación de Hermite y se guarda en el encabezado del
+        archivo ('events'). Un evento terminal escribe la fila de ese paso y detiene
+        la simulación. Los eventos requieren el backend NumPy y un sistema individual.
+        
+        'block_rows' es el número de filas que se acumulan antes de escribirlas (y de
+        pasarlas a los analizadores); bloques pequeños reducen la latencia de los
+        analizadores en vivo (p. ej. live_stream.LivePublisher).
+        
+        Con profile=True el resumen por fase queda en self.profile_summary.
+        """
+        steps = int(t_max / dt)
+        params = self.run_params(t_max, dt)
+        checkpoint = self.load_checkpoint(params) if resume else None
+        states = self.states(t_max, dt, checkpoint)
+        
+        n6 = 6 * self.system.n_bodies
+        columns = ["t"] + state_columns(self.system.n_bodies) + ["E_kin", "E_pot", "E_tot", "Lx", "Ly", "Lz"]
+        path = f"data/{self.filename}.trj"
+        
+        # En un ensemble cada fila es (M, columnas): una subfila por réplica
+        ensemble = self.system.ensemble_size is not None
+        summary = ensemble and self.ensemble_output == "summary"
+        if summary:
+            columns, row_shape = SUMMARY_COLUMNS, None
+        else:
+            row_shape = self.system.batch_shape + (len(columns),)
+        
+        E0 = L0 = None
+        first = 0
+        if checkpoint is None:
+            writer = TrajectoryWriter(path, columns, params=params, row_shape=row_shape, block_rows=block_rows)
+        else:
+            writer = TrajectoryWriter.resume(path, checkpoint['offset'], block_rows=block_rows)
+            first = checkpoint['step']
+            E0, L0 = checkpoint.get('E0'), checkpoint.get('L0')
+        
+        for analyzer in analyzers:
+            analyzer.start(writer.header)
+            writer.add_listener(analyzer.update)
+        
+        monitor = None
+        if events:
+            log = checkpoint.get('events', []) if checkpoint is not None else []
+            monitor = EventMonitor(events, self.system, log=log)
+            writer.update_header(events=monitor.log)
+        
+        profiler = None
+        if self.profile or self.progress_every:
+            profiler = Profiler(progress_every=self.progress_every)
+            states = self._instrument(profiler, writer, monitor, states, steps, first)
+        self._profiler = profiler
+        rows_start, bytes_start = writer.rows_written, writer.bytes_written
+        
+        self.events_log = []
+        with profiler if profiler is not None else contextlib.nullcontext(), writer:
+            if self.backend == "numba" and monitor is None:
+                self._simulate_compiled(writer, steps, dt, params, checkpoint)
+                states = ()
+            elif self._scalar_blocks() and monitor is None:
+                self._simulate_compiled(writer, steps, dt, params, checkpoint,
+                                        block_steps=block_rows * self.output_every)
+                states = ()
             
-            time = 0.0
-            for _ in range(steps):
+            for k, (time, state) in enumerate(states, start=first):
+                reuse_pairs = self._pairs_current
+                if monitor is not None and monitor.check(k, time, state):
+                    writer.update_header(events=monitor.log)
+                    reuse_pairs = False  # la interpolación de Hermite evaluó otras fuerzas
+                    if monitor.terminated is not None:
+                        self.stats = self._partial_stats(k)
+                if self.checkpoint_every and k > first and k % self.checkpoint_every == 0:
+                    self.save_checkpoint(params, k, time, state, writer.tell(), E0, L0,
+                                         events=monitor.log if monitor is not None else None)
+                terminated = monitor is not None and monitor.terminated is not None
+                if k % self.output_every and not terminated:
+                    continue
                 self.system.state = state  # Actualizar estado del sistema
                 
-                E_kin = self.system.kinetic_energy()
-                E_pot = self.system.potential_energy()
-                E_tot = self.system.total_energy()
-                L = self.system.angular_momentum()
+                row = writer.next_row()
+                with_diagnostics = (k // self.output_every) % self.diagnostics_every == 0 or terminated
+                if with_diagnostics:
+                    E_kin, E_pot, L = self.system.diagnostics(state, reuse_pairs=reuse_pairs)
                 
-                file.write(f"{time:.5f} ")
-                file.write(" ".join([f"{val:.5e}" for val in state]) + " ")
-                file.write(f"{E_kin:.5e} {E_pot:.5e} {E_tot:.5e} ")
-                file.write(f"{L[0]:.5e} {L[1]:.5e} {L[2]:.5e}\n")
+                if summary:
+                    if E0 is None:
+                        E0, L0 = E_kin + E_pot, np.linalg.norm(L, axis=-1)
+                    if with_diagnostics:
+                        self._summary_row(row, time, E_kin + E_pot, L, E0, L0)
+                    else:
+                        row[0] = time
+                        row[1:] = np.nan
+                    continue
                 
-                state = self.runge_kutta_step(state, dt)
-                time += dt
+                row[..., 0] = time
+                row[..., 1:1 + n6] = state
+                if with_diagnostics:
+                    row[..., 1 + n6] = E_kin
+                    row[..., 2 + n6] = E_pot
+                    row[..., 3 + n6] = E_kin + E_pot
+                    row[..., 4 + n6:] = L
+                else:
+                    row[..., 1 + n6:] = np.nan
+                if terminated:
+                    break
         
-        print(f"Simulación completada. Datos guardados en data/{self.filename}.dat")
+        if monitor is not None:
+            self.events_log = monitor.log
+        if os.path.exists(self.checkpoint_path()):
+            os.remove(self.checkpoint_path())
+        if profiler is not None:
+            self._profiler = None
+            profiler.count('evaluaciones de fuerza (integrador)', self.stats['evaluations'])
+            profiler.count('filas escritas', writer.rows_written - rows_start)
+            profiler.count('bytes escritos', writer.bytes_written - bytes_start)
+            if self.profile:
+                self.profile_summary = profiler.result()
+        if self.verbose:
+            print(f"Simulación completada. Datos guardados en {path}")
+            if monitor is not None and monitor.terminated is not None:
+                event = monitor.terminated
+                print(f"Detenida por el evento '{event['event']}' en t={event['t']:.6e} (paso {event['step']})")
+            elif self.events_log:
+                print(f"{len(self.events_log)} eventos registrados en el encabezado de {path}")
+            fixed_steps = max(steps - 1, 0)
+            print(f"Integrador {self.integrator}: {self.stats['accepted']} pasos aceptados, "
+                  f"{self.stats['rejected']} rechazados, {self.stats['evaluations']} evaluaciones de fuerza "
+                  f"(RK4 fijo: {fixed_steps} pasos, {4 * fixed_steps} evaluaciones)")
+        if self.profile:
+            profiler.report()
 
 def main(masses=[1.0, 1.0, 1.0], 
          initial_positions=[[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 1.0, 0.0]], 
          initial_velocities=[[0.0, 0.0, 0.0], [0.0, 1.0, 0.0], [-1.0, 0.0, 0.0]], 
-         dt=0.001, t_max=10.0, filename="three_body_simulation"):
+         dt=0.001, t_max=10.0, filename="three_body_simulation",
+         integrator="rk4", rtol=1e-9, atol=1e-6, output_every=1, diagnostics_every=1, backend="numpy",
+         checkpoint_every=0, resume=False, softening=0.0, profile=False, progress_every=0.0):
     
     system = ThreeBodySystem(
         masses=masses,
         initial_positions=initial_positions,
-        initial_velocities=initial_velocities
+        initial_velocities=initial_velocities,
+        softening=softening
     )
     
     # Guardar parámetros de la simulación
@@ -153,29 +851,80 @@ def main(masses=[1.0, 1.0, 1.0],
         param_file.write(f"    'initial_velocities': {initial_velocities},\n")
         param_file.write(f"    'dt': {dt},\n")
         param_file.write(f"    't_max': {t_max},\n")
-        param_file.write(f"    'G': {system.G}\n")
+        param_file.write(f"    'G': {system.G},\n")
+        param_file.write(f"    'softening': {softening},\n")
+        param_file.write(f"    'integrator': '{integrator}',\n")
+        param_file.write(f"    'rtol': {rtol},\n")
+        param_file.write(f"    'atol': {atol},\n")
+        param_file.write(f"    'output_every': {output_every},\n")
+        param_file.write(f"    'diagnostics_every': {diagnostics_every},\n")
+        param_file.write(f"    'backend': '{backend}',\n")
+        param_file.write(f"    'checkpoint_every': {checkpoint_every}\n")
         param_file.write("}\n")
     
-    simulator = ThreeBodySimulator(system, filename)
-    simulator.simulate(t_max, dt)
+    simulator = ThreeBodySimulator(system, filename, integrator=integrator, rtol=rtol, atol=atol,
+                                   output_every=output_every, diagnostics_every=diagnostics_every,
+                                   backend=backend, checkpoint_every=checkpoint_every,
+                                   profile=profile, progress_every=progress_every)
+    simulator.simulate(t_max, dt, resume=resume)
 
 
-def main_from_config(config_file):
-    """Ejecuta la simulación desde un archivo de configuración. """
-    config = validate_config(load_config(config_file))
-    
-    system = ThreeBodySystem(
+def run_config(config, verbose=True, resume=False, profile=False, progress_every=0.0, analyzers=(), block_rows=4096):
+    """Ejecuta una simulación a partir de una configuración ya validada y devuelve el simulador."""
+    system = NBodySystem(
         masses=config['masses'],
         initial_positions=config['initial_positions'],
         initial_velocities=config['initial_velocities'],
-        G=config['G']
+        G=config['G'],
+        force_method=config['force_method'],
+        theta=config['theta'],
+        softening=config.get('softening', 0.0)
     )
     
-    simulator = ThreeBodySimulator(system, config['filename'])
-    simulator.simulate(config['t_max'], config['dt'])
+    simulator = ThreeBodySimulator(system, config['filename'], integrator=config['integrator'],
+                                   rtol=config['rtol'], atol=config['atol'],
+                                   output_every=config['output_every'],
+                                   diagnostics_every=config['diagnostics_every'],
+                                   backend=config['backend'],
+                                   checkpoint_every=config.get('checkpoint_every', 0),
+                                   profile=profile, progress_every=progress_every, verbose=verbose)
+    simulator.simulate(config['t_max'], config['dt'], resume=resume, analyzers=analyzers,
+                       events=build_events(config.get('events', [])), block_rows=block_rows)
+    return simulator
+
+
+def main_from_config(config_file, checkpoint_every=None, resume=False, profile=False, progress_every=0.0,
+                     use_cache=True):
+    """
+    Ejecuta la simulación desde un archivo de configuración.
+    
+    Con use_cache=True la corrida se busca primero en la caché de resultados
+    (result_cache.py, con clave el hash de la configuración validada, el integrador
+    y la versión del código): un acierto copia la trayectoria a data/{filename}.trj
+    y vuelve sin simular. Si ese archivo procede de otra configuración, se archiva
+    en la caché antes de sobrescribirlo.
+    """
+    config = validate_config(load_config(config_file))
+    if checkpoint_every is not None:
+        config['checkpoint_every'] = checkpoint_every
+    
+    cache = ResultCache() if use_cache else None
+    path = f"data/{config['filename']}.trj"
+    if cache is not None:
+        key = cache.key(config)
+        if cache.restore(key, path):
+            print(f"Resultado en caché ({key[:16]}): {path}")
+            return
+        previous = cache.archive(path, key)
+        if previous is not None:
+            print(f"La corrida anterior en {path} (otra configuración) se conserva en la caché ({previous[:16]})")
+    
+    run_config(config, resume=resume, profile=profile, progress_every=progress_every)
+    if cache is not None:
+        cache.store(key, path, config)
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Simulador del problema de tres cuerpos usando RK4.")
+    parser = argparse.ArgumentParser(description="Simulador del problema de tres cuerpos (RK4 o integradores alternativos).")
 
     # Opción para archivo de configuración
     parser.add_argument("--config", type=str, help="Archivo de configuración (.json o .yaml)")
@@ -215,11 +964,32 @@ if __name__ == "__main__":
     parser.add_argument("--dt", type=float, default=0.001, help="Paso de tiempo (s)")
     parser.add_argument("--t_max", type=float, default=10.0, help="Tiempo total de simulación (s)")
     parser.add_argument("--filename", type=str, default="three_body_simulation", help="Nombre base para los archivos de salida")
+    parser.add_argument("--integrator", type=str, default="rk4", choices=INTEGRATORS, help="Integrador numérico")
+    parser.add_argument("--softening", type=float, default=0.0,
+                        help="Longitud de suavizado de Plummer (m); 0 usa gravedad newtoniana")
+    parser.add_argument("--rtol", type=float, default=1e-9, help="Tolerancia relativa (integradores adaptativos)")
+    parser.add_argument("--atol", type=float, default=1e-6, help="Tolerancia absoluta (integradores adaptativos)")
+    parser.add_argument("--output_every", type=int, default=1, help="Escribir una fila cada N pasos")
+    parser.add_argument("--diagnostics_every", type=int, default=1,
+                        help="Calcular energías y momento angular cada N filas escritas")
+    parser.add_argument("--backend", type=str, default="numpy", choices=BACKENDS,
+                        help="Backend del bucle de integración (numba requiere Numba instalado)")
+    parser.add_argument("--checkpoint_every", type=int, default=None,
+                        help="Guardar un checkpoint cada N pasos (0 los desactiva)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continuar la corrida desde su último checkpoint (mismos parámetros)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Medir el tiempo de cada fase del bucle e imprimir un resumen al terminar")
+    parser.add_argument("--progress", type=float, default=0.0,
+                        help="Imprimir el progreso con ETA cada N segundos (0 lo desactiva)")
+    parser.add_argument("--no_cache", action="store_true",
+                        help="Con --config, simular aunque la corrida esté en la caché de resultados")
     
     args = parser.parse_args()
     
     if args.config:
-        main_from_config(args.config)
+        main_from_config(args.config, checkpoint_every=args.checkpoint_every, resume=args.resume,
+                         profile=args.profile, progress_every=args.progress, use_cache=not args.no_cache)
     else:
         masses = [args.m1, args.m2, args.m3]
         initial_positions = [
@@ -239,5 +1009,16 @@ if __name__ == "__main__":
             initial_velocities=initial_velocities,
             dt=args.dt,
             t_max=args.t_max,
-            filename=args.filename
+            filename=args.filename,
+            integrator=args.integrator,
+            rtol=args.rtol,
+            atol=args.atol,
+            output_every=args.output_every,
+            diagnostics_every=args.diagnostics_every,
+            backend=args.backend,
+            checkpoint_every=args.checkpoint_every or 0,
+            resume=args.resume,
+            softening=args.softening,
+            profile=args.profile,
+            progress_every=args.progress
         )
\ No newline at end of file
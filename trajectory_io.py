@@ -0,0 +1,363 @@
+import json
+import os
+import struct
+import itertools
+import argparse
+
+import numpy as np
+
+
+# Formato binario de trayectorias (.trj):
+#   [8 bytes]  MAGIC
+#   [4 bytes]  capacidad del encabezado en bytes (uint32, little-endian)
+#   [cap]      encabezado JSON relleno con espacios (columnas, parámetros, ...)
+#   [resto]    filas float64 little-endian en orden C, forma (n_filas, *row_shape)
+# El número de filas se deduce del tamaño del archivo, de modo que un archivo
+# truncado por una interrupción sigue siendo legible hasta la última fila completa.
+MAGIC = b"TBTRAJ01"
+PREFIX_SIZE = len(MAGIC) + 4
+DEFAULT_HEADER_CAPACITY = 65536 - PREFIX_SIZE  # datos alineados a 64 KiB
+
+DEFAULT_COLUMNS = ("t x1 y1 z1 x2 y2 z2 x3 y3 z3 vx1 vy1 vz1 vx2 vy2 vz2 vx3 vy3 vz3 "
+                   "E_kin E_pot E_tot Lx Ly Lz").split()
+
+
+class TrajectoryWriter:
+    def __init__(self, path, columns, params=None, block_rows=4096,
+                 header_capacity=DEFAULT_HEADER_CAPACITY, row_shape=None, dtype="<f8"):
+        """
+        Escribe una trayectoria binaria por bloques.
+
+        Las filas se acumulan en un bloque preasignado y se escriben al disco
+        con una sola llamada cuando el bloque se llena (o al hacer flush/close).
+
+        :param path: Ruta del archivo .trj.
+        :param columns: Nombres de las columnas (última dimensión de cada fila).
+        :param params: Diccionario con los parámetros de la corrida (va al encabezado).
+        :param block_rows: Filas por bloque de escritura.
+        :param row_shape: Forma de cada fila; por defecto (len(columns),).
+        :param dtype: Tipo de dato de las filas ("<f8" o "<f4").
+        """
+        self.path = path
+        self.row_shape = tuple(row_shape) if row_shape is not None else (len(columns),)
+        self.dtype = np.dtype(dtype)
+        self.header = {
+            'columns': list(columns),
+            'row_shape': list(self.row_shape),
+            'dtype': self.dtype.str,
+            'params': params or {},
+        }
+        # Se reserva al menos el doble del encabezado inicial (alineado a 64 KiB) para
+        # poder añadir campos después sin desplazar los datos
+        needed = 2 * len(json.dumps(self.header).encode()) + PREFIX_SIZE
+        self.header_capacity = max(header_capacity, -(-needed // 65536) * 65536 - PREFIX_SIZE)
+        self.block = np.empty((block_rows,) + self.row_shape, dtype=self.dtype)
+        self.n_buffered = 0
+        self.rows_written = 0
+        self.bytes_written = 0
+        self.listeners = []
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, "wb")
+        self.file.write(MAGIC + struct.pack("<I", self.header_capacity))
+        self._write_header()
+        self.file.seek(0, os.SEEK_END)
+
+    @classmethod
+    def resume(cls, path, offset, block_rows=4096):
+        """
+        Reabre un archivo .trj para seguir escribiendo desde 'offset' (bytes).
+
+        Lo que haya después de 'offset' (filas escritas tras el último checkpoint)
+        se descarta, de modo que la continuación es idéntica a una corrida sin cortes.
+        """
+        header, data_offset = read_header(path)
+        writer = cls.__new__(cls)
+        writer.path = path
+        writer.header = header
+        writer.row_shape = tuple(header['row_shape'])
+        writer.dtype = np.dtype(header['dtype'])
+        writer.header_capacity = data_offset - PREFIX_SIZE
+        writer.block = np.empty((block_rows,) + writer.row_shape, dtype=writer.dtype)
+        writer.n_buffered = 0
+        writer.rows_written = (offset - data_offset) // writer.block[0].nbytes
+        writer.bytes_written = 0
+        writer.listeners = []
+
+        writer.file = open(path, "r+b")
+        writer.file.truncate(offset)
+        writer.file.seek(0, os.SEEK_END)
+        return writer
+
+    def tell(self):
+        """Posición (bytes) del final de los datos ya escritos; llama a flush() antes."""
+        self.flush()
+        return self.file.tell()
+
+    def _write_header(self):
+        """Escribe (o reescribe in situ) el encabezado JSON con su relleno."""
+        raw = json.dumps(self.header).encode()
+        if len(raw) > self.header_capacity:
+            raise ValueError(f"El encabezado ({len(raw)} bytes) excede la capacidad reservada "
+                             f"({self.header_capacity} bytes)")
+        position = self.file.tell()
+        self.file.seek(PREFIX_SIZE)
+        self.file.write(raw.ljust(self.header_capacity, b" "))
+        if position > PREFIX_SIZE:
+            self.file.seek(position)
+
+    def update_header(self, **fields):
+        """Actualiza campos del encabezado (p. ej. registros de eventos) sin tocar los datos."""
+        self.header.update(fields)
+        self._write_header()
+
+    def add_listener(self, listener):
+        """Registra listener(filas), que recibe cada bloque de filas justo antes de escribirlo."""
+        self.listeners.append(listener)
+
+    def next_row(self):
+        """Devuelve una vista de la siguiente fila libre del bloque para rellenarla in situ."""
+        if self.n_buffered == len(self.block):
+            self.flush()
+        row = self.block[self.n_buffered]
+        self.n_buffered += 1
+        return row
+
+    def append(self, row):
+        """Copia una fila completa al bloque."""
+        self.next_row()[...] = row
+
+    def write_rows(self, rows):
+        """Escribe un conjunto de filas (n, *row_shape) directamente, tras vaciar el bloque."""
+        self.flush()
+        rows = np.ascontiguousarray(rows, dtype=self.dtype)
+        for listener in self.listeners:
+            listener(rows)
+        self.file.write(rows.tobytes())
+        self.rows_written += len(rows)
+        self.bytes_written += rows.nbytes
+
+    def flush(self):
+        """Escribe al disco las filas acumuladas en el bloque."""
+        if self.n_buffered:
+            data = self.block[:self.n_buffered]
+            for listener in self.listeners:
+                listener(data)
+            self.file.write(data.tobytes())
+            self.rows_written += self.n_buffered
+            self.bytes_written += data.nbytes
+            self.n_buffered = 0
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_header(path):
+    """Lee el encabezado de un archivo .trj. Devuelve (header, offset_de_datos)."""
+    with open(path, "rb") as f:
+        prefix = f.read(PREFIX_SIZE)
+        if prefix[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} no es un archivo de trayectoria binario")
+        capacity, = struct.unpack("<I", prefix[len(MAGIC):])
+        header = json.loads(f.read(capacity).decode())
+    return header, PREFIX_SIZE + capacity
+
+
+def update_trajectory_header(path, **fields):
+    """Actualiza campos del encabezado de un .trj ya cerrado, in situ (sin reescribir los datos)."""
+    header, offset = read_header(path)
+    header.update(fields)
+    raw = json.dumps(header).encode()
+    capacity = offset - PREFIX_SIZE
+    if len(raw) > capacity:
+        raise ValueError(f"El encabezado ({len(raw)} bytes) excede la capacidad reservada ({capacity} bytes)")
+    with open(path, "r+b") as f:
+        f.seek(PREFIX_SIZE)
+        f.write(raw.ljust(capacity, b" "))
+
+
+def open_trajectory(path):
+    """
+    Abre un archivo .trj mapeado en memoria (solo lectura, sin copiar).
+
+    Devuelve (header, datos) con datos de forma (n_filas, *row_shape).
+    """
+    header, offset = read_header(path)
+    dtype = np.dtype(header['dtype'])
+    row_shape = tuple(header['row_shape'])
+    row_bytes = dtype.itemsize * int(np.prod(row_shape))
+    n_rows = (os.path.getsize(path) - offset) // row_bytes
+    if n_rows == 0:
+        return header, np.empty((0,) + row_shape, dtype=dtype)
+    data = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(n_rows,) + row_shape)
+    return header, data
+
+
+def read_columns(filepath):
+    """Lee los nombres de columna del encabezado '# t x1 y1 ...' de un archivo .dat."""
+    with open(filepath, 'r') as f:
+        first = f.readline()
+    if first.startswith('#'):
+        return first[1:].split()
+    return list(DEFAULT_COLUMNS)
+
+
+def trajectory_path(filename):
+    """Ruta de los datos de una corrida: el .trj binario si existe, si no el .dat de texto."""
+    binary = f"data/{filename}.trj"
+    if os.path.exists(binary):
+        return binary
+    return f"data/{filename}.dat"
+
+
+def load_columns(filename, skip_steps=1, columns=None, member=None):
+    """
+    Carga las columnas de una corrida como diccionario {nombre: arreglo}.
+
+    Con archivos .trj los arreglos son vistas del mapa de memoria (no se copian
+    datos); con .dat se recurre a np.loadtxt. La columna 't' se expone como 'time'.
+
+    :param skip_steps: Submuestreo (una fila de cada 'skip_steps').
+    :param columns: Nombres de columna a devolver (por defecto todas).
+    :param member: Réplica a cargar de un archivo de ensemble (filas (M, columnas)).
+    """
+    filepath = trajectory_path(filename)
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"No se encontró el archivo data/{filename}.trj ni {filepath}")
+
+    if filepath.endswith(".trj"):
+        header, data = open_trajectory(filepath)
+        names = header['columns']
+        if data.ndim == 3:
+            if member is None:
+                raise ValueError(f"{filepath} contiene un ensemble de {data.shape[1]} réplicas; indique 'member'")
+            data = data[:, member]
+    else:
+        data = np.loadtxt(filepath, comments='#', ndmin=2)
+        names = read_columns(filepath)
+
+    data = data[::skip_steps]
+    return {('time' if name == 't' else name): data[:, k] for k, name in enumerate(names)
+            if columns is None or name in columns}
+
+
+def column_names(filename):
+    """Nombres de las columnas de una corrida (encabezado del .trj o del .dat)."""
+    filepath = trajectory_path(filename)
+    if filepath.endswith(".trj"):
+        return read_header(filepath)[0]['columns']
+    return read_columns(filepath)
+
+
+def iter_columns(filename, columns, chunk_rows=65536, member=None):
+    """
+    Recorre una corrida por bloques de filas leyendo solo las columnas pedidas.
+
+    Cada bloque es un diccionario {nombre: arreglo} (la columna 't' como 'time').
+    Con archivos .trj solo se copian del mapa de memoria las columnas pedidas; con
+    .dat se analizan 'chunk_rows' líneas cada vez, así que la memoria no depende
+    del tamaño del archivo.
+    """
+    filepath = trajectory_path(filename)
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"No se encontró el archivo data/{filename}.trj ni {filepath}")
+
+    if filepath.endswith(".trj"):
+        header, data = open_trajectory(filepath)
+        names = header['columns']
+        if data.ndim == 3:
+            if member is None:
+                raise ValueError(f"{filepath} contiene un ensemble de {data.shape[1]} réplicas; indique 'member'")
+            data = data[:, member]
+        selected = [name for name in names if name in columns]
+        indices = [names.index(name) for name in selected]
+        for start in range(0, len(data), chunk_rows):
+            block = data[start:start + chunk_rows, indices]
+            yield {('time' if name == 't' else name): block[:, k] for k, name in enumerate(selected)}
+        return
+
+    names = read_columns(filepath)
+    selected = [name for name in names if name in columns]
+    indices = [names.index(name) for name in selected]
+    with open(filepath, 'r') as f:
+        while True:
+            raw = list(itertools.islice(f, chunk_rows))
+            if not raw:
+                break
+            lines = [line for line in raw if not line.startswith('#')]
+            if not lines:
+                continue
+            block = np.loadtxt(lines, usecols=indices, ndmin=2)
+            yield {('time' if name == 't' else name): block[:, k] for k, name in enumerate(selected)}
+
+
+def time_span(filename):
+    """Tiempos inicial y final de una corrida sin leer el archivo completo."""
+    filepath = trajectory_path(filename)
+    if filepath.endswith(".trj"):
+        header, data = open_trajectory(filepath)
+        column = header['columns'].index('t')
+        return float(data[0, ..., column].flat[0]), float(data[-1, ..., column].flat[0])
+
+    column = read_columns(filepath).index('t')
+    with open(filepath, 'rb') as f:
+        first = next(line for line in f if not line.startswith(b'#'))
+        # Última línea: leer hacia atrás desde el final del archivo
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        tail = b""
+        while position > 0 and tail.strip().count(b"\n") < 1:
+            step = min(4096, position)
+            position -= step
+            f.seek(position)
+            tail = f.read(step) + tail
+        last = tail.strip().split(b"\n")[-1]
+    return float(first.split()[column]), float(last.split()[column])
+
+
+def export_dat(filename, chunk_rows=100000):
+    """Exporta data/{filename}.trj al formato de texto .dat original (por bloques)."""
+    header, data = open_trajectory(f"data/{filename}.trj")
+    if len(header['row_shape']) != 1:
+        raise ValueError("Solo se pueden exportar trayectorias con filas 1D")
+
+    out_path = f"data/{filename}.dat"
+    fmt = ['%.5f'] + ['%.5e'] * (len(header['columns']) - 1)
+    with open(out_path, "w") as file:
+        file.write("# " + " ".join(header['columns']) + "\n")
+        for start in range(0, len(data), chunk_rows):
+            np.savetxt(file, data[start:start + chunk_rows], fmt=fmt)
+
+    print(f"Exportado {len(data)} filas a {out_path}")
+    return out_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Utilidades para trayectorias binarias (.trj)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Exportar data/<filename>.trj a .dat de texto")
+    export_parser.add_argument("filename", type=str, help="Nombre base del archivo (sin extensión)")
+
+    info_parser = subparsers.add_parser("info", help="Mostrar encabezado y número de filas")
+    info_parser.add_argument("filename", type=str, help="Nombre base del archivo (sin extensión)")
+
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_dat(args.filename)
+    elif args.command == "info":
+        header, data = open_trajectory(f"data/{args.filename}.trj")
+        print(json.dumps(header, indent=2))
+        print(f"Filas: {len(data)}")